@@ -6,10 +6,14 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 
 from services.invoice_service import get_invoice_history, clear_invoice_history, invoice_history
-from services.model_loader import get_models_info
+from services.model_loader import get_models_info, get_cnn_batching_metrics, get_cnn_stage_metrics
+from services.persistence_queue import get_persistence_metrics, flush_pending_writes
+from services.detection_cache import get_detection_cache_metrics
 from utils.database import (
     get_invoices_from_db,
     get_forecasts_from_db,
+    encode_cursor,
+    decode_cursor,
     get_statistics,
     clear_database
 )
@@ -22,13 +26,14 @@ logger = get_logger(__name__)
 
 @history_bp.route('/history', methods=['GET'])
 def get_history():
-    """Get invoice history from memory"""
+    """Get recent invoice history from memory (no database access)"""
     try:
-        history = get_invoice_history()
+        limit = int(request.args.get('limit', 10))
+        history = get_invoice_history(limit=limit)
         
         return jsonify({
             'success': True,
-            'count': len(history),
+            'count': history['count'],
             'history': history
         })
         
@@ -47,20 +52,34 @@ def get_database_history():
         # Get pagination parameters
         limit = int(request.args.get('limit', 100))
         offset = int(request.args.get('offset', 0))
+        # Keyset cursors: next_cursor values returned by the previous page
+        after = request.args.get('after')
+        forecasts_after = request.args.get('forecasts_after')
+        for cursor in (after, forecasts_after):
+            if cursor:
+                try:
+                    decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'message': str(e)
+                    }), 400
         
         # Get data
-        invoices = get_invoices_from_db(limit=limit, offset=offset)
-        forecasts = get_forecasts_from_db(limit=limit)
+        invoices = get_invoices_from_db(limit=limit, offset=offset, after=after)
+        forecasts = get_forecasts_from_db(limit=limit, after=forecasts_after)
         
         return jsonify({
             'success': True,
             'invoices': {
                 'count': len(invoices),
-                'data': invoices
+                'data': invoices,
+                'next_cursor': encode_cursor(invoices[-1]) if len(invoices) == limit else None
             },
             'forecasts': {
                 'count': len(forecasts),
-                'data': forecasts
+                'data': forecasts,
+                'next_cursor': encode_cursor(forecasts[-1]) if len(forecasts) == limit else None
             }
         })
         
@@ -82,6 +101,7 @@ def clear_history():
         # Optionally clear database
         clear_db = request.args.get('database', 'false').lower() == 'true'
         if clear_db:
+            flush_pending_writes()
             clear_database()
             logger.info("Cleared database history")
         
@@ -103,9 +123,21 @@ def clear_history():
 
 @history_bp.route('/statistics', methods=['GET'])
 def get_stats():
-    """Get statistics from database"""
+    """Get statistics from database (optionally for a ?start=YYYY-MM-DD&end=YYYY-MM-DD window)"""
     try:
-        stats = get_statistics()
+        start = request.args.get('start')
+        end = request.args.get('end')
+        for value in (start, end):
+            if value is not None:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        'success': False,
+                        'message': f'Invalid date: {value} (expected YYYY-MM-DD)'
+                    }), 400
+        
+        stats = get_statistics(start=start, end=end)
         
         return jsonify({
             'success': True,
@@ -120,6 +152,26 @@ def get_stats():
         }), 500
 
 
+@history_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Get runtime metrics (write-behind persistence queue, detection cache, CNN micro-batching and stage timings)"""
+    try:
+        return jsonify({
+            'success': True,
+            'persistence': get_persistence_metrics(),
+            'detect_cache': get_detection_cache_metrics(),
+            'cnn_batching': get_cnn_batching_metrics(),
+            'cnn_stages': get_cnn_stage_metrics()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting metrics: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
 @history_bp.route('/models/info', methods=['GET'])
 def models_info():
     """Get information about loaded models"""
@@ -129,7 +181,8 @@ def models_info():
         return jsonify({
             'success': True,
             'models': models,
-            'invoice_history_count': len(invoice_history)
+            'invoice_history_count': len(invoice_history),
+            'total_invoices': invoice_history.total_count
         })
         
     except Exception as e:
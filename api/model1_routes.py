@@ -3,24 +3,32 @@ Model 1 Routes
 Invoice Detection API endpoints
 """
 from flask import Blueprint, request, jsonify, send_file
-import cv2
-import numpy as np
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import time
 import os
 
 from services.model_loader import get_cnn_model
-from services.invoice_service import process_invoice_image, format_invoice_response
-from config import ALLOWED_EXTENSIONS, UPLOAD_DIR
+from services.invoice_service import (
+    process_invoice_image, process_invoice_images, format_invoice_response, invoice_history
+)
+from services.detection_cache import get_cached_detection, get_similar_detection, cache_detection
+from models.preprocessing import decode_image
+from config import (
+    ALLOWED_EXTENSIONS, UPLOAD_DIR, DETECT_BATCH_MAX_IMAGES, DETECT_BATCH_WORKERS,
+    DECODE_MAX_SIDE, IMG_HEIGHT, IMG_WIDTH
+)
 from utils.validators import validate_image_file, ValidationError
-from utils.database import save_invoice_to_db
 from utils.logger import get_logger, log_api_request
 
 # Create blueprint
 model1_bp = Blueprint('model1', __name__, url_prefix='/api/model1')
 logger = get_logger(__name__)
 
+# Shared pool for decoding and post-processing batch uploads (OpenCV releases the GIL)
+batch_executor = ThreadPoolExecutor(max_workers=DETECT_BATCH_WORKERS, thread_name_prefix='detect-batch')
+
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -57,24 +65,32 @@ def detect_invoice():
                 'message': 'CNN model not loaded. Please initialize models first.'
             }), 500
 
-        # Read image
-        file_bytes = np.frombuffer(file.read(), np.uint8)
-        image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        # Re-uploads of the same scan are answered from the result cache
+        file_bytes = file.read()
+        invoice_data, cache_key = get_cached_detection(file_bytes)
+        phash = None
+
+        if invoice_data is None:
+            # Read image at the working resolution (large JPEGs are decoded reduced)
+            decoded = _decode_image(file_bytes)
 
-        if image is None:
-            raise ValidationError('Failed to read image')
+            if decoded is None:
+                raise ValidationError('Failed to read image')
 
-        # Process invoice
-        invoice_data = process_invoice_image(image, cnn_model)
+            invoice_data, phash = get_similar_detection(decoded.image)
 
-        # Save to database
-        try:
-            save_invoice_to_db(invoice_data)
-        except Exception as db_error:
-            logger.warning(f"Failed to save invoice to database: {db_error}")
+        cached = invoice_data is not None
+        if cached:
+            # Already saved; only becomes the latest invoice again
+            invoice_history.add(invoice_data)
+        else:
+            # Process invoice (also queues it for the database)
+            invoice_data = process_invoice_image(decoded.image, cnn_model, cnn_input=decoded.cnn_input)
+            cache_detection(cache_key, invoice_data, phash)
 
         # Format response
         response = format_invoice_response(invoice_data)
+        response['cached'] = cached
 
         # Log API request
         duration = (time.time() - start_time) * 1000
@@ -82,7 +98,7 @@ def detect_invoice():
                         params={'file': file.filename},
                         status_code=200, duration=duration)
 
-        logger.info(f"Invoice processed successfully in {duration:.2f}ms")
+        logger.info(f"Invoice {'served from cache' if cached else 'processed successfully'} in {duration:.2f}ms")
 
         return jsonify(response)
 
@@ -99,3 +115,125 @@ def detect_invoice():
             'success': False,
             'message': f'Error processing image: {str(e)}'
         }), 500
+
+
+def _decode_image(file_bytes):
+    """Decode uploaded bytes into a capped BGR working image plus CNN tensor (None if undecodable)"""
+    return decode_image(file_bytes, DECODE_MAX_SIDE, IMG_HEIGHT, IMG_WIDTH)
+
+
+def _cached_response(invoice_data, filename):
+    """Batch result entry for an upload answered from the detection cache"""
+    # Already saved; only becomes the latest invoice again
+    invoice_history.add(invoice_data)
+    response = format_invoice_response(invoice_data)
+    response['filename'] = filename
+    response['cached'] = True
+    return response
+
+
+@model1_bp.route('/detect_batch', methods=['POST'])
+def detect_invoice_batch():
+    """Detect many invoices from one multipart upload with a single batched CNN pass"""
+    start_time = time.time()
+
+    try:
+        # Accept repeated 'images' fields (or 'files'/'image'/'file' for compatibility)
+        files = []
+        for field in ('images', 'files', 'image', 'file'):
+            files.extend(request.files.getlist(field))
+        if not files:
+            raise ValidationError('No files provided. Please upload one or more images.')
+        if len(files) > DETECT_BATCH_MAX_IMAGES:
+            raise ValidationError(f'Too many files ({len(files)}). Max per batch: {DETECT_BATCH_MAX_IMAGES}')
+
+        # Get CNN model
+        cnn_model = get_cnn_model()
+        if cnn_model is None:
+            logger.error("CNN model not loaded")
+            return jsonify({
+                'success': False,
+                'message': 'CNN model not loaded. Please initialize models first.'
+            }), 500
+
+        # Validate and read every upload; failures are reported per image
+        results = [None] * len(files)
+        payloads = {}
+        cache_keys = {}
+        for i, file in enumerate(files):
+            try:
+                validate_image_file(file)
+                payload = file.read()
+            except ValidationError as e:
+                results[i] = {'success': False, 'filename': file.filename, 'message': str(e)}
+                continue
+            invoice_data, cache_keys[i] = get_cached_detection(payload)
+            if invoice_data is not None:
+                results[i] = _cached_response(invoice_data, file.filename)
+            else:
+                payloads[i] = payload
+
+        # Decode in parallel
+        indices = list(payloads)
+        decoded = batch_executor.map(_decode_image, [payloads[i] for i in indices])
+        images = []
+        cnn_inputs = []
+        image_indices = []
+        phashes = []
+        for i, image in zip(indices, decoded):
+            if image is None:
+                results[i] = {'success': False, 'filename': files[i].filename, 'message': 'Failed to read image'}
+                continue
+            invoice_data, phash = get_similar_detection(image.image)
+            if invoice_data is not None:
+                results[i] = _cached_response(invoice_data, files[i].filename)
+            else:
+                images.append(image.image)
+                cnn_inputs.append(image.cnn_input)
+                image_indices.append(i)
+                phashes.append(phash)
+
+        logger.info(f"Processing batch of {len(images)} invoice images "
+                    f"({sum(1 for r in results if r is not None and r.get('cached'))} cached, "
+                    f"{sum(1 for r in results if r is not None and not r['success'])} rejected)")
+
+        # One forward pass for the whole stack
+        if images:
+            invoices = process_invoice_images(images, cnn_model, executor=batch_executor,
+                                              cnn_inputs=cnn_inputs)
+            for i, invoice_data, phash in zip(image_indices, invoices, phashes):
+                cache_detection(cache_keys[i], invoice_data, phash)
+                response = format_invoice_response(invoice_data)
+                response['filename'] = files[i].filename
+                response['cached'] = False
+                results[i] = response
+
+        # Log API request
+        duration = (time.time() - start_time) * 1000
+        log_api_request('/api/model1/detect_batch', 'POST',
+                        params={'num_files': len(files)},
+                        status_code=200, duration=duration)
+
+        logger.info(f"Batch of {len(files)} images processed in {duration:.2f}ms")
+
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'processed': len(images),
+            'results': results,
+            'images_per_second': round(len(images) / (duration / 1000), 2) if duration > 0 else None
+        })
+
+    except ValidationError as e:
+        logger.warning(f"Validation error: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    except Exception as e:
+        logger.error(f"Error processing image batch: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': f'Error processing image batch: {str(e)}'
+        }), 500
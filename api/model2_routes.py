@@ -8,9 +8,9 @@ import time
 
 from services.model_loader import get_lstm_model
 from services.forecast_service import parse_manual_invoice_data, forecast_quantity, format_forecast_response
-from services.invoice_service import invoice_history
+from services.invoice_service import get_last_invoice
 from utils.validators import validate_invoice_data, ValidationError
-from utils.database import save_forecast_to_db
+from services.persistence_queue import persist_forecast
 from utils.logger import get_logger, log_api_request
 
 # Create blueprint
@@ -44,10 +44,10 @@ def forecast():
                 invoice_items = parsed_products
             else:
                 # Use last invoice from history
-                if not invoice_history:
+                last_invoice = get_last_invoice()
+                if last_invoice is None:
                     raise ValidationError('No invoice history. Please upload invoices first or provide products array.')
 
-                last_invoice = invoice_history[-1]
                 invoice_items = last_invoice.get('products', [])
 
         logger.info(f"Processing forecast for {len(invoice_items)} items")
@@ -64,9 +64,9 @@ def forecast():
         # Perform forecast
         forecast_result = forecast_quantity(lstm_model, invoice_items)
 
-        # Save to database
+        # Save to database (write-behind)
         try:
-            save_forecast_to_db(forecast_result)
+            persist_forecast(forecast_result)
         except Exception as db_error:
             logger.warning(f"Failed to save forecast to database: {db_error}")
 
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: catalog product matching in invoice text
+Compares the original per-line scan over every catalog name with the
+Aho-Corasick matcher used by extract_products_from_text, on the full
+product_catalogs.json and synthetic 30/100/500-line invoices.
+
+Usage:
+    python benchmarks/bench_catalog_matcher.py [--lines 30 100 500] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CATALOG_PATH
+from utils.data_processor import normalize_text, extract_quantity_from_line, extract_price_candidates
+from utils.invoice_processor import build_catalog_index, extract_products_from_text, lookup_catalog_price
+
+
+def legacy_extract_products_from_text(text, catalog_index):
+    """Original nested scan, kept verbatim as the baseline"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    normalized_lines = [normalize_text(line) for line in lines]
+
+    aggregated = {}
+    store_counts = {}
+
+    for original_line, normalized_line in zip(lines, normalized_lines):
+        for entry in catalog_index:
+            name_normalized = entry['name_normalized']
+            if not name_normalized or name_normalized not in normalized_line:
+                continue
+
+            store_key = entry['store']
+            store_counts[store_key] = store_counts.get(store_key, 0) + 1
+
+            product = entry['product']
+            product_id = product.get('id')
+
+            if product_id not in aggregated:
+                aggregated[product_id] = {
+                    'product_id': product_id,
+                    'product_name': product.get('name', 'Unknown Product'),
+                    'quantity': 0,
+                    'unit_price': product.get('price', 0),
+                    'line_total': 0
+                }
+
+            record = aggregated[product_id]
+            quantity = extract_quantity_from_line(original_line)
+            if quantity:
+                record['quantity'] += quantity
+
+            prices = extract_price_candidates(original_line)
+            if prices:
+                candidate_unit = min(prices)
+                if candidate_unit < record['unit_price'] * 5 and candidate_unit > 0:
+                    record['unit_price'] = candidate_unit
+
+                candidate_total = max(prices)
+                if record['quantity']:
+                    record['line_total'] = max(
+                        record['line_total'],
+                        candidate_total,
+                        record['unit_price'] * record['quantity']
+                    )
+                else:
+                    record['line_total'] = max(record['line_total'], candidate_total)
+
+    products = []
+    for record in aggregated.values():
+        if record['quantity'] <= 0:
+            record['quantity'] = 1
+        if record['unit_price'] <= 0:
+            record['unit_price'] = lookup_catalog_price(
+                catalog_index,
+                record.get('product_id'),
+                record.get('product_name')
+            ) or 10000
+
+        line_estimate = record['unit_price'] * record['quantity']
+        record['line_total'] = max(record['line_total'], line_estimate)
+        record['quantity'] = int(round(record['quantity']))
+        record['unit_price'] = int(round(record['unit_price']))
+        record['line_total'] = int(round(record['line_total']))
+        products.append(record)
+
+    products.sort(key=lambda item: item['line_total'], reverse=True)
+    return products[:12], store_counts
+
+
+def make_invoice_text(catalog, num_lines, rng):
+    """Invoice-like text: mostly catalog product lines, some header/noise lines"""
+    lines = ["HOA DON BAN HANG", "Ngay: 23/10/2025", "San Pham  SL  Don Gia  Thanh Tien"]
+    while len(lines) < num_lines:
+        if rng.random() < 0.8:
+            product = rng.choice(catalog)
+            quantity = rng.randint(1, 20)
+            price = int(product.get('price', 10000))
+            lines.append(f"{product['name']}  {quantity}  {price:,}  {price * quantity:,}")
+        else:
+            lines.append(f"Ghi chu {rng.randint(1000, 9999)} --------------")
+    return '\n'.join(lines[:num_lines])
+
+
+def best_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, nargs='+', default=[30, 100, 500], help='Invoice sizes in lines')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (best is reported)')
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+
+    print("=" * 60)
+    print(f"CATALOG MATCHER BENCHMARK ({len(catalog)} catalog products)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    catalog_index = build_catalog_index({'store1': catalog})
+    matcher = catalog_index.matcher
+    print(f"   Index + automaton build: {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"({matcher.num_states} states)")
+
+    rng = random.Random(0)
+    for num_lines in args.lines:
+        text = make_invoice_text(catalog, num_lines, rng)
+        legacy_result = legacy_extract_products_from_text(text, catalog_index)
+        new_result = extract_products_from_text(text, catalog_index)
+        assert legacy_result == new_result, f"Results differ for {num_lines}-line invoice"
+
+        legacy = best_time(lambda: legacy_extract_products_from_text(text, catalog_index), args.repeat)
+        matched = best_time(lambda: extract_products_from_text(text, catalog_index), args.repeat)
+        print(f"   {num_lines:>4} lines  legacy={legacy * 1000:9.1f}ms  aho-corasick={matched * 1000:7.1f}ms  "
+              f"speedup={legacy / matched:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
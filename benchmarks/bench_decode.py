@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: decode + text-region time for large invoice photos
+Compares the full-resolution cv2.imdecode path with decode_image, which
+decodes JPEGs reduced (IMREAD_REDUCED_COLOR_*) to a capped working image and
+builds the CNN tensor from it.
+
+Usage:
+    python benchmarks/bench_decode.py [--width 4000] [--height 3000] [--repeats 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DECODE_MAX_SIDE, IMG_HEIGHT, IMG_WIDTH
+from models.cnn_model import CNNInvoiceDetector
+from models.preprocessing import decode_image, preprocess_batch
+
+
+def synthetic_invoice(width, height, seed=0):
+    """Encoded JPEG of a photographed-invoice-like page: paper texture and text lines"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 235, dtype=np.uint8)
+    img = cv2.add(img, rng.integers(0, 15, img.shape, dtype=np.uint8))
+    scale = width / 800
+    for row in range(40):
+        y = int((60 + row * 22) * scale * 0.75)
+        if y > height - 20:
+            break
+        cv2.putText(img, f"Product {row:02d}   x{rng.integers(1, 20)}   {rng.integers(1, 500) * 1000:,} VND",
+                    (int(40 * scale), y), cv2.FONT_HERSHEY_SIMPLEX, 0.5 * scale, (20, 20, 20),
+                    max(1, int(scale)))
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def timed(fn, repeats):
+    """Best-of-repeats wall time in ms and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=4000, help='Photo width')
+    parser.add_argument('--height', type=int, default=3000, help='Photo height')
+    parser.add_argument('--repeats', type=int, default=5, help='Repetitions (best is reported)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"DECODE + TEXT REGIONS ({args.width}x{args.height} JPEG, cap {DECODE_MAX_SIDE})")
+    print("=" * 60)
+
+    data = synthetic_invoice(args.width, args.height)
+    cnn = CNNInvoiceDetector()
+
+    def full_resolution():
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        tensor = preprocess_batch([image], IMG_HEIGHT, IMG_WIDTH)
+        return image, tensor, cnn.extract_text_regions(image)
+
+    def reduced():
+        decoded = decode_image(data, DECODE_MAX_SIDE, IMG_HEIGHT, IMG_WIDTH)
+        return decoded.image, decoded.cnn_input, cnn.extract_text_regions(decoded.image)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        full_ms, (full_image, _, full_regions) = timed(full_resolution, args.repeats)
+        reduced_ms, (working, _, reduced_regions) = timed(reduced, args.repeats)
+
+    print(f"   full-resolution decode + regions: {full_ms:8.1f} ms "
+          f"({full_image.shape[1]}x{full_image.shape[0]}, {len(full_regions)} regions)")
+    print(f"   reduced decode + regions        : {reduced_ms:8.1f} ms "
+          f"({working.shape[1]}x{working.shape[0]}, {len(reduced_regions)} regions)")
+    print(f"   speedup: {full_ms / reduced_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: CNN detection throughput by batch size
+Compares one detect_invoice call per image with detect_invoices on stacks
+of N images (a single forward pass per stack).
+
+Usage:
+    python benchmarks/bench_detect_batch.py [--images 64] [--sizes 1 4 8 16 32]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cnn_model import CNNInvoiceDetector
+
+
+def throughput(fn, images, batch_size):
+    """Images per second processing images in stacks of batch_size"""
+    fn(images[:batch_size])  # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        fn(images[i:i + batch_size])
+    return len(images) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64, help='Images per measurement')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 8, 16, 32], help='Batch sizes')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"CNN DETECTION THROUGHPUT ({args.images} images)")
+    print("=" * 60)
+
+    cnn = CNNInvoiceDetector()
+    cnn.build_model()
+    cnn.prepare_inference()
+
+    rng = np.random.default_rng(0)
+    # Synthetic 800x1000 BGR uploads, like the generated invoices
+    images = [rng.integers(0, 256, (1000, 800, 3), dtype=np.uint8) for _ in range(args.images)]
+
+    single = throughput(lambda batch: [cnn.detect_invoice(image) for image in batch], images, 1)
+    print(f"   per-image detect_invoice : {single:8.1f} images/s")
+    for batch_size in args.sizes:
+        batched = throughput(cnn.detect_invoices, images, batch_size)
+        print(f"   detect_invoices batch={batch_size:<3}: {batched:8.1f} images/s ({batched / single:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-call inference latency
+Compares keras.Model.predict with the compiled fixed-signature function
+for the CNN detector and the forecasting LSTM.
+
+Usage:
+    python benchmarks/bench_inference.py [--calls 200] [--batch 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import LSTM_SEQUENCE_LENGTH, LSTM_NUM_FEATURES
+from models.cnn_model import CNNInvoiceDetector
+from models.lstm_model import ImportForecastLSTM
+
+
+def measure(fn, batch, calls, warmup=5):
+    """Return per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn(batch)
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(label, predict_ms, compiled_ms):
+    p50_before, p99_before = np.percentile(predict_ms, [50, 99])
+    p50_after, p99_after = np.percentile(compiled_ms, [50, 99])
+    print(f"   {label:<6} model.predict p50={p50_before:8.2f}ms p99={p99_before:8.2f}ms | "
+          f"compiled p50={p50_after:8.2f}ms p99={p99_after:8.2f}ms | "
+          f"p50 speedup={p50_before / p50_after:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200, help='Timed calls per variant')
+    parser.add_argument('--batch', type=int, default=1, help='Batch size per call')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"INFERENCE LATENCY BENCHMARK (batch={args.batch}, calls={args.calls})")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+
+    lstm = ImportForecastLSTM(lookback=LSTM_SEQUENCE_LENGTH, features=LSTM_NUM_FEATURES)
+    lstm.prepare_inference()
+    sequences = rng.random((args.batch, LSTM_SEQUENCE_LENGTH, LSTM_NUM_FEATURES), dtype=np.float32)
+    report('LSTM',
+           measure(lambda x: lstm.model.predict(x, verbose=0), sequences, args.calls),
+           measure(lstm.infer, sequences, args.calls))
+
+    cnn = CNNInvoiceDetector()
+    cnn.build_model()
+    cnn.prepare_inference()
+    images = rng.random((args.batch, cnn.img_height, cnn.img_width, 3), dtype=np.float32)
+    cnn_calls = max(args.calls // 4, 10)
+    report('CNN',
+           measure(lambda x: cnn.model.predict(x, verbose=0), images, cnn_calls),
+           measure(cnn.infer, images, cnn_calls))
+
+
+if __name__ == '__main__':
+    main()
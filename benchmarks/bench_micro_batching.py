@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: concurrent CNN requests with and without micro-batching
+Each client thread sends preprocessed single images; without the scheduler
+every request runs its own forward pass, with it concurrent requests share
+batched passes.
+
+Usage:
+    python benchmarks/bench_micro_batching.py [--clients 16] [--requests 8] [--max-wait-ms 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cnn_model import CNNInvoiceDetector
+from models.batch_scheduler import MicroBatchScheduler
+
+
+def run_clients(fn, sample, clients, requests):
+    """Return (images/s, per-request latencies in ms)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        local = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            fn(sample)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests / elapsed, np.array(latencies)
+
+
+def report(label, rate, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"   {label:<16} {rate:8.1f} images/s | latency p50={p50:8.1f}ms p99={p99:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=8, help='Requests per client')
+    parser.add_argument('--max-batch', type=int, default=16, help='Scheduler max_batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Scheduler max_wait_ms')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"MICRO-BATCHING BENCHMARK ({args.clients} clients x {args.requests} requests)")
+    print("=" * 60)
+
+    cnn = CNNInvoiceDetector()
+    cnn.build_model()
+    cnn.prepare_inference()
+    sample = np.random.default_rng(0).random((cnn.img_height, cnn.img_width, 3), dtype=np.float32)
+    cnn.infer(sample[np.newaxis])  # warm-up
+
+    report('direct', *run_clients(lambda x: cnn.infer(x[np.newaxis]), sample, args.clients, args.requests))
+
+    scheduler = MicroBatchScheduler(cnn.infer, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    report('micro-batched', *run_clients(scheduler.infer, sample, args.clients, args.requests))
+    metrics = scheduler.metrics()
+    print(f"   batches={metrics['batches']} avg_batch_size={metrics['avg_batch_size']} "
+          f"avg_wait_ms={metrics['avg_wait_ms']} avg_infer_ms={metrics['avg_infer_ms']}")
+    scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
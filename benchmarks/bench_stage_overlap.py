@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: sequential vs overlapped CNN inference and text-region extraction
+Runs predict_invoice_data with stage_workers=0 (detect, then regions) and with
+a stage pool (regions overlap detect), and prints per-stage averages.
+
+Usage:
+    python benchmarks/bench_stage_overlap.py [--requests 30] [--workers 2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DECODE_MAX_SIDE
+from models.cnn_model import CNNInvoiceDetector
+
+
+def run(stage_workers, images):
+    """Stage metrics after predicting every image once (after a warm-up)"""
+    cnn = CNNInvoiceDetector(stage_workers=stage_workers)
+    cnn.build_model()
+    cnn.prepare_inference()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cnn.predict_invoice_data(images[0])
+        cnn.reset_stage_metrics()
+        start = time.perf_counter()
+        for image in images:
+            cnn.predict_invoice_data(image)
+        elapsed = time.perf_counter() - start
+    return cnn.stage_metrics(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=30, help='Images predicted per mode')
+    parser.add_argument('--workers', type=int, default=2, help='Stage pool size for the overlapped mode')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"CNN STAGE OVERLAP ({args.requests} requests, {os.cpu_count()} CPUs)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    # Working-resolution uploads (see DECODE_MAX_SIDE) with some text-like structure
+    height, width = DECODE_MAX_SIDE, DECODE_MAX_SIDE * 3 // 4
+    images = []
+    for _ in range(args.requests):
+        img = np.full((height, width, 3), 235, dtype=np.uint8)
+        for row in range(30):
+            cv2.putText(img, f"Item {row} x{rng.integers(1, 20)} {rng.integers(1, 500)}000",
+                        (30, 40 + row * 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (20, 20, 20), 1)
+        images.append(img)
+
+    for label, workers in (('sequential', 0), ('overlapped', args.workers)):
+        metrics, elapsed = run(workers, images)
+        avg = metrics['avg_ms']
+        print(f"   {label:<10}: total {avg['total']:7.1f} ms/request "
+              f"(detect {avg['detect']:.1f}, regions {avg['text_regions']:.1f}, "
+              f"post {avg['postprocess']:.1f}) - {args.requests / elapsed:.1f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: full-frame vs pyramid text-region detection
+Renders synthetic invoices with data/generate invoice.py at 800x1000 and
+upscaled to 4K (3072x3840), then times detect_regions_full against
+detect_regions_pyramid and reports how many full-frame regions the pyramid
+detector also finds (a full-frame region counts as found when its centre
+lies inside a pyramid region).
+
+Usage:
+    python benchmarks/bench_text_regions.py [--invoices 10] [--max-pixels 1000000]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from config import TEXT_REGION_COARSE_SIDE, TEXT_REGION_MAX_PIXELS
+from models.text_regions import detect_regions_full, detect_regions_pyramid
+
+
+def load_generator():
+    """generate_invoice_image from 'data/generate invoice.py' (not importable by name)"""
+    spec = importlib.util.spec_from_file_location('generate_invoice', os.path.join(ROOT, 'data', 'generate invoice.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.generate_invoice_image
+
+
+def synthetic_invoices(count, seed=0):
+    """BGR 800x1000 invoice images with 5-30 random product lines"""
+    generate_invoice_image = load_generator()
+    rng = random.Random(seed)
+    images = []
+    for i in range(count):
+        products = []
+        for _ in range(rng.randint(5, 30)):
+            quantity = rng.randint(1, 50)
+            unit_price = rng.randint(5, 500) * 1000
+            products.append({
+                'name': f"San pham {rng.randint(100, 999)} loai {rng.choice('ABCDEFGH')}",
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'line_total': quantity * unit_price
+            })
+        invoice_data = {'products': products, 'total_amount': sum(p['line_total'] for p in products)}
+        img = generate_invoice_image(products, invoice_data, datetime(2024, 1, 1) + timedelta(days=i))
+        images.append(cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR))
+    return images
+
+
+def coverage(full_regions, pyramid_regions):
+    """Fraction of full-frame regions whose centre lies inside a pyramid region"""
+    if not full_regions:
+        return 1.0
+    found = 0
+    for r in full_regions:
+        cx, cy = r['x'] + r['width'] / 2, r['y'] + r['height'] / 2
+        if any(p['x'] <= cx <= p['x'] + p['width'] and p['y'] <= cy <= p['y'] + p['height']
+               for p in pyramid_regions):
+            found += 1
+    return found / len(full_regions)
+
+
+def timed(fn, images):
+    """(ms per image, results)"""
+    fn(images[0])  # warm-up
+    start = time.perf_counter()
+    results = [fn(image) for image in images]
+    return (time.perf_counter() - start) * 1000 / len(images), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--invoices', type=int, default=10, help='Synthetic invoices per resolution')
+    parser.add_argument('--coarse-side', type=int, default=TEXT_REGION_COARSE_SIDE, help='Coarse level long side')
+    parser.add_argument('--max-pixels', type=int, default=TEXT_REGION_MAX_PIXELS, help='Refinement pixel budget')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"TEXT-REGION DETECTION ({args.invoices} invoices, budget {args.max_pixels:,} px)")
+    print("=" * 60)
+
+    base = synthetic_invoices(args.invoices)
+    resolutions = {
+        '800x1000': base,
+        '3072x3840': [cv2.resize(img, (3072, 3840), interpolation=cv2.INTER_CUBIC) for img in base]
+    }
+
+    def pyramid(img):
+        return detect_regions_pyramid(img, coarse_side=args.coarse_side, max_pixels=args.max_pixels)
+
+    for label, images in resolutions.items():
+        full_ms, full_results = timed(detect_regions_full, images)
+        pyramid_ms, pyramid_results = timed(pyramid, images)
+        full_count = np.mean([len(r) for r in full_results])
+        pyramid_count = np.mean([len(r) for r in pyramid_results])
+        found = np.mean([coverage(f, p) for f, p in zip(full_results, pyramid_results)])
+        print(f"\n   {label}")
+        print(f"      full   : {full_ms:8.1f} ms/image, {full_count:6.1f} regions")
+        print(f"      pyramid: {pyramid_ms:8.1f} ms/image, {pyramid_count:6.1f} regions "
+              f"({full_ms / pyramid_ms:.1f}x faster, {found:.0%} of full-frame regions covered)")
+
+
+if __name__ == '__main__':
+    main()
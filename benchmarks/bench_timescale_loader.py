@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: timescale CSV loaders
+Compares the original iterrows/dict loader with the columnar loader
+on the shipped CSVs and on a 100x synthetic scale-up.
+
+Usage:
+    python benchmarks/bench_timescale_loader.py [--scale 100] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.timescale_snapshot import TIMESCALE_FILES, load_timescale_columns
+
+
+def legacy_load_timescale_data(paths):
+    """Original row-by-row loader, kept verbatim as the baseline"""
+    product_path, import_path, sale_path = paths
+
+    def clean_price(price_str):
+        if pd.isna(price_str):
+            return 0
+        price_clean = str(price_str).replace('.', '').replace(',', '').strip()
+        try:
+            return float(price_clean)
+        except ValueError:
+            return 0
+
+    df_products = pd.read_csv(product_path, sep=';', encoding='utf-8')
+    product_info = {}
+    for _, row in df_products.iterrows():
+        product_name = str(row.iloc[0]).strip()
+        product_info[product_name] = {
+            'initial_stock': int(row.iloc[1]) if pd.notna(row.iloc[1]) else 0,
+            'import_price': clean_price(row.iloc[2]) if len(row) > 2 else 0,
+            'retail_price': clean_price(row.iloc[3]) if len(row) > 3 else 0,
+        }
+
+    df_imports = pd.read_csv(import_path, sep=';', encoding='utf-8')
+    imports_dict = {}
+    for _, row in df_imports.iterrows():
+        try:
+            product_name = str(row.iloc[0]).strip()
+            quantity = int(row.iloc[1]) if pd.notna(row.iloc[1]) else 0
+            imports_dict[product_name] = imports_dict.get(product_name, 0) + quantity
+        except (ValueError, IndexError):
+            continue
+
+    df_sales = pd.read_csv(sale_path, sep=';', encoding='utf-8')
+    sales_dict = {}
+    for _, row in df_sales.iterrows():
+        try:
+            product_name = str(row.iloc[1]).strip()
+            quantity = int(row.iloc[2]) if pd.notna(row.iloc[2]) else 0
+            sales_dict[product_name] = sales_dict.get(product_name, 0) + quantity
+        except (ValueError, IndexError):
+            continue
+
+    return product_info, imports_dict, sales_dict
+
+
+def write_scaled_copies(paths, scale, out_dir):
+    """Replicate every CSV `scale` times with per-copy product name suffixes"""
+    scaled_paths = []
+    for path, name_col in zip(paths, (0, 1, 1)):
+        df = pd.read_csv(path, sep=';', encoding='utf-8', dtype=str)
+        copies = []
+        for k in range(scale):
+            copy = df.copy()
+            copy.iloc[:, name_col] = copy.iloc[:, name_col] + f' #{k}'
+            copies.append(copy)
+        out_path = os.path.join(out_dir, os.path.basename(str(path)))
+        pd.concat(copies, ignore_index=True).to_csv(out_path, sep=';', index=False, encoding='utf-8')
+        scaled_paths.append(out_path)
+    return tuple(scaled_paths)
+
+
+def time_loader(loader, paths, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(paths)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_equivalence(paths):
+    """Product info and sales totals must match the legacy loader"""
+    product_info, _, sales_dict = legacy_load_timescale_data(paths)
+    columns = load_timescale_columns(paths)
+    ids = {name: i for i, name in enumerate(columns['names'])}
+
+    for name, info in product_info.items():
+        i = ids[name]
+        assert columns['initial_stock'][i] == info['initial_stock'], name
+        assert columns['import_price'][i] == info['import_price'], name
+        assert columns['retail_price'][i] == info['retail_price'], name
+    for name, quantity in sales_dict.items():
+        assert columns['sale_qty'][ids[name]] == quantity, name
+    print("   [OK] Columnar loader matches legacy product info and sales totals")
+
+
+def report(label, paths, repeat):
+    legacy = time_loader(legacy_load_timescale_data, paths, repeat)
+    columnar = time_loader(load_timescale_columns, paths, repeat)
+    print(f"   {label:<12} legacy={legacy * 1000:9.1f}ms  columnar={columnar * 1000:9.1f}ms  "
+          f"speedup={legacy / columnar:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=100, help='Synthetic scale-up factor')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per loader (best is reported)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("TIMESCALE LOADER BENCHMARK")
+    print("=" * 60)
+
+    check_equivalence(TIMESCALE_FILES)
+    report('shipped', TIMESCALE_FILES, args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scaled_paths = write_scaled_copies(TIMESCALE_FILES, args.scale, tmp_dir)
+        report(f'{args.scale}x', scaled_paths, 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,20 +27,60 @@ UPLOAD_DIR = str(UPLOAD_DIR)
 CNN_MODEL_PATH = MODEL_DIR / 'cnn_invoice_detector.weights.h5'
 LSTM_MODEL_PATH = MODEL_DIR / 'lstm_text_recognizer.weights.h5'
 LSTM_SCALER_PATH = MODEL_DIR / 'lstm_text_recognizer.weights_scaler.pkl'
+LSTM_NUMPY_PATH = MODEL_DIR / 'lstm_text_recognizer.npz'  # Exported by: python -m models.lstm_numpy
 
 # Data Paths
 CATALOG_PATH = DATA_DIR / 'product_catalogs.json'
+CATALOG_ARTIFACT_PATH = DATA_DIR / 'product_catalogs.idx'
 DATASET_PATH = DATA_DIR / 'DATASET-tung1000.csv'
+PRODUCT_DATASET_PATH = DATA_DIR / 'dataset_product.csv'
+IMPORT_HISTORY_PATH = DATA_DIR / 'import_in_a_timescale.csv'
+SALE_HISTORY_PATH = DATA_DIR / 'sale_in_a_timescale.csv'
+
+# Timescale Snapshot Settings
+TIMESCALE_CHECK_INTERVAL = 5.0  # Seconds between CSV change checks
 
 # Image Settings
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'pdf'}
+DETECT_BATCH_MAX_IMAGES = 64  # Max files per /api/model1/detect_batch request
+DETECT_BATCH_WORKERS = min(8, os.cpu_count() or 1)  # Threads decoding/post-processing batch images
+DECODE_MAX_SIDE = 1000  # Long-side cap of the working image used for text-region detection
+TEXT_REGION_MODE = 'pyramid'  # 'full': whole-frame detector; 'pyramid': coarse row bands refined at higher resolution
+# The pyramid only engages on frames larger than TEXT_REGION_MAX_PIXELS. The upload routes pass the
+# working image capped at DECODE_MAX_SIDE (<= 1,000,000 px), so they always take the full detector;
+# the pyramid helps callers passing larger frames (offline/bulk processing of full-resolution scans).
+# Lowering the budget to the working size costs recall (about 1/3 of regions lost at 500,000 px).
+TEXT_REGION_COARSE_SIDE = 400  # Long side of the level used to find text row bands
+TEXT_REGION_MAX_PIXELS = 1_000_000  # Ceiling on band pixels run through the full detector per image
+
+# Detection Result Cache (services/detection_cache.py): re-uploads of the same scan
+DETECT_CACHE_ENABLED = True
+DETECT_CACHE_MAX_ENTRIES = 512
+DETECT_CACHE_MAX_BYTES = 8 * 1024 * 1024  # Estimated size of the cached invoice dicts
+DETECT_CACHE_TTL_SECONDS = 900
+DETECT_CACHE_PERCEPTUAL = False  # Also match near-duplicate images (re-encoded/resized) by perceptual hash
+DETECT_CACHE_PHASH_MAX_DISTANCE = 6  # Max differing bits (of 256) for a perceptual match
 
 # Model Settings
 LSTM_SEQUENCE_LENGTH = 7  # Updated for time-series model (7-day history)
 LSTM_NUM_FEATURES = 7  # Updated: sale_qty, day_of_week, is_weekend, cumulative_sales, days_since_import, initial_stock, retail_price
 CNN_INPUT_SHAPE = (IMG_HEIGHT, IMG_WIDTH, 3)
+LSTM_ENGINE = 'keras'  # 'numpy': serve forecasts from LSTM_NUMPY_PATH without importing TensorFlow
+FORECAST_USE_LSTM = False  # True: forecast with one batched LSTM pass instead of the sales-velocity heuristic
+
+# CNN Micro-Batching (concurrent single-image requests share one forward pass)
+CNN_MICRO_BATCHING = False  # No gain measured on small CPU hosts; adds up to CNN_MAX_WAIT_MS to lone requests
+CNN_MAX_BATCH = 8  # Largest batch the scheduler forms
+# Batch sizes the compiled serving functions are traced for; inputs are padded up to the next one
+INFERENCE_BATCH_BUCKETS = (1, 4, 16, 64)  # Default for CompiledInference
+CNN_BATCH_BUCKETS = tuple(size for size in (1, 2, 4) if size < CNN_MAX_BATCH) + (CNN_MAX_BATCH,)
+LSTM_BATCH_BUCKETS = (1, 8, 32, 128)
+CNN_MAX_WAIT_MS = 5.0  # Longest a request waits for others to join its batch
+CNN_BATCH_QUEUE_SIZE = 256  # Requests waiting for the scheduler before callers block
+CNN_BATCH_TIMEOUT = 30.0  # Seconds a request waits for its batched result before failing
+CNN_STAGE_WORKERS = 4  # Detector threads running text-region extraction alongside inference (0 = sequential)
 
 # Store Configuration
 STORE_NAME_LOOKUP = {
@@ -53,11 +93,31 @@ EPOCHS = 50
 BATCH_SIZE = 32
 VALIDATION_SPLIT = 0.2
 LEARNING_RATE = 0.001
+CNN_FINE_TUNE = False  # True: unfreeze MobileNetV2 and train end to end on images
+CNN_FEATURE_CACHE = True  # Frozen backbone: train the head on cached pooled features
+CNN_FEATURE_CACHE_DIR = MODEL_DIR / 'feature_cache'
+CNN_DATA_CACHE_DIR = MODEL_DIR / 'tf_data_cache'  # Decoded training images (tf.data file cache)
+CNN_SHUFFLE_BUFFER = 512  # Images held for shuffling in the end-to-end training pipeline
 
 # Flask Settings
 FLASK_DEBUG = False
 FLASK_HOST = '127.0.0.1'
 FLASK_PORT = 5000
 
+# Database Settings
+DB_POOL_SIZE = 8  # Idle SQLite connections kept for reuse
+DB_BUSY_TIMEOUT_MS = 5000  # Wait this long for a competing writer before failing
+DB_CACHED_STATEMENTS = 128  # Prepared statements cached per connection
+DB_BULK_CHUNK_SIZE = 500  # Invoices per transaction in save_invoices_bulk
+
+# Persistence Settings (services/persistence_queue.py)
+PERSIST_MODE = 'write_behind'  # 'sync': commit on the request thread before responding
+PERSIST_QUEUE_SIZE = 1000  # Max rows waiting for the background writer
+PERSIST_MAX_BATCH = 200  # Max rows per writer transaction
+PERSIST_MAX_DELAY_MS = 20  # How long the writer waits to grow a batch
+PERSIST_ENQUEUE_TIMEOUT = 0.5  # Seconds to wait on a full queue before writing synchronously
+PERSIST_SHUTDOWN_TIMEOUT = 10.0  # Seconds allowed for the final flush at exit
+PERSIST_FLUSH_TIMEOUT = 5.0  # Longest a request waits for queued writes (e.g. before clearing history)
+
 # History Storage
 MAX_INVOICE_HISTORY = 300
@@ -0,0 +1,134 @@
+"""
+Bulk-ingest invoices into the SQLite database.
+Reads a JSON array (e.g. data/invoices/train.json, the shape used by
+generate_invoice_based_data) or an NDJSON file with one invoice per line,
+and writes it through save_invoices_bulk in chunked transactions.
+
+Usage:
+    python ingest_invoices.py data/invoices/train.json [--chunk-size 500]
+    python ingest_invoices.py invoices.ndjson --id-prefix IMPORT
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import DB_BULK_CHUNK_SIZE, CATALOG_PATH
+from utils.data_processor import normalize_text
+from utils.database import init_database, save_invoices_bulk
+
+NDJSON_SUFFIXES = {'.ndjson', '.jsonl'}
+
+
+def iter_invoice_records(path):
+    """Yield raw invoice dicts from a JSON array/object or an NDJSON file"""
+    path = Path(path)
+    if path.suffix.lower() in NDJSON_SUFFIXES:
+        with path.open('r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON ({exc})") from exc
+        return
+
+    with path.open('r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('invoices', [data])
+    yield from data
+
+
+def load_product_ids():
+    """Normalized catalog name -> product id (empty if no catalog is available)"""
+    try:
+        from utils.catalog_artifact import load_catalog_artifact
+        return load_catalog_artifact().catalog_index().by_name
+    except (OSError, ValueError) as exc:
+        print(f"[WARNING] Catalog unavailable, product ids left empty ({exc})")
+        return {}
+
+
+def to_invoice_data(record, index, id_prefix, catalog_by_name):
+    """Map a raw record (app or generated-dataset shape) onto the database invoice shape"""
+    products = []
+    for item in record.get('products', []):
+        name = item.get('product_name') or item.get('name')
+        product_id = item.get('product_id')
+        if product_id is None and name:
+            entry = catalog_by_name.get(normalize_text(name))
+            product_id = entry['product'].get('id') if entry else None
+        quantity = item.get('quantity', 0)
+        unit_price = item.get('unit_price', 0)
+        products.append({
+            'product_id': product_id,
+            'product_name': name,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'line_total': item.get('line_total', quantity * unit_price)
+        })
+
+    created_at = record.get('created_at') or record.get('date')
+    if created_at and len(created_at) == 10:
+        created_at += ' 00:00:00'
+
+    return {
+        'invoice_id': record.get('invoice_id') or f"{id_prefix}-{index:06d}",
+        'store_name': record.get('store_name'),
+        'store_key': record.get('store_key') or record.get('store_type'),
+        'total_amount': record.get('total_amount', sum(p['line_total'] for p in products)),
+        'detection_confidence': record.get('detection_confidence', record.get('confidence')),
+        'products': products,
+        'extracted_text': record.get('extracted_text'),
+        'created_at': created_at
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='JSON or NDJSON (.ndjson/.jsonl) invoice file')
+    parser.add_argument('--chunk-size', type=int, default=DB_BULK_CHUNK_SIZE,
+                        help='Invoices per transaction')
+    parser.add_argument('--id-prefix', default=None,
+                        help='Prefix for generated invoice ids (default: file stem)')
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    if not path.exists():
+        print(f"[X] Invoice file not found: {path}")
+        sys.exit(1)
+
+    id_prefix = args.id_prefix or path.stem.upper()
+    catalog_by_name = load_product_ids() if CATALOG_PATH.exists() else {}
+
+    print("=" * 60)
+    print(f"INGESTING INVOICES FROM {path}")
+    print("=" * 60)
+
+    init_database()
+    invoices = (
+        to_invoice_data(record, index, id_prefix, catalog_by_name)
+        for index, record in enumerate(iter_invoice_records(path))
+    )
+
+    start = time.perf_counter()
+    saved = save_invoices_bulk(invoices, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    rate = saved['invoices'] / elapsed if elapsed > 0 else float('inf')
+    line_rate = saved['lines'] / elapsed if elapsed > 0 else float('inf')
+    print(f"[OK] Saved {saved['invoices']} invoices ({saved['lines']} lines) in {elapsed:.2f}s")
+    print(f"   {rate:,.0f} invoices/sec, {line_rate:,.0f} lines/sec (chunk size {args.chunk_size})")
+
+
+if __name__ == '__main__':
+    main()
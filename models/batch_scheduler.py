@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-Batching Scheduler
+Collects single-sample inference requests from concurrent threads into
+batches, so N simultaneous uploads cost one N-image forward pass instead of N.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+class SchedulerClosedError(RuntimeError):
+    """Raised for samples submitted to (or left queued in) a closed scheduler"""
+
+
+class MicroBatchScheduler:
+    """
+    Queue + one worker thread in front of a batched inference function
+
+    submit() enqueues one preprocessed sample and returns a Future. The worker
+    takes the first waiting sample, then keeps collecting until it has
+    max_batch samples or max_wait_ms has passed, runs infer_fn once on the
+    stacked batch and resolves each Future with its own row of the output.
+    """
+
+    def __init__(self, infer_fn, max_batch=16, max_wait_ms=5.0, max_queue=256, name='micro-batch'):
+        """
+        Args:
+            infer_fn: Callable taking an (N, ...) array and returning an (N, ...) array
+                      or a list/tuple of them (multi-output models)
+            max_batch: Largest batch handed to infer_fn
+            max_wait_ms: Longest a sample waits for others to join its batch
+            max_queue: Bound on waiting samples; submit() blocks when full
+        """
+        self.infer_fn = infer_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        # Orders submits against close(), so nothing is queued behind _STOP.
+        # Separate from _lock: a submit may block on a full queue while the worker drains it.
+        self._submit_lock = threading.Lock()
+        self._closed = False
+
+        self._batches = 0
+        self._samples = 0
+        self._largest_batch = 0
+        self._batch_size_counts = {}
+        self._wait_ms_total = 0.0
+        self._infer_ms_total = 0.0
+        self._last_infer_ms = 0.0
+        self._errors = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, sample):
+        """
+        Queue one sample (without batch dimension)
+        Returns:
+            Future resolving to this sample's output row(s)
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise SchedulerClosedError("Scheduler is closed")
+            self._queue.put((np.asarray(sample), future, time.perf_counter()))
+        return future
+
+    def infer(self, sample, timeout=None):
+        """Blocking submit(): returns this sample's output row(s)"""
+        return self.submit(sample).result(timeout)
+
+    def _collect(self, first):
+        """Up to max_batch queued items, waiting at most max_wait; stop is True once _STOP is seen"""
+        batch = [first]
+        stop = False
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True  # Finish this batch first
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = [item], False
+            try:
+                batch, stop = self._collect(item)
+                batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+                if batch:
+                    self._run_batch(batch)
+            except Exception as e:
+                # Keep the worker alive; callers of this batch get the error
+                with self._lock:
+                    self._errors += 1
+                self._fail(batch, e)
+            if stop:
+                break
+        self._fail_leftovers()
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _fail_leftovers(self):
+        """Resolve anything still queued after _STOP, so no caller waits forever"""
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        self._fail(leftovers, SchedulerClosedError("Scheduler closed before the sample was served"))
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        outputs = self.infer_fn(np.stack([sample for sample, _, _ in batch]))
+        finished = time.perf_counter()
+
+        for i, (_, future, _) in enumerate(batch):
+            if isinstance(outputs, (list, tuple)):
+                future.set_result([output[i] for output in outputs])
+            else:
+                future.set_result(outputs[i])
+
+        with self._lock:
+            size = len(batch)
+            self._batches += 1
+            self._samples += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._wait_ms_total += sum((started - enqueued) * 1000 for _, _, enqueued in batch)
+            self._last_infer_ms = (finished - started) * 1000
+            self._infer_ms_total += self._last_infer_ms
+
+    def metrics(self):
+        """Batch size, wait time, inference time and queue depth"""
+        with self._lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'batches': self._batches,
+                'samples': self._samples,
+                'avg_batch_size': round(self._samples / self._batches, 3) if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_size_counts': dict(sorted(self._batch_size_counts.items())),
+                'avg_wait_ms': round(self._wait_ms_total / self._samples, 3) if self._samples else 0.0,
+                'avg_infer_ms': round(self._infer_ms_total / self._batches, 3) if self._batches else 0.0,
+                'last_infer_ms': round(self._last_infer_ms, 3),
+                'errors': self._errors
+            }
+
+    def close(self, timeout=None):
+        """Stop the worker after the queued samples are served; later submits raise SchedulerClosedError"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
@@ -8,22 +8,63 @@ from tensorflow import keras
 from tensorflow.keras import layers
 import numpy as np
 import cv2
-from PIL import Image
-import io
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from config import CNN_BATCH_BUCKETS
+from models.inference import CompiledInference
+from models.preprocessing import preprocess_batch
+from models.batch_scheduler import MicroBatchScheduler, SchedulerClosedError
+from models.text_regions import detect_regions_full, detect_regions_pyramid
+from utils.catalog_artifact import load_catalog_artifact
+
 class CNNInvoiceDetector:
     """
     CNN Model for Invoice Image Detection
     Converts paper invoice images to structured electronic data
     """
 
-    def __init__(self, img_height=224, img_width=224):
+    # Batch sizes the serving function is compiled for (largest = CNN_MAX_BATCH)
+    inference_batch_buckets = CNN_BATCH_BUCKETS
+
+    # Stages timed by predict_invoice_data
+    timed_stages = ('detect', 'text_regions', 'postprocess', 'total')
+
+    def __init__(self, img_height=224, img_width=224, stage_workers=2,
+                 region_mode='full', region_coarse_side=400, region_max_pixels=1_000_000):
+        """
+        Args:
+            stage_workers: Threads that run text-region extraction while the
+                           calling thread runs inference (0 runs them sequentially)
+            region_mode: 'full' (whole-frame detector) or 'pyramid' (row bands
+                         found on a coarse level, refined within region_max_pixels)
+        """
         self.img_height = img_height
         self.img_width = img_width
         self.model = None
         self.feature_extractor = None
+        self.base_model = None
+        self.backbone = None
+        self.head_model = None
+        self._inference = None
+        self._scheduler = None
+        self._batch_timeout = None
+        # Per-thread reusable float32 input buffers (see _input_batch)
+        self._buffers = threading.local()
+        self.stage_workers = stage_workers
+        self.region_mode = region_mode
+        self.region_coarse_side = region_coarse_side
+        self.region_max_pixels = region_max_pixels
+        self._stage_executor = ThreadPoolExecutor(
+            max_workers=stage_workers, thread_name_prefix='cnn-stage'
+        ) if stage_workers > 0 else None
+        self._timing_lock = threading.Lock()
+        self._stage_totals = dict.fromkeys(self.timed_stages, 0.0)
+        self._stage_last = dict.fromkeys(self.timed_stages, 0.0)
+        self._timed_requests = 0
         self.product_catalogs = self._load_product_catalogs()
 
     def build_model(self):
@@ -38,34 +79,128 @@ class CNNInvoiceDetector:
             weights='imagenet'
         )
         base_model.trainable = False  # Freeze base model
+        self.base_model = base_model
 
         # Custom detection head
         inputs = keras.Input(shape=(self.img_height, self.img_width, 3))
 
         # Feature extraction
         x = base_model(inputs, training=False)
-        x = layers.GlobalAveragePooling2D()(x)
+        pooled = layers.GlobalAveragePooling2D()(x)
 
         # Detection layers
-        x = layers.Dense(512, activation='relu')(x)
-        x = layers.Dropout(0.3)(x)
-        x = layers.Dense(256, activation='relu')(x)
-        x = layers.Dropout(0.2)(x)
+        head_layers = [
+            layers.Dense(512, activation='relu'),
+            layers.Dropout(0.3),
+            layers.Dense(256, activation='relu'),
+            layers.Dropout(0.2),
+            # Output: Invoice features (128-dim embedding)
+            layers.Dense(128, activation='relu', name='invoice_features')
+        ]
+        # Additional output: Classification (invoice type detection)
+        type_layer = layers.Dense(10, activation='softmax', name='invoice_type')
 
-        # Output: Invoice features (128-dim embedding)
-        features = layers.Dense(128, activation='relu', name='invoice_features')(x)
+        def head(x):
+            for layer in head_layers:
+                x = layer(x)
+            return x, type_layer(x)
 
-        # Additional output: Classification (invoice type detection)
-        invoice_type = layers.Dense(10, activation='softmax', name='invoice_type')(features)
+        features, invoice_type = head(pooled)
 
         self.model = keras.Model(inputs=inputs, outputs=[features, invoice_type])
         self.feature_extractor = keras.Model(inputs=inputs, outputs=features)
+        # Frozen-backbone training: pooled backbone features in, same head layers (shared weights)
+        self.backbone = keras.Model(inputs=inputs, outputs=pooled)
+        pooled_input = keras.Input(shape=(pooled.shape[-1],))
+        self.head_model = keras.Model(inputs=pooled_input, outputs=list(head(pooled_input)))
+        self._inference = None
 
         return self.model
 
-    def compile_model(self):
-        """Compile model with optimizer and loss"""
-        self.model.compile(
+    def set_backbone_trainable(self, trainable):
+        """Unfreeze (fine-tune) or freeze MobileNetV2; recompile afterwards"""
+        self.base_model.trainable = trainable
+
+    def extract_backbone_features(self, img_batch):
+        """Pooled MobileNetV2 features (N, 1280) for a preprocessed (N, H, W, 3) batch"""
+        return self.backbone(img_batch, training=False).numpy()
+
+    def prepare_inference(self):
+        """Compile the fixed-signature serving function (call once at load time)"""
+        if self.model is None:
+            raise ValueError("Model not built. Call build_model() first.")
+        self._inference = CompiledInference(
+            self.model,
+            (self.img_height, self.img_width, 3),
+            batch_buckets=self.inference_batch_buckets
+        )
+        return self._inference
+
+    def infer(self, img_batch):
+        """
+        Run the compiled model on a preprocessed (N, H, W, 3) batch
+        Returns:
+            (features, invoice_type_probs) arrays with N rows each
+        """
+        if self._inference is None:
+            self.prepare_inference()
+        features, invoice_type_probs = self._inference(img_batch)
+        return features, invoice_type_probs
+
+    def enable_micro_batching(self, max_batch=16, max_wait_ms=5.0, max_queue=256, timeout=30.0):
+        """
+        Route detect_invoice through a MicroBatchScheduler, so concurrent
+        single-image requests are served by shared batched forward passes
+        Args:
+            timeout: Longest a request waits for its batched result (seconds)
+        """
+        previous = self._scheduler
+        self._batch_timeout = timeout
+        self._scheduler = MicroBatchScheduler(
+            self.infer, max_batch=max_batch, max_wait_ms=max_wait_ms,
+            max_queue=max_queue, name='cnn-micro-batch'
+        )
+        # Requests still holding the old scheduler fall back to direct inference
+        if previous is not None:
+            previous.close()
+        return self._scheduler
+
+    def batching_metrics(self):
+        """Micro-batching scheduler metrics (None when disabled)"""
+        return self._scheduler.metrics() if self._scheduler is not None else None
+
+    def _record_stage_timings(self, timings):
+        with self._timing_lock:
+            self._timed_requests += 1
+            for stage, ms in timings.items():
+                self._stage_totals[stage] += ms
+                self._stage_last[stage] = ms
+
+    def reset_stage_metrics(self):
+        """Forget recorded stage timings (e.g. after warm-up)"""
+        with self._timing_lock:
+            self._timed_requests = 0
+            self._stage_totals = dict.fromkeys(self.timed_stages, 0.0)
+            self._stage_last = dict.fromkeys(self.timed_stages, 0.0)
+
+    def stage_metrics(self):
+        """Average and last per-stage latency (ms) of predict_invoice_data"""
+        with self._timing_lock:
+            requests = self._timed_requests
+            return {
+                'concurrent_stages': self._stage_executor is not None,
+                'stage_workers': self.stage_workers,
+                'requests': requests,
+                'avg_ms': {
+                    stage: round(total / requests, 3) if requests else 0.0
+                    for stage, total in self._stage_totals.items()
+                },
+                'last_ms': {stage: round(ms, 3) for stage, ms in self._stage_last.items()}
+            }
+
+    def compile_model(self, model=None):
+        """Compile model (default: the full model, or e.g. head_model) with optimizer and loss"""
+        (model or self.model).compile(
             optimizer=keras.optimizers.Adam(learning_rate=0.01, clipnorm=1.0),  # LR = 0.01 with gradient clipping
             loss={
                 'invoice_features': keras.losses.Huber(delta=1.0),  # Robust to outliers
@@ -81,32 +216,32 @@ class CNNInvoiceDetector:
         """
         Preprocess invoice image for CNN
         Args:
-            image_input: PIL Image, numpy array, or file path
+            image_input: OpenCV (BGR) numpy array, PIL Image, encoded bytes, or file path
         Returns:
-            Preprocessed image tensor
+            Preprocessed (1, H, W, 3) float32 RGB tensor in [0, 1]
         """
-        # Convert to PIL Image if needed
-        if isinstance(image_input, str):
-            img = Image.open(image_input)
-        elif isinstance(image_input, bytes):
-            img = Image.open(io.BytesIO(image_input))
-        elif isinstance(image_input, np.ndarray):
-            img = Image.fromarray(image_input)
-        else:
-            img = image_input
+        return preprocess_batch([image_input], self.img_height, self.img_width)
 
-        # Resize and normalize
-        img = img.convert('RGB')
-        img = img.resize((self.img_width, self.img_height))
-        img_array = np.array(img) / 255.0
-
-        return np.expand_dims(img_array, axis=0)
-
-    def detect_invoice(self, image_input):
+    def _input_batch(self, image_inputs, executor=None):
+        """
+        Preprocess images into this thread's reusable input buffer
+        The returned view is only valid until the thread's next call.
+        """
+        count = len(image_inputs)
+        buffer = getattr(self._buffers, 'batch', None)
+        if buffer is None or buffer.shape[0] < count:
+            capacity = max(count, self.inference_batch_buckets[-1])
+            buffer = np.empty((capacity, self.img_height, self.img_width, 3), dtype=np.float32)
+            self._buffers.batch = buffer
+        return preprocess_batch(image_inputs, self.img_height, self.img_width, out=buffer, executor=executor)
+
+    def detect_invoice(self, image_input, cnn_input=None):
         """
         Detect and extract features from invoice image
         Args:
             image_input: Invoice image
+            cnn_input: Optional ready (H, W, 3) tensor (see preprocessing.decode_image);
+                       skips preprocessing image_input
         Returns:
             Dictionary with extracted features and invoice type
         """
@@ -114,22 +249,59 @@ class CNNInvoiceDetector:
             raise ValueError("Model not built. Call build_model() first.")
 
         # Preprocess
-        img_tensor = self.preprocess_image(image_input)
+        if cnn_input is not None:
+            img_tensor = cnn_input[np.newaxis]
+        else:
+            img_tensor = self._input_batch([image_input])
+
+        # Predict (joins a shared batch when micro-batching is enabled)
+        scheduler = self._scheduler
+        if scheduler is not None:
+            try:
+                feature_vector, type_probabilities = scheduler.infer(img_tensor[0], timeout=self._batch_timeout)
+                return self._detection_result(feature_vector, type_probabilities)
+            except SchedulerClosedError:
+                pass  # Replaced or closed meanwhile: run this one directly
 
-        # Predict
-        features, invoice_type_probs = self.model.predict(img_tensor, verbose=0)
+        features, invoice_type_probs = self.infer(img_tensor)
 
-        # Extract invoice type
-        invoice_type_idx = np.argmax(invoice_type_probs[0])
-        confidence = float(invoice_type_probs[0][invoice_type_idx])
+        return self._detection_result(features[0], invoice_type_probs[0])
+
+    def detect_invoices(self, image_inputs, executor=None, cnn_inputs=None):
+        """
+        Detect many invoices with a single batched forward pass
+        Args:
+            image_inputs: List of invoice images
+            executor: Optional executor used to preprocess the images in parallel
+            cnn_inputs: Optional ready (H, W, 3) tensors, one per image
+        Returns:
+            List of detection dictionaries (same format as detect_invoice), in input order
+        """
+        if self.model is None:
+            raise ValueError("Model not built. Call build_model() first.")
+        if len(image_inputs) == 0:
+            return []
+
+        if cnn_inputs is not None:
+            img_batch = np.stack(cnn_inputs)
+        else:
+            img_batch = self._input_batch(image_inputs, executor=executor)
+        features, invoice_type_probs = self.infer(img_batch)
+
+        return [self._detection_result(features[i], invoice_type_probs[i]) for i in range(len(image_inputs))]
+
+    def _detection_result(self, feature_vector, type_probabilities):
+        """Detection dictionary for one image's model outputs"""
+        invoice_type_idx = np.argmax(type_probabilities)
+        confidence = float(type_probabilities[invoice_type_idx])
 
         return {
-            'features': features[0].tolist(),
+            'features': feature_vector.tolist(),
             'invoice_type': invoice_type_idx,
             'confidence': confidence,
             'raw_output': {
-                'feature_vector': features[0],
-                'type_probabilities': invoice_type_probs[0]
+                'feature_vector': feature_vector,
+                'type_probabilities': type_probabilities
             }
         }
 
@@ -159,60 +331,13 @@ class CNNInvoiceDetector:
                 print("Warning: Invalid image, using dummy data")
                 img = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
 
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-            # Apply multiple preprocessing techniques for better text detection
-            # Method 1: Gaussian blur + Otsu's
-            blur = cv2.GaussianBlur(gray, (5, 5), 0)
-            _, binary1 = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-
-            # Method 2: Morphological gradient for text edges
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
-
-            # Method 3: Adaptive thresholding
-            binary2 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
-
-            # Combine methods
-            combined = cv2.bitwise_or(binary1, binary2)
-            combined = cv2.bitwise_or(combined, (gradient > 50).astype(np.uint8) * 255)
-
-            # Clean up with morphological operations
-            kernel = np.ones((2, 2), np.uint8)
-            combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel, iterations=1)
-            combined = cv2.morphologyEx(combined, cv2.MORPH_OPEN, kernel, iterations=1)
-
-            # Find contours (potential text regions)
-            contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            text_regions = []
             img_h, img_w = img.shape[:2]
-
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                # More sophisticated filtering for text-like regions
-                aspect_ratio = w / max(h, 1)
-                area = w * h
-                relative_area = area / (img_w * img_h)
-
-                # Filter for text-like regions
-                if (w > 15 and h > 8 and  # Minimum size
-                    w < img_w * 0.9 and h < img_h * 0.9 and  # Not full image
-                    aspect_ratio > 0.5 and aspect_ratio < 20 and  # Reasonable aspect ratio
-                    relative_area > 0.0001 and relative_area < 0.5):  # Reasonable relative size
-
-                    text_regions.append({
-                        'x': int(x),
-                        'y': int(y),
-                        'width': int(w),
-                        'height': int(h),
-                        'aspect_ratio': aspect_ratio,
-                        'area': area
-                    })
-
-            # Sort by position (top to bottom, left to right)
-            text_regions.sort(key=lambda r: (r['y'], r['x']))
+            if self.region_mode == 'pyramid':
+                text_regions = detect_regions_pyramid(
+                    img, coarse_side=self.region_coarse_side, max_pixels=self.region_max_pixels
+                )
+            else:
+                text_regions = detect_regions_full(img)
 
             # If no text regions found, create realistic invoice-like regions
             if len(text_regions) == 0:
@@ -248,22 +373,77 @@ class CNNInvoiceDetector:
                 {'x': 120, 'y': 160, 'width': 80, 'height': 25}  # Total
             ]
 
-    def predict_invoice_data(self, image_input):
+    def predict_invoice_data(self, image_input, cnn_input=None):
         """
         Detect invoice and extract structured data
-        
+        cnn_input: optional ready CNN tensor for image_input (see detect_invoice)
+
+        Text-region extraction (OpenCV) runs on the detector's stage pool while
+        this thread runs the CNN; both release the GIL, so latency is close to
+        the slower stage rather than the sum.
         """
         print("\n[CNN] Starting invoice prediction...")
         print(f"[CNN] Image shape: {image_input.shape if hasattr(image_input, 'shape') else 'unknown'}")
+        started = time.perf_counter()
+
+        # Step 2 starts first so it overlaps with Step 1
+        regions_future = None
+        if self._stage_executor is not None:
+            regions_future = self._stage_executor.submit(self._timed, self.extract_text_regions, image_input)
 
         # Step 1: CNN Detection
         print("[CNN] Step 1: Running CNN detection...")
-        detection_result = self.detect_invoice(image_input)
+        try:
+            detection_result, detect_ms = self._timed(self.detect_invoice, image_input, cnn_input=cnn_input)
+        except Exception:
+            if regions_future is not None:
+                regions_future.cancel()
+            raise
+
+        if regions_future is not None:
+            text_regions, regions_ms = regions_future.result()
+        else:
+            text_regions, regions_ms = self._timed(self.extract_text_regions, image_input)
+
+        invoice_data, postprocess_ms = self._timed(
+            self._build_invoice_data, image_input, detection_result, text_regions
+        )
+        self._record_stage_timings({
+            'detect': detect_ms,
+            'text_regions': regions_ms,
+            'postprocess': postprocess_ms,
+            'total': (time.perf_counter() - started) * 1000
+        })
+        return invoice_data
+
+    @staticmethod
+    def _timed(fn, *args, **kwargs):
+        """(fn(*args, **kwargs), elapsed ms)"""
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, (time.perf_counter() - start) * 1000
+
+    def predict_invoice_data_batch(self, image_inputs, executor=None, cnn_inputs=None):
+        """
+        Structured invoice data for many images: one batched CNN pass, then
+        per-image text extraction (mapped over executor when given)
+        Returns:
+            List of invoice dictionaries, in input order
+        """
+        print(f"\n[CNN] Starting batch invoice prediction for {len(image_inputs)} images...")
+        detection_results = self.detect_invoices(image_inputs, executor=executor, cnn_inputs=cnn_inputs)
+
+        mapper = executor.map if executor is not None else map
+        return list(mapper(self._build_invoice_data, image_inputs, detection_results))
+
+    def _build_invoice_data(self, image_input, detection_result, text_regions=None):
+        """Text extraction (unless text_regions is given) and product simulation for one detected invoice"""
         print(f"[CNN] Detection result: invoice_type={detection_result.get('invoice_type', 'N/A')}, confidence={detection_result.get('confidence', 0):.2f}")
 
         # Step 2: Text region extraction
-        print("[CNN] Step 2: Extracting text regions...")
-        text_regions = self.extract_text_regions(image_input)
+        if text_regions is None:
+            print("[CNN] Step 2: Extracting text regions...")
+            text_regions = self.extract_text_regions(image_input)
         print(f"[CNN] Found {len(text_regions)} text regions")
 
         # Step 3: Simulate structured invoice output
@@ -323,8 +503,24 @@ class CNNInvoiceDetector:
 
         return final_confidence
     def _load_product_catalogs(self):
-        """Load product catalogs from JSON file for consistent data."""
+        """
+        Load product catalogs for consistent data.
+        Uses the shared memory-mapped catalog artifact when it is built and
+        current; otherwise parses the JSON. The artifact (and its matcher) is
+        never built here: run `python -m utils.catalog_artifact` offline.
+        """
         catalog_path = Path(__file__).resolve().parent.parent / 'data' / 'product_catalogs.json'
+        try:
+            artifact = load_catalog_artifact(catalog_path, catalog_path.with_suffix('.idx'), rebuild=False)
+            print(f"[CNN] Mapped {artifact.count} products from catalog artifact {artifact.path.name}")
+            return artifact.catalog
+        except FileNotFoundError:
+            print(f"[CNN] WARNING: Product catalog file not found at {catalog_path}")
+            print("[CNN] WARNING: Using empty product catalog!")
+            return []
+        except (OSError, ValueError) as exc:
+            print(f"[CNN] WARNING: Catalog artifact unavailable ({exc}), parsing JSON")
+
         try:
             print(f"[CNN] Loading product catalog from {catalog_path}")
             with catalog_path.open('r', encoding='utf-8') as f:
@@ -396,9 +592,11 @@ class CNNInvoiceDetector:
     def _extract_product_lines(self, text_regions, features, seed=None):
         """
         Extract product lines from text regions with realistic invoice simulation
+        All lines are drawn at once (distinct catalog entries); the same seed
+        always yields the same lines.
         """
-        
-        num_products = np.random.randint(3, 9) if seed is None else (hash(str(seed)) % 6 + 3)
+        rng = np.random.default_rng(seed)
+        num_products = np.random.randint(3, 9) if seed is None else int(rng.integers(3, 9))
 
         print(f"[CNN] Extracting {num_products} products from {len(text_regions)} text regions")
 
@@ -411,54 +609,46 @@ class CNNInvoiceDetector:
             product_catalog = self._default_product_catalog()
 
         feature_array = np.array(features, dtype=float).flatten() if features is not None else np.array([], dtype=float)
-        rng = np.random.default_rng(seed)
-
-        products = []
-        used_indices = set()
         num_products = min(num_products, len(product_catalog))
 
-        for i in range(num_products):
-            # Select product with some randomization but avoid duplicates
-            available_indices = [j for j in range(len(product_catalog)) if j not in used_indices]
-            if not available_indices:
-                available_indices = list(range(len(product_catalog)))  # Reset if all used
-
-            # Choose a random product from the remaining catalog for variety
-            product_idx = int(rng.choice(available_indices))
-            used_indices.add(product_idx)
-
-            product_info = product_catalog[product_idx]
+        # Distinct products for every line in one draw
+        product_indices = rng.choice(len(product_catalog), size=num_products, replace=False)
+        line_numbers = np.arange(num_products)
 
-            # Use region geometry to inform quantity for more stable outputs
-            region_area = 0
-            if text_regions:
+        # Use region geometry to inform quantity for more stable outputs
+        region_areas = np.zeros(num_products)
+        if text_regions:
+            for i in range(num_products):
                 region = text_regions[min(i, len(text_regions) - 1)]
-                region_area = region.get('area') or (region.get('width', 0) * region.get('height', 0))
+                region_areas[i] = region.get('area') or (region.get('width', 0) * region.get('height', 0))
 
-            base_quantity = 12
-            if region_area:
-                area_ratio = region_area / float(self.img_width * self.img_height)
-                base_quantity = int(max(6, min(80, 6 + area_ratio * 320)))
+        area_ratios = region_areas / float(self.img_width * self.img_height)
+        base_quantities = np.where(
+            region_areas > 0,
+            np.clip(6 + area_ratios * 320, 6, 80).astype(int),
+            12
+        )
 
-            if feature_array.size:
-                feature_val = abs(feature_array[i % feature_array.size])
-                fractional = feature_val - np.floor(feature_val)
-            else:
-                fractional = rng.random()
+        if feature_array.size:
+            feature_vals = np.abs(feature_array[line_numbers % feature_array.size])
+            fractional = feature_vals - np.floor(feature_vals)
+        else:
+            fractional = rng.random(num_products)
 
-            feature_scale = 0.85 + fractional * 0.3  # 0.85x - 1.15x scaling
-            quantity = max(5, min(120, int(base_quantity * feature_scale)))
+        feature_scales = 0.85 + fractional * 0.3  # 0.85x - 1.15x scaling
+        quantities = np.clip((base_quantities * feature_scales).astype(int), 5, 120)
 
+        products = []
+        for i, (product_idx, quantity) in enumerate(zip(product_indices.tolist(), quantities.tolist())):
+            product_info = product_catalog[product_idx]
             unit_price = int(product_info.get('price', 10000))
-
             products.append({
                 'product_id': product_info.get('id', f'PRD{1000 + i:03d}'),
                 'product_name': product_info.get('name', 'Unknown Product'),
                 'quantity': quantity,
                 'unit_price': unit_price,
-                'line_total': 0
+                'line_total': quantity * unit_price
             })
-            products[-1]['line_total'] = products[-1]['quantity'] * products[-1]['unit_price']
 
         print(f"[CNN] Successfully extracted {len(products)} products")
         if products:
@@ -478,6 +668,7 @@ class CNNInvoiceDetector:
         self.build_model()
         # Load weights only (not full model)
         self.model.load_weights(path)
+        self.prepare_inference()
         print(f"Model weights loaded from {path}")
 
 
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Backbone Feature Cache
+With MobileNetV2 frozen, its pooled output for a training image never
+changes, so it is computed once and kept in a memory-mapped .npy file.
+Rows are indexed by image path and modification time (a sidecar JSON), so
+edited or regenerated images are recomputed and new images are appended.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FEATURES_FILE = 'backbone_features.npy'
+INDEX_FILE = 'backbone_features.json'
+
+
+class BackboneFeatureCache:
+    """
+    features(paths, extract_fn) -> (N, dim) float32 rows, one per path
+
+    extract_fn receives a list of image paths and returns their (n, dim)
+    features; it is only called for paths missing from the cache (or whose
+    file changed since), batch_size paths at a time.
+    """
+
+    def __init__(self, cache_dir, signature=None, feature_dim=None):
+        """
+        Args:
+            cache_dir: Directory holding the .npy features and JSON index
+            signature: JSON-serializable description of the extractor (model,
+                       input size, preprocessing); a different signature
+                       invalidates the whole cache
+            feature_dim: Width of a feature row, used to shape the result for
+                         an empty path list before anything is cached
+        """
+        self.cache_dir = Path(cache_dir)
+        self.features_path = self.cache_dir / FEATURES_FILE
+        self.index_path = self.cache_dir / INDEX_FILE
+        self.signature = signature
+        self.feature_dim = feature_dim
+
+    def _load_index(self):
+        """{path: [mtime_ns, row]} of the cached rows (empty if missing or stale)"""
+        if not self.index_path.exists() or not self.features_path.exists():
+            return {}
+        with self.index_path.open('r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('signature') != self.signature:
+            logger.info("[CACHE] Feature extractor changed, recomputing all backbone features")
+            return {}
+        return index.get('rows', {})
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path), os.stat(path).st_mtime_ns
+
+    def features(self, image_paths, extract_fn, batch_size=32):
+        """Memory-mapped (or gathered) features for image_paths, computing what is missing"""
+        if len(image_paths) == 0:
+            dim = self.feature_dim
+            if dim is None and self.features_path.exists():
+                dim = np.load(self.features_path, mmap_mode='r').shape[1]
+            return np.empty((0, dim or 0), dtype=np.float32)
+
+        keys = [self._key(path) for path in image_paths]
+        rows = self._load_index()
+
+        missing = []
+        seen = set()
+        for (path, mtime_ns), original in zip(keys, image_paths):
+            cached = rows.get(path)
+            if (cached is None or cached[0] != mtime_ns) and path not in seen:
+                missing.append((path, mtime_ns, original))
+                seen.add(path)
+
+        if missing:
+            logger.info(f"[CACHE] Computing backbone features for {len(missing)} of {len(image_paths)} images")
+            rows = self._append(rows, missing, extract_fn, batch_size)
+        else:
+            logger.info(f"[CACHE] All {len(image_paths)} backbone features cached in {self.features_path}")
+
+        features = np.load(self.features_path, mmap_mode='r')
+        selected = np.fromiter((rows[path][1] for path, _ in keys), dtype=np.int64, count=len(keys))
+        if len(selected) and np.array_equal(selected, np.arange(selected[0], selected[0] + len(selected))):
+            return features[selected[0]:selected[0] + len(selected)]  # Still memory-mapped
+        return features[selected]
+
+    def _append(self, rows, missing, extract_fn, batch_size):
+        """Rewrite the cache with the still-valid rows followed by the newly computed ones"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        recomputed = {path for path, _, _ in missing}
+        kept = {path: entry for path, entry in rows.items() if path not in recomputed}
+
+        old = np.load(self.features_path, mmap_mode='r') if kept else None
+        first = extract_fn([original for _, _, original in missing[:batch_size]])
+        total = len(kept) + len(missing)
+
+        tmp_path = self.features_path.with_suffix('.tmp.npy')
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(total, first.shape[1]))
+
+        new_rows = {}
+        for row, (path, (mtime_ns, old_row)) in enumerate(kept.items()):
+            out[row] = old[old_row]
+            new_rows[path] = [mtime_ns, row]
+        del old
+
+        row = len(kept)
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            features = first if start == 0 else extract_fn([original for _, _, original in chunk])
+            out[row:row + len(chunk)] = features
+            for path, mtime_ns, _ in chunk:
+                new_rows[path] = [mtime_ns, row]
+                row += 1
+            logger.info(f"[CACHE] Extracted {start + len(chunk)}/{len(missing)} images")
+        out.flush()
+        del out
+
+        # Without an index the cache is empty, never pointing at the wrong rows
+        self.index_path.unlink(missing_ok=True)
+        os.replace(tmp_path, self.features_path)
+        tmp_index = self.index_path.with_suffix('.tmp')
+        with tmp_index.open('w', encoding='utf-8') as f:
+            json.dump({'signature': self.signature, 'rows': new_rows}, f)
+        os.replace(tmp_index, self.index_path)
+        return new_rows
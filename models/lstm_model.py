@@ -13,10 +13,24 @@ from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from sklearn.preprocessing import MinMaxScaler
 import pickle
 
+from config import LSTM_BATCH_BUCKETS
+from models.inference import CompiledInference
+from models.timescale_features import (
+    LSTM_SEQUENCE_FEATURES,
+    build_lstm_sequences,
+    sequences_from_snapshot,
+    scaler_arrays,
+    summarize_predictions,
+    failed_predictions
+)
+
 
 class ImportForecastLSTM:
     """LSTM Model for Import Quantity Forecasting"""
     
+    # Batch sizes the serving function is compiled for
+    inference_batch_buckets = LSTM_BATCH_BUCKETS
+    
     def __init__(self, lookback=30, features=5, model_path=None):
         """
         Initialize LSTM model
@@ -25,6 +39,7 @@ class ImportForecastLSTM:
         self.lookback = lookback
         self.features = features
         self.model = None
+        self._inference = None
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         
         if model_path and os.path.exists(model_path):
@@ -69,8 +84,26 @@ class ImportForecastLSTM:
         )
         
         self.model = model
+        self._inference = None
         return model
     
+    def prepare_inference(self):
+        """Compile the fixed-signature serving function (call once at load time)"""
+        if self.model is None:
+            raise ValueError("Model not built. Call build_model() first.")
+        self._inference = CompiledInference(
+            self.model,
+            (self.lookback, self.features),
+            batch_buckets=self.inference_batch_buckets
+        )
+        return self._inference
+    
+    def infer(self, sequences):
+        """Run the compiled model on (N, lookback, features) sequences, returns (N,) outputs"""
+        if self._inference is None:
+            self.prepare_inference()
+        return self._inference(sequences)[:, 0]
+    
     def prepare_sequences(self, data):
         """
         Prepare time-series sequences for LSTM
@@ -137,89 +170,77 @@ class ImportForecastLSTM:
         
         return normalized_data
     
-    def predict_from_timescale_data(self, product_name, product_info, imports_dict, sales_dict):
+    def predict_from_timescale_data(self, product_name, product_info, imports_dict, sales_dict, day_of_week):
         """
         Predict import quantity using timescale data (NEW METHOD for timescale training)
         
+        Args:
+            product_name: Product to forecast
+            product_info: Dict with 'initial_stock' and 'retail_price'
+            imports_dict: Product name -> daily import quantities over the last `lookback` days
+            sales_dict: Product name -> daily sale quantities over the last `lookback` days
+            day_of_week: Weekday (0 = Monday) of each of those days
         """
         try:
-            import numpy as np
-            
             # Extract features (same as training)
-            initial_stock = product_info.get('initial_stock', 0)
-            retail_price = product_info.get('retail_price', 0)
-            import_qty = imports_dict.get(product_name, 0)
-            sale_qty = sales_dict.get(product_name, 0)
-            
-            # Calculate turnover rate
-            denominator = initial_stock + import_qty + 1
-            turnover_rate = sale_qty / denominator
-            turnover_rate = min(max(turnover_rate, 0), 10)  # Clip to [0, 10]
-            
-            # Create feature array [import_qty, sale_qty, initial_stock, retail_price, turnover_rate]
-            features = np.array([[import_qty, sale_qty, initial_stock, retail_price, turnover_rate]])
-            
-            # Normalize using saved scaler
-            normalized_features = self.scaler.transform(features)
-            
-            # Create sequence by repeating features (padding)
-            sequence = np.repeat(normalized_features, self.lookback, axis=0).reshape(1, self.lookback, -1)
-            
-            # Predict
-            prediction_normalized = self.model.predict(sequence, verbose=0)[0][0]
-            
-            # DEBUG: Log raw prediction
-            if import_qty > 10 or sale_qty > 10:  # Only for active products
-                print(f"[DEBUG] Product with import={import_qty}, sales={sale_qty}")
-                print(f"[DEBUG]   Normalized features: {normalized_features[0]}")
-                print(f"[DEBUG]   Raw prediction (normalized): {prediction_normalized}")
-            
-            # Denormalize (inverse transform for first feature - import_qty)
-            temp = np.zeros((1, 5))
-            temp[0, 0] = prediction_normalized
-            prediction_denormalized = self.scaler.inverse_transform(temp)[0, 0]
-            
-            if import_qty > 10 or sale_qty > 10:
-                print(f"[DEBUG]   Denormalized prediction: {prediction_denormalized}")
-                print(f"[DEBUG]   Rounded prediction: {max(0, int(round(prediction_denormalized)))}")
-            
-            # Round to nearest integer (can't import fractional products)
-            predicted_qty = max(0, int(round(prediction_denormalized)))
-            
-            # Calculate confidence based on data availability
-            if import_qty > 0 or sale_qty > 0:
-                # More confidence if we have actual data
-                confidence = 0.75 + 0.2 * min(1.0, (import_qty + sale_qty) / 10)
-            else:
-                # Lower confidence for products with no history
-                confidence = 0.60
-            
-            # Determine trend
-            if predicted_qty > import_qty * 1.1:
-                trend = 'increasing'
-            elif predicted_qty < import_qty * 0.9:
-                trend = 'decreasing'
-            else:
-                trend = 'stable'
-            
-            return {
-                'success': True,
-                'predicted_quantity': predicted_qty,
-                'confidence': min(0.99, confidence),
-                'trend': trend,
-                'historical_import': import_qty,
-                'historical_sales': sale_qty,
-                'recommendation': 'increase' if predicted_qty > import_qty else ('decrease' if predicted_qty < import_qty else 'maintain')
-            }
+            zeros = np.zeros(self.lookback)
+            daily_imports = np.asarray([imports_dict.get(product_name, zeros)], dtype=np.float64)
+            daily_sales = np.asarray([sales_dict.get(product_name, zeros)], dtype=np.float64)
+            sequences = build_lstm_sequences(
+                daily_sales, daily_imports, day_of_week,
+                [product_info.get('initial_stock', 0)],
+                [product_info.get('retail_price', 0)]
+            )
+        except Exception as e:
+            return failed_predictions(1, e)[0]
+        return self._predict_sequences(sequences, daily_imports.sum(axis=1), daily_sales.sum(axis=1))[0]
+    
+    def predict_batch(self, product_names, snapshot):
+        """
+        Predict import quantities for many products with a single forward pass
+        
+        Args:
+            product_names: List of product names
+            snapshot: TimescaleSnapshot providing the historical columns
             
+        Returns:
+            list: One prediction dict per product (same keys as predict_from_timescale_data)
+        """
+        if len(product_names) == 0:
+            return []
+        
+        try:
+            sequences, history = sequences_from_snapshot(product_names, snapshot, self.lookback)
         except Exception as e:
-            return {
-                'success': False,
-                'message': f'Prediction error: {str(e)}',
-                'predicted_quantity': 0,
-                'confidence': 0.0,
-                'trend': 'unknown'
-            }
+            return failed_predictions(len(product_names), e)
+        return self._predict_sequences(sequences, history['import_qty'], history['sale_qty'])
+    
+    def _predict_sequences(self, sequences, import_qty, sale_qty):
+        """Normalize (N, lookback, 7) sequences, run one forward pass and denormalize"""
+        try:
+            if sequences.shape[2] != self.features:
+                raise ValueError(
+                    f"Model expects {self.features} features per step, got {sequences.shape[2]} "
+                    f"({', '.join(LSTM_SEQUENCE_FEATURES)})"
+                )
+            scaler = scaler_arrays(self.scaler)
+            if scaler is None:
+                raise ValueError("LSTM scaler is not fitted")
+            feature_min, feature_scale, target_min, target_scale = scaler
+            
+            # Normalize with the feature scaler fitted on (samples * steps, features)
+            normalized = sequences * feature_scale + feature_min
+            
+            # Predict all products at once
+            predictions_normalized = self.infer(normalized)
+            
+            # Denormalize with the target scaler
+            predictions = (predictions_normalized - target_min[0]) / target_scale[0]
+            
+            return summarize_predictions(predictions, import_qty, sale_qty)
+        
+        except Exception as e:
+            return failed_predictions(len(sequences), e)
     
     def predict_next_quantity(self, historical_data):
         """
@@ -273,7 +294,7 @@ class ImportForecastLSTM:
             X = normalized_data[-self.lookback:].reshape(1, self.lookback, -1)
             
             # Predict
-            prediction_normalized = self.model.predict(X, verbose=0)[0][0]
+            prediction_normalized = self.infer(X)[0]
             
             # Denormalize prediction
             # Create array with same shape as original features
@@ -372,6 +393,7 @@ class ImportForecastLSTM:
         self.build_model()
         # Load weights
         self.model.load_weights(path)
+        self.prepare_inference()
         
         # Load scaler
         scaler_path = path.replace('.h5', '_scaler.pkl')
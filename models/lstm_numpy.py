@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy LSTM Inference Engine
+Replays the stacked LSTM / BatchNorm / Dense network of ImportForecastLSTM
+from an exported .npz file, so forecast-only workers never import TensorFlow.
+
+Export the trained weights (and check them against Keras) with:
+    python -m models.lstm_numpy
+"""
+import json
+
+import numpy as np
+
+from models.timescale_features import (
+    LSTM_SEQUENCE_FEATURES,
+    sequences_from_snapshot,
+    scaler_arrays,
+    summarize_predictions,
+    failed_predictions
+)
+
+NPZ_FORMAT_VERSION = 1
+
+# Largest allowed |Keras - NumPy| difference after export, relative to the output magnitude (at least 1)
+PARITY_TOLERANCE = 1e-4
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': _relu,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+}
+
+
+def _check_feature_count(features):
+    """Reject models whose input width differs from the sequences predict_batch builds"""
+    if features != len(LSTM_SEQUENCE_FEATURES):
+        raise ValueError(
+            f"LSTM expects {features} features per step, but predict_batch builds "
+            f"{len(LSTM_SEQUENCE_FEATURES)} ({', '.join(LSTM_SEQUENCE_FEATURES)})"
+        )
+
+
+def check_parity(lstm_model, engine, num_samples=64, seed=0):
+    """
+    Compare the Keras model and the NumPy engine on the same normalized sequences
+    Returns: largest absolute difference between the two outputs
+    Raises: ValueError when it exceeds PARITY_TOLERANCE
+    """
+    rng = np.random.default_rng(seed)
+    sequences = rng.random((num_samples, engine.lookback, engine.features), dtype=np.float32)
+    keras_outputs = np.asarray(lstm_model.infer(sequences), dtype=np.float64)
+    numpy_outputs = engine.infer(sequences).astype(np.float64)
+
+    max_diff = float(np.max(np.abs(keras_outputs - numpy_outputs)))
+    if max_diff > PARITY_TOLERANCE * max(1.0, float(np.max(np.abs(keras_outputs)))):
+        raise ValueError(f"NumPy LSTM diverges from Keras: max |diff| = {max_diff:.2e} > {PARITY_TOLERANCE:.0e}")
+    return max_diff
+
+
+def export_lstm_npz(lstm_model, path, verify=True):
+    """
+    Dump the trained weights, batch-norm statistics and scaler of an ImportForecastLSTM
+    Args:
+        lstm_model: ImportForecastLSTM with a built (and usually loaded) Keras model
+        path: Destination .npz file
+        verify: Reload the file and check it against the Keras model (check_parity)
+    """
+    _check_feature_count(lstm_model.features)
+    arrays = {}
+    layer_specs = []
+
+    for layer in lstm_model.model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        prefix = f'layer{len(layer_specs)}_'
+
+        if kind == 'LSTM':
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            arrays[prefix + 'kernel'] = kernel
+            arrays[prefix + 'recurrent_kernel'] = recurrent_kernel
+            arrays[prefix + 'bias'] = bias
+            layer_specs.append({
+                'type': 'lstm',
+                'units': config['units'],
+                'return_sequences': config['return_sequences'],
+                'activation': config['activation'],
+                'recurrent_activation': config['recurrent_activation'],
+            })
+        elif kind == 'BatchNormalization':
+            gamma = layer.gamma.numpy() if layer.gamma is not None else 1.0
+            beta = layer.beta.numpy() if layer.beta is not None else 0.0
+            mean = layer.moving_mean.numpy()
+            variance = layer.moving_variance.numpy()
+            # Fold inference-time batch norm into one multiply-add
+            multiplier = gamma / np.sqrt(variance + config['epsilon'])
+            arrays[prefix + 'multiplier'] = multiplier.astype(np.float32)
+            arrays[prefix + 'offset'] = (beta - mean * multiplier).astype(np.float32)
+            layer_specs.append({'type': 'batchnorm'})
+        elif kind == 'Dense':
+            kernel, bias = layer.get_weights()
+            arrays[prefix + 'kernel'] = kernel
+            arrays[prefix + 'bias'] = bias
+            layer_specs.append({'type': 'dense', 'activation': config['activation']})
+        elif kind in ('Dropout', 'InputLayer'):
+            # Identity at inference time
+            continue
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+
+    scaler = scaler_arrays(lstm_model.scaler)
+    if scaler is None:
+        print("[WARNING] No fitted scaler found; exporting identity scaling")
+        scaler = (np.zeros(lstm_model.features), np.ones(lstm_model.features), np.zeros(1), np.ones(1))
+    arrays['feature_min'], arrays['feature_scale'], arrays['target_min'], arrays['target_scale'] = scaler
+
+    arrays['metadata'] = np.array(json.dumps({
+        'format_version': NPZ_FORMAT_VERSION,
+        'lookback': lstm_model.lookback,
+        'features': lstm_model.features,
+        'layers': layer_specs,
+    }))
+
+    np.savez_compressed(path, **arrays)
+    print(f"NumPy LSTM weights exported to {path}")
+
+    if verify:
+        max_diff = check_parity(lstm_model, NumpyLSTMEngine(path))
+        print(f"NumPy LSTM parity check passed (max |diff| = {max_diff:.2e})")
+
+
+class NumpyLSTMEngine:
+    """
+    TensorFlow-free forward pass of the exported LSTM stack
+    Exposes the serving API of ImportForecastLSTM (infer, predict_batch).
+    """
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            if metadata.get('format_version') != NPZ_FORMAT_VERSION:
+                raise ValueError(f"Unsupported NumPy LSTM format: {metadata.get('format_version')}")
+
+            _check_feature_count(metadata['features'])
+            self.lookback = metadata['lookback']
+            self.features = metadata['features']
+            self.layers = []
+            for i, spec in enumerate(metadata['layers']):
+                prefix = f'layer{i}_'
+                weights = {
+                    key[len(prefix):]: data[key].astype(np.float32)
+                    for key in data.files if key.startswith(prefix)
+                }
+                self.layers.append((spec, weights))
+
+            self.feature_min = data['feature_min']
+            self.feature_scale = data['feature_scale']
+            self.target_min = data['target_min']
+            self.target_scale = data['target_scale']
+
+        self.path = str(path)
+
+    @property
+    def model(self):
+        """Layer stack (mirrors ImportForecastLSTM.model for readiness checks)"""
+        return self.layers
+
+    def _lstm(self, x, spec, weights):
+        units = spec['units']
+        activation = ACTIVATIONS[spec['activation']]
+        recurrent_activation = ACTIVATIONS[spec['recurrent_activation']]
+        recurrent_kernel = weights['recurrent_kernel']
+
+        batch_size, timesteps, _ = x.shape
+        # Input projections for every timestep at once: (N, T, 4 * units)
+        projected = x @ weights['kernel'] + weights['bias']
+
+        h = np.zeros((batch_size, units), dtype=np.float32)
+        c = np.zeros((batch_size, units), dtype=np.float32)
+        outputs = []
+        for t in range(timesteps):
+            z = projected[:, t] + h @ recurrent_kernel
+            # Gate order matches Keras: input, forget, cell, output
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if spec['return_sequences']:
+                outputs.append(h)
+
+        return np.stack(outputs, axis=1) if spec['return_sequences'] else h
+
+    def infer(self, sequences):
+        """Run the network on (N, lookback, features) sequences, returns (N,) outputs"""
+        x = np.asarray(sequences, dtype=np.float32)
+        if x.shape[1:] != (self.lookback, self.features):
+            raise ValueError(f"Expected input shape (N, {self.lookback}, {self.features}), got {x.shape}")
+
+        for spec, weights in self.layers:
+            if spec['type'] == 'lstm':
+                x = self._lstm(x, spec, weights)
+            elif spec['type'] == 'batchnorm':
+                x = x * weights['multiplier'] + weights['offset']
+            elif spec['type'] == 'dense':
+                x = ACTIVATIONS[spec['activation']](x @ weights['kernel'] + weights['bias'])
+        return x[:, 0]
+
+    def predict_batch(self, product_names, snapshot):
+        """
+        Predict import quantities for many products (same contract as ImportForecastLSTM.predict_batch)
+        """
+        if len(product_names) == 0:
+            return []
+
+        try:
+            sequences, history = sequences_from_snapshot(product_names, snapshot, self.lookback)
+            normalized = sequences * self.feature_scale + self.feature_min
+            predictions_normalized = self.infer(normalized).astype(np.float64)
+            predictions = (predictions_normalized - self.target_min[0]) / self.target_scale[0]
+            return summarize_predictions(predictions, history['import_qty'], history['sale_qty'])
+        except Exception as e:
+            return failed_predictions(len(product_names), e)
+
+
+if __name__ == '__main__':
+    # Export the trained Keras weights for TensorFlow-free serving
+    from config import LSTM_MODEL_PATH, LSTM_NUMPY_PATH, LSTM_SEQUENCE_LENGTH, LSTM_NUM_FEATURES
+    from models.lstm_model import ImportForecastLSTM
+
+    model = ImportForecastLSTM(lookback=LSTM_SEQUENCE_LENGTH, features=LSTM_NUM_FEATURES)
+    model.load_model(str(LSTM_MODEL_PATH))
+    export_lstm_npz(model, str(LSTM_NUMPY_PATH))
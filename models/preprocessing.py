@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Image Preprocessing
+OpenCV-only path from a decoded image to the CNN's float32 RGB input:
+area-interpolated resize of the uint8 buffer, in-place BGR -> RGB swap, and
+one float32 scaling pass written straight into a (possibly preallocated)
+batch buffer. Matches the training normalization (RGB, [0, 1]).
+
+decode_image() additionally decodes uploads at reduced resolution: a capped
+working image for text-region detection plus the tiny CNN tensor.
+"""
+import io
+from collections import namedtuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+_SCALE = np.float32(255.0)
+
+# JPEG DCT-domain downscaling factors supported by cv2.imdecode
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+DecodedImage = namedtuple('DecodedImage', ['image', 'cnn_input', 'original_size', 'scale'])
+
+
+def load_image(image_input):
+    """
+    Bring any supported input to a uint8 3-channel array
+    Args:
+        image_input: BGR ndarray (as decoded by OpenCV), grayscale/BGRA ndarray,
+                     encoded bytes, file path, or PIL Image
+    Returns:
+        (array, is_rgb): PIL inputs are already RGB, everything else is BGR
+    """
+    if isinstance(image_input, str):
+        img = cv2.imread(image_input, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Could not read image from path: {image_input}")
+        return img, False
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(image_input, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image bytes")
+        return img, False
+    if hasattr(image_input, 'convert'):
+        # PIL Image
+        return np.asarray(image_input.convert('RGB')), True
+
+    img = np.asarray(image_input)
+    if img.dtype != np.uint8:
+        # Float images in [0, 1] or [0, 255]
+        scale = 255.0 if img.size and img.max() <= 1.0 else 1.0
+        img = np.clip(img * scale, 0, 255).astype(np.uint8)
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    elif img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img, False
+
+
+def preprocess_into(image_input, out):
+    """
+    Preprocess one image into out, a (height, width, 3) float32 view
+    Only the resized uint8 image is allocated; the full-size input is never copied.
+    """
+    height, width = out.shape[:2]
+    img, is_rgb = load_image(image_input)
+
+    resized = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    if not is_rgb:
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+    np.divide(resized, _SCALE, out=out)
+    return out
+
+
+def preprocess_batch(image_inputs, height, width, out=None, executor=None):
+    """
+    Preprocess many images into one (N, height, width, 3) float32 batch
+    Args:
+        image_inputs: Sequence of images (see load_image)
+        out: Optional preallocated float32 buffer with at least N rows
+        executor: Optional executor to preprocess images in parallel
+    Returns:
+        The first N rows of out (a view when out is given)
+    """
+    count = len(image_inputs)
+    if out is None:
+        out = np.empty((count, height, width, 3), dtype=np.float32)
+    elif out.shape[0] < count or out.shape[1:] != (height, width, 3) or out.dtype != np.float32:
+        raise ValueError(f"Buffer of shape {out.shape} cannot hold {count} images of {height}x{width}x3")
+
+    if executor is not None and count > 1:
+        list(executor.map(preprocess_into, image_inputs, [out[i] for i in range(count)]))
+    else:
+        for i, image_input in enumerate(image_inputs):
+            preprocess_into(image_input, out[i])
+    return out[:count]
+
+
+def image_header_size(data):
+    """
+    (width, height, format) read from the encoded header without decoding pixels
+    Returns (None, None, None) when the header is not recognized.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            return header.width, header.height, header.format
+    except Exception:
+        return None, None, None
+
+
+def reduced_decode_factor(width, height, max_side):
+    """Largest JPEG reduction factor that keeps the long side at or above max_side"""
+    long_side = max(width, height)
+    factor = 1
+    for candidate in sorted(REDUCED_DECODE_FLAGS):
+        if long_side // candidate >= max_side:
+            factor = candidate
+    return factor
+
+
+def decode_image(data, max_side, cnn_height, cnn_width):
+    """
+    Decode an upload at the resolution the pipeline actually needs
+    JPEGs are decoded with DCT scaling (IMREAD_REDUCED_COLOR_*) chosen from the
+    header dimensions; the result is then capped to max_side on its long side
+    with area interpolation. The CNN tensor is made from that working image.
+    Args:
+        data: Encoded image bytes
+        max_side: Cap on the working image's long side (text-region detection)
+        cnn_height, cnn_width: CNN input size
+    Returns:
+        DecodedImage(image, cnn_input, original_size, scale) or None if undecodable;
+        image is BGR uint8, cnn_input a (cnn_height, cnn_width, 3) float32 RGB tensor,
+        scale the working / original size ratio
+    """
+    buffer = np.frombuffer(data, np.uint8)
+    width, height, image_format = image_header_size(data)
+
+    flag = cv2.IMREAD_COLOR
+    if image_format == 'JPEG' and width and height:
+        factor = reduced_decode_factor(width, height, max_side)
+        flag = REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR)
+
+    img = cv2.imdecode(buffer, flag)
+    if img is None:
+        return None
+
+    if not width or not height:
+        height, width = img.shape[:2]
+    long_side = max(img.shape[:2])
+    if long_side > max_side:
+        ratio = max_side / long_side
+        size = (max(1, round(img.shape[1] * ratio)), max(1, round(img.shape[0] * ratio)))
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    cnn_input = preprocess_into(img, np.empty((cnn_height, cnn_width, 3), dtype=np.float32))
+    scale = max(img.shape[:2]) / max(width, height)
+    return DecodedImage(img, cnn_input, (width, height), scale)
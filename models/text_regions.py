@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Text-Region Detection
+OpenCV detectors behind CNNInvoiceDetector.extract_text_regions. Both return
+region dicts ({'x', 'y', 'width', 'height', 'aspect_ratio', 'area'}, in input
+image pixels, sorted top to bottom):
+
+- detect_regions_full: the three binarizations + morphology + contours over
+  the whole frame; cost grows with megapixels.
+- detect_regions_pyramid: finds text row bands on a small pyramid level and
+  runs the full-frame pipeline only on those bands, at a resolution chosen so
+  the refined pixels stay under a fixed budget.
+
+Pyramid levels use integer reduction factors, which hit OpenCV's fast
+INTER_AREA path (a non-integer area resize of a 12 MP frame costs more than
+the whole detector at 1 MP).
+"""
+import math
+
+import cv2
+import numpy as np
+
+_GRADIENT_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_CLEANUP_KERNEL = np.ones((2, 2), np.uint8)
+
+
+def _gray(img):
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _downscale(img, factor):
+    """Area-average by an integer factor (trailing rows/columns that do not fill a block are dropped)"""
+    if factor <= 1:
+        return img
+    h, w = img.shape[0] // factor, img.shape[1] // factor
+    return cv2.resize(img[:h * factor, :w * factor], (w, h), interpolation=cv2.INTER_AREA)
+
+
+def text_mask(gray):
+    """Binary mask (255 = ink) combining Otsu, adaptive threshold and morphological gradient"""
+    # Method 1: Gaussian blur + Otsu's
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary1 = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    # Method 2: Morphological gradient for text edges
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, _GRADIENT_KERNEL)
+
+    # Method 3: Adaptive thresholding
+    binary2 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+
+    # Combine methods
+    combined = cv2.bitwise_or(binary1, binary2)
+    combined = cv2.bitwise_or(combined, (gradient > 50).astype(np.uint8) * 255)
+
+    # Clean up with morphological operations
+    combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, _CLEANUP_KERNEL, iterations=1)
+    combined = cv2.morphologyEx(combined, cv2.MORPH_OPEN, _CLEANUP_KERNEL, iterations=1)
+    return combined
+
+
+def _is_text_like(w, h, img_w, img_h):
+    """Size/shape filter for a bounding box, in the pixels of the image it was found in"""
+    aspect_ratio = w / max(h, 1)
+    relative_area = (w * h) / (img_w * img_h)
+    return (w > 15 and h > 8 and  # Minimum size
+            w < img_w * 0.9 and h < img_h * 0.9 and  # Not full image
+            aspect_ratio > 0.5 and aspect_ratio < 20 and  # Reasonable aspect ratio
+            relative_area > 0.0001 and relative_area < 0.5)  # Reasonable relative size
+
+
+def _region(x, y, w, h):
+    x, y, w, h = int(x), int(y), int(w), int(h)
+    return {
+        'x': x,
+        'y': y,
+        'width': w,
+        'height': h,
+        'aspect_ratio': w / max(h, 1),
+        'area': w * h
+    }
+
+
+def detect_regions_full(img):
+    """Text regions from the whole frame at its own resolution"""
+    contours, _ = cv2.findContours(text_mask(_gray(img)), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    img_h, img_w = img.shape[:2]
+
+    text_regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if _is_text_like(w, h, img_w, img_h):
+            text_regions.append(_region(x, y, w, h))
+
+    # Sort by position (top to bottom, left to right)
+    text_regions.sort(key=lambda r: (r['y'], r['x']))
+    return text_regions
+
+
+def find_row_bands(gray, min_ink=0.01, max_gap=2, pad=2):
+    """
+    Row intervals [start, end) that contain text on a (small) grayscale image
+    Rows with at least min_ink of their pixels inked are kept; runs separated
+    by at most max_gap empty rows are merged and padded by pad rows.
+    """
+    blur = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, ink = cv2.threshold(blur, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    profile = ink.mean(axis=1)
+    inked = np.flatnonzero(profile >= min_ink)
+    if inked.size == 0:
+        return []
+
+    # Split the inked rows wherever the gap is wider than max_gap
+    breaks = np.flatnonzero(np.diff(inked) > max_gap + 1)
+    starts = np.concatenate(([inked[0]], inked[breaks + 1]))
+    ends = np.concatenate((inked[breaks], [inked[-1]])) + 1
+
+    rows = gray.shape[0]
+    bands = []
+    for start, end in zip(np.maximum(starts - pad, 0), np.minimum(ends + pad, rows)):
+        if bands and start <= bands[-1][1]:
+            bands[-1] = (bands[-1][0], int(end))
+        else:
+            bands.append((int(start), int(end)))
+    return bands
+
+
+def detect_regions_pyramid(img, coarse_side=400, max_pixels=1_000_000):
+    """
+    Text regions from row bands found on a coarse level and refined at higher resolution
+    Images that already fit max_pixels go straight to detect_regions_full, which
+    includes the upload routes' working images (long side <= DECODE_MAX_SIDE).
+    Args:
+        img: BGR (or grayscale) uint8 image
+        coarse_side: Long side (at most) of the level used to find row bands
+        max_pixels: Ceiling on pixels run through the full pipeline across all bands
+    Returns:
+        Region dicts in img's pixel coordinates, sorted top to bottom
+    """
+    img_h, img_w = img.shape[:2]
+    if img_h * img_w <= max_pixels:
+        return detect_regions_full(img)
+
+    coarse_factor = max(1, math.ceil(max(img_h, img_w) / coarse_side))
+    coarse = _gray(_downscale(img, coarse_factor))
+    bands = find_row_bands(coarse)
+    if not bands:
+        bands = [(0, coarse.shape[0])]
+
+    # Band rows in input pixels, then the smallest reduction that fits the budget
+    bands = [(start * coarse_factor, min(img_h, end * coarse_factor)) for start, end in bands]
+    band_pixels = sum(end - start for start, end in bands) * img_w
+    factor = min(coarse_factor, max(1, math.ceil(math.sqrt(band_pixels / max_pixels))))
+
+    # The size filter sees the boxes as detect_regions_full would on the reduced frame
+    frame_w = img_w // factor
+    frame_h = img_h // factor
+
+    text_regions = []
+    for start, end in bands:
+        band = _gray(_downscale(img[start:end], factor))
+        if band.shape[0] < 3:
+            continue
+        contours, _ = cv2.findContours(text_mask(band), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if _is_text_like(w, h, frame_w, frame_h):
+                text_regions.append(_region(x * factor, start + y * factor, w * factor, h * factor))
+
+    text_regions.sort(key=lambda r: (r['y'], r['x']))
+    return text_regions
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Timescale Features
+Builds LSTM inputs from timescale snapshot columns and turns raw
+predictions into forecast dictionaries. NumPy only (no TensorFlow).
+"""
+import numpy as np
+
+# Column order of each timestep of an LSTM input sequence (matches train_lstm_model.create_sequences)
+LSTM_SEQUENCE_FEATURES = (
+    'sale_qty', 'day_of_week', 'is_weekend', 'cumulative_sales',
+    'days_since_import', 'initial_stock', 'retail_price'
+)
+
+
+def build_lstm_sequences(recent_sales, recent_imports, day_of_week, initial_stock, retail_price):
+    """
+    Build the (N, T, 7) LSTM input sequences, the same features train_lstm_model.py trains on
+    Args:
+        recent_sales: (N, T) daily sale quantities, oldest day first
+        recent_imports: (N, T) daily import quantities, oldest day first
+        day_of_week: (T,) weekday of each day (0 = Monday)
+        initial_stock: (N,) initial stock per product
+        retail_price: (N,) retail price per product
+    Returns:
+        (N, T, 7) float64 array in LSTM_SEQUENCE_FEATURES order
+    """
+    recent_sales = np.asarray(recent_sales, dtype=np.float64)
+    recent_imports = np.asarray(recent_imports, dtype=np.float64)
+    day_of_week = np.asarray(day_of_week, dtype=np.float64)
+    num_products, timesteps = recent_sales.shape
+    if recent_imports.shape != recent_sales.shape or day_of_week.shape != (timesteps,):
+        raise ValueError(
+            f"Daily history shapes do not match: sales {recent_sales.shape}, "
+            f"imports {recent_imports.shape}, day_of_week {day_of_week.shape}"
+        )
+
+    # Days since the last import inside the window, 999 before the first one
+    steps = np.arange(timesteps)
+    last_import = np.maximum.accumulate(np.where(recent_imports > 0, steps, -1), axis=1)
+    days_since_import = np.where(last_import >= 0, steps - last_import, 999)
+
+    per_day = (num_products, timesteps)
+    return np.stack([
+        recent_sales,
+        np.broadcast_to(day_of_week / 6.0, per_day),
+        np.broadcast_to((day_of_week >= 5).astype(np.float64), per_day),
+        np.cumsum(recent_sales, axis=1),
+        np.minimum(days_since_import, 30) / 30.0,
+        np.broadcast_to(np.asarray(initial_stock, dtype=np.float64)[:, np.newaxis], per_day),
+        np.broadcast_to(np.asarray(retail_price, dtype=np.float64)[:, np.newaxis], per_day),
+    ], axis=2)
+
+
+def sequences_from_snapshot(product_names, snapshot, lookback):
+    """
+    Build LSTM input sequences for a batch of product names from a TimescaleSnapshot
+    Returns: (sequences, history) where history is the snapshot.gather() dict
+    """
+    history = snapshot.gather(product_names)
+    if history['recent_sales'].shape[1] != lookback:
+        raise ValueError(
+            f"Snapshot holds {history['recent_sales'].shape[1]} days of history, model expects {lookback}"
+        )
+    sequences = build_lstm_sequences(
+        history['recent_sales'], history['recent_imports'], snapshot.window_day_of_week,
+        history['initial_stock'], history['retail_price']
+    )
+    return sequences, history
+
+
+def scaler_arrays(scaler):
+    """
+    Extract MinMaxScaler parameters as (feature_min, feature_scale, target_min, target_scale)
+    Supports the {'feature_scaler', 'target_scaler'} dict written by train_lstm_model.py
+    and a single fitted MinMaxScaler (target = first feature).
+    Returns None when no fitted scaler is available.
+    """
+    if isinstance(scaler, dict):
+        feature_scaler = scaler.get('feature_scaler')
+        target_scaler = scaler.get('target_scaler')
+    else:
+        feature_scaler = target_scaler = scaler
+
+    if not hasattr(feature_scaler, 'scale_') or not hasattr(target_scaler, 'scale_'):
+        return None
+
+    return (
+        np.asarray(feature_scaler.min_, dtype=np.float64),
+        np.asarray(feature_scaler.scale_, dtype=np.float64),
+        np.asarray(target_scaler.min_[:1], dtype=np.float64),
+        np.asarray(target_scaler.scale_[:1], dtype=np.float64),
+    )
+
+
+def summarize_predictions(predicted, import_qty, sale_qty):
+    """
+    Convert denormalized predictions into forecast dictionaries
+    Args:
+        predicted: (N,) denormalized import quantities
+        import_qty: (N,) historical import totals per product
+        sale_qty: (N,) historical sale totals per product
+    Returns:
+        list of dicts, one per product
+    """
+    # Round to nearest integer (can't import fractional products)
+    predicted_qty = np.maximum(0, np.round(predicted)).astype(np.int64)
+    import_qty = np.asarray(import_qty, dtype=np.float64)
+    sale_qty = np.asarray(sale_qty, dtype=np.float64)
+
+    # More confidence if we have actual data, lower for products with no history
+    has_history = (import_qty > 0) | (sale_qty > 0)
+    confidence = np.where(
+        has_history,
+        0.75 + 0.2 * np.minimum(1.0, (import_qty + sale_qty) / 10),
+        0.60
+    )
+    confidence = np.minimum(0.99, confidence)
+
+    results = []
+    for i in range(len(predicted_qty)):
+        qty = int(predicted_qty[i])
+        historical_import = import_qty[i]
+
+        # Determine trend
+        if qty > historical_import * 1.1:
+            trend = 'increasing'
+        elif qty < historical_import * 0.9:
+            trend = 'decreasing'
+        else:
+            trend = 'stable'
+
+        results.append({
+            'success': True,
+            'predicted_quantity': qty,
+            'confidence': float(confidence[i]),
+            'trend': trend,
+            'historical_import': int(historical_import),
+            'historical_sales': int(sale_qty[i]),
+            'recommendation': 'increase' if qty > historical_import else ('decrease' if qty < historical_import else 'maintain')
+        })
+    return results
+
+
+def failed_predictions(count, error):
+    """Error dictionaries matching the single-product prediction contract"""
+    return [{
+        'success': False,
+        'message': f'Prediction error: {str(error)}',
+        'predicted_quantity': 0,
+        'confidence': 0.0,
+        'trend': 'unknown'
+    } for _ in range(count)]
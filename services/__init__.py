@@ -5,17 +5,41 @@ from .model_loader import (
     initialize_models,
     get_cnn_model,
     get_lstm_model,
-    get_models_info
+    get_models_info,
+    get_cnn_batching_metrics,
+    get_cnn_stage_metrics
 )
 
 from .invoice_service import (
     process_invoice_image,
+    process_invoice_images,
     format_invoice_response,
     get_invoice_history,
+    get_last_invoice,
     clear_invoice_history,
     get_history_count
 )
 
+from .persistence_queue import (
+    persist_invoice,
+    persist_forecast,
+    flush_pending_writes,
+    get_persistence_metrics
+)
+
+from .detection_cache import (
+    get_cached_detection,
+    get_similar_detection,
+    cache_detection,
+    clear_detection_cache,
+    get_detection_cache_metrics
+)
+
+from .timescale_snapshot import (
+    get_timescale_snapshot,
+    refresh_timescale_snapshot
+)
+
 from .forecast_service import (
     parse_manual_invoice_data,
     forecast_quantity,
@@ -28,14 +52,35 @@ __all__ = [
     'get_cnn_model',
     'get_lstm_model',
     'get_models_info',
+    'get_cnn_batching_metrics',
+    'get_cnn_stage_metrics',
     
     # Invoice service
     'process_invoice_image',
+    'process_invoice_images',
     'format_invoice_response',
     'get_invoice_history',
+    'get_last_invoice',
     'clear_invoice_history',
     'get_history_count',
     
+    # Persistence queue
+    'persist_invoice',
+    'persist_forecast',
+    'flush_pending_writes',
+    'get_persistence_metrics',
+    
+    # Detection result cache
+    'get_cached_detection',
+    'get_similar_detection',
+    'cache_detection',
+    'clear_detection_cache',
+    'get_detection_cache_metrics',
+    
+    # Timescale snapshot
+    'get_timescale_snapshot',
+    'refresh_timescale_snapshot',
+    
     # Forecast service
     'parse_manual_invoice_data',
     'forecast_quantity',
@@ -0,0 +1,221 @@
+"""
+Detection Result Cache
+Staff re-upload the same scan after a network hiccup or page refresh. Results
+of /api/model1/detect are cached by the SHA-256 of the raw upload (and,
+optionally, a perceptual hash of the decoded image for re-encoded or resized
+copies), so a repeat returns the stored invoice without decoding, inference
+or a second database row.
+
+The cache is a bounded LRU with a TTL and a cap on the estimated size of
+the cached invoice dicts.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from config import (
+    DETECT_CACHE_ENABLED, DETECT_CACHE_MAX_ENTRIES, DETECT_CACHE_MAX_BYTES,
+    DETECT_CACHE_TTL_SECONDS, DETECT_CACHE_PERCEPTUAL, DETECT_CACHE_PHASH_MAX_DISTANCE
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def content_key(data):
+    """SHA-256 hex digest of the raw upload bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(image, hash_size=16):
+    """
+    256-bit difference hash (dHash) of a BGR/grayscale image
+    Stable under re-encoding, rescaling and mild brightness changes.
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _estimated_size(invoice_data):
+    return len(json.dumps(invoice_data, default=str, ensure_ascii=False).encode('utf-8'))
+
+
+class DetectionResultCache:
+    """
+    LRU of invoice_data keyed by content hash
+
+    get()/get_similar() return deep copies, so callers may decorate the
+    result (e.g. format it for a response) without touching the cached entry.
+    """
+
+    def __init__(self, max_entries=DETECT_CACHE_MAX_ENTRIES, max_bytes=DETECT_CACHE_MAX_BYTES,
+                 ttl_seconds=DETECT_CACHE_TTL_SECONDS, perceptual=DETECT_CACHE_PERCEPTUAL,
+                 phash_max_distance=DETECT_CACHE_PHASH_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.perceptual = perceptual
+        self.phash_max_distance = phash_max_distance
+        self._entries = OrderedDict()  # key -> (invoice_data, phash, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._counters = {
+            'hits': 0,
+            'perceptual_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'rejected_too_large': 0,
+        }
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _remove(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        """Cached invoice_data for an exact upload hash, or None (counts a miss)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[3], now):
+                self._remove(key)
+                self._counters['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            invoice_data = entry[0]
+        return copy.deepcopy(invoice_data)
+
+    def get_similar(self, phash):
+        """
+        Cached invoice_data whose perceptual hash is within phash_max_distance bits
+        A hit turns the preceding exact-key miss into a perceptual hit.
+        """
+        if phash is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.phash_max_distance + 1
+            for key, (_, entry_phash, _, stored_at) in self._entries.items():
+                if entry_phash is None or self._expired(stored_at, now):
+                    continue
+                distance = (entry_phash ^ phash).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self._counters['misses'] -= 1
+            self._counters['perceptual_hits'] += 1
+            invoice_data = self._entries[best_key][0]
+        return copy.deepcopy(invoice_data)
+
+    def put(self, key, invoice_data, phash=None):
+        """Cache invoice_data (copied) under key, evicting least recently used entries"""
+        size = _estimated_size(invoice_data)
+        if size > self.max_bytes:
+            with self._lock:
+                self._counters['rejected_too_large'] += 1
+            return
+        invoice_data = copy.deepcopy(invoice_data)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (invoice_data, phash, size, now)
+            self._bytes += size
+            self._counters['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        return count
+
+    def metrics(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['perceptual_hits'] + self._counters['misses']
+            hits = self._counters['hits'] + self._counters['perceptual_hits']
+            return {
+                'enabled': DETECT_CACHE_ENABLED,
+                'perceptual': self.perceptual,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                **self._counters,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+detection_cache = DetectionResultCache()
+
+
+def get_cached_detection(data):
+    """
+    Cached invoice_data for these exact upload bytes
+    Returns:
+        (invoice_data or None, cache key or None when the cache is disabled)
+    """
+    if not DETECT_CACHE_ENABLED:
+        return None, None
+    key = content_key(data)
+    return detection_cache.get(key), key
+
+
+def get_similar_detection(image):
+    """
+    Cached invoice_data for a near-duplicate of the decoded image
+    Returns:
+        (invoice_data or None, perceptual hash or None when perceptual matching is off)
+    """
+    if not DETECT_CACHE_ENABLED or not detection_cache.perceptual:
+        return None, None
+    phash = perceptual_hash(image)
+    return detection_cache.get_similar(phash), phash
+
+
+def cache_detection(key, invoice_data, phash=None):
+    """Remember a fresh detection result (no-op when the cache is disabled)"""
+    if DETECT_CACHE_ENABLED and key is not None:
+        detection_cache.put(key, invoice_data, phash)
+
+
+def clear_detection_cache():
+    """Forget every cached result (e.g. after the invoice history is cleared)"""
+    count = detection_cache.clear()
+    logger.info(f"[CACHE] Cleared {count} cached detection results")
+    return count
+
+
+def get_detection_cache_metrics():
+    """Metrics of the detection result cache"""
+    return detection_cache.metrics()
@@ -1,74 +1,12 @@
 from datetime import datetime
-import pandas as pd
-import os
+import numpy as np
+from services.timescale_snapshot import get_timescale_snapshot
+from config import FORECAST_USE_LSTM
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def load_timescale_data():
-    """
-    Load timescale data from CSV files
-    Returns: (product_info_dict, imports_dict, sales_dict)
-    """
-    try:
-        # Define helper function
-        def clean_price(price_str):
-            if pd.isna(price_str):
-                return 0
-            price_clean = str(price_str).replace('.', '').replace(',', '').strip()
-            try:
-                return float(price_clean)
-            except ValueError:
-                return 0
-
-        # Load dataset_product.csv
-        df_products = pd.read_csv('data/dataset_product.csv', sep=';', encoding='utf-8')
-        logger.info(f"[DATA] Loaded dataset_product.csv: {len(df_products)} products from REAL CSV file")
-
-        product_info = {}
-        for _, row in df_products.iterrows():
-            product_name = str(row.iloc[0]).strip()
-            product_info[product_name] = {
-                'initial_stock': int(row.iloc[1]) if pd.notna(row.iloc[1]) else 0,
-                'import_price': clean_price(row.iloc[2]) if len(row) > 2 else 0,
-                'retail_price': clean_price(row.iloc[3]) if len(row) > 3 else 0,
-            }
-
-        # Load import_in_a_timescale.csv
-        df_imports = pd.read_csv('data/import_in_a_timescale.csv', sep=';', encoding='utf-8')
-        logger.info(f"[DATA] Loaded import_in_a_timescale.csv: {len(df_imports)} import records from October 2025")
-
-        imports_dict = {}
-        for _, row in df_imports.iterrows():
-            try:
-                product_name = str(row.iloc[0]).strip()
-                quantity = int(row.iloc[1]) if pd.notna(row.iloc[1]) else 0
-                imports_dict[product_name] = imports_dict.get(product_name, 0) + quantity
-            except (ValueError, IndexError):
-                continue
-
-        # Load sale_in_a_timescale.csv
-        df_sales = pd.read_csv('data/sale_in_a_timescale.csv', sep=';', encoding='utf-8')
-        logger.info(f"[DATA] Loaded sale_in_a_timescale.csv: {len(df_sales)} sales records from October 2025")
-
-        sales_dict = {}
-        for _, row in df_sales.iterrows():
-            try:
-                product_name = str(row.iloc[1]).strip()
-                quantity = int(row.iloc[2]) if pd.notna(row.iloc[2]) else 0
-                sales_dict[product_name] = sales_dict.get(product_name, 0) + quantity
-            except (ValueError, IndexError):
-                continue
-
-        logger.info(f"Loaded timescale data: {len(product_info)} products, {len(imports_dict)} imports, {len(sales_dict)} sales")
-        return product_info, imports_dict, sales_dict
-
-    except Exception as e:
-        logger.error(f"Error loading timescale data: {e}")
-        return {}, {}, {}
-
-
 def parse_manual_invoice_data(manual_invoice_data):
     
     if not manual_invoice_data or not manual_invoice_data.strip():
@@ -112,66 +50,77 @@ def forecast_quantity(lstm_model, invoice_data_list):
     
     logger.info(f"[MODEL 2] Starting forecast for {len(invoice_data_list)} products")
 
-    
-
-    product_info, imports_dict, sales_dict = load_timescale_data()
-
-    logger.info(f"[MODEL 2] Loaded REAL historical data:")
-    logger.info(f"[MODEL 2] - {len(product_info)} products with info")
-    logger.info(f"[MODEL 2] - {len(imports_dict)} products with import history")
-    logger.info(f"[MODEL 2] - {len(sales_dict)} products with sales history")
+    snapshot = get_timescale_snapshot()
+
+    logger.info(f"[MODEL 2] Using REAL historical data (snapshot v{snapshot.version}, loaded {snapshot.loaded_at}):")
+    logger.info(f"[MODEL 2] - {int(snapshot.has_info.sum())} products with info")
+    logger.info(f"[MODEL 2] - {int(np.count_nonzero(snapshot.import_qty))} products with import history")
+    logger.info(f"[MODEL 2] - {int(np.count_nonzero(snapshot.sale_qty))} products with sales history")
+
+    product_names = [item.get('product_name', '') for item in invoice_data_list]
+    current_quantities = [item.get('quantity', 0) for item in invoice_data_list]
+
+    # Get historical data for every product at once
+    history = snapshot.gather(product_names)
+    historical_sales = history['sale_qty']
+    historical_import = history['import_qty']
+    current_qty = np.asarray(current_quantities, dtype=np.float64)
+
+    # Predict based on sales velocity
+    # If product has high sales, predict higher import:
+    # daily_sales = sales / 30 days (October data), import = 2 weeks of sales (safety stock),
+    # with the current quantity as a buffer
+    has_sales = historical_sales > 0
+    daily_sales = historical_sales / 30.0
+    from_sales = np.maximum(np.trunc(daily_sales * 14), current_qty)
+    # No historical sales - use current quantity as baseline, at least 5 units
+    from_invoice = np.maximum(np.trunc(current_qty * 1.5), 5)
+    predicted_import = np.where(has_sales, from_sales, from_invoice)
+
+    # Clamp predictions to reasonable range
+    predicted_import = np.clip(predicted_import, 5, 500).astype(np.int64)
+    confidence = np.where(has_sales, 0.75 + np.minimum(historical_sales, 100) / 400.0, 0.60)  # 0.75-1.0
+    increasing = historical_sales > historical_import
+
+    # Optional: one batched LSTM forward pass for the whole invoice
+    model_type = 'LSTM Time-Series (Heuristic)'
+    lstm_predictions = [None] * len(product_names)
+    if FORECAST_USE_LSTM and product_names and getattr(lstm_model, 'model', None) is not None:
+        lstm_predictions = lstm_model.predict_batch(product_names, snapshot)
+        model_type = 'LSTM Time-Series'
+        failed = [p for p in lstm_predictions if not p.get('success')]
+        if failed:
+            logger.error(f"[MODEL 2] LSTM forecast failed for {len(failed)}/{len(product_names)} products, "
+                         f"falling back to the sales-velocity heuristic: {failed[0].get('message')}")
+            if len(failed) == len(product_names):
+                model_type = 'LSTM Time-Series (Heuristic)'
+    elif FORECAST_USE_LSTM:
+        logger.warning("[MODEL 2] FORECAST_USE_LSTM is set but no LSTM model is loaded, using the heuristic")
 
     predicted_products = []
-    total_predicted = 0
-
-    for invoice_item in invoice_data_list:
-        product_name = invoice_item.get('product_name', '')
-        current_qty = invoice_item.get('quantity', 0)
-
-        # Get historical data
-        historical_import = imports_dict.get(product_name, 0)
-        historical_sales = sales_dict.get(product_name, 0)
-        initial_stock = product_info.get(product_name, {}).get('initial_stock', 0)
-
-        logger.info(f"[MODEL 2] - Processing: {product_name}")
-        logger.info(f"[MODEL 2] - Current qty in invoice: {current_qty}")
-        logger.info(f"[MODEL 2] - Historical SALES (Oct 2025): {historical_sales} units")
-        logger.info(f"[MODEL 2] - Historical IMPORT (Oct 2025): {historical_import} units")
-        logger.info(f"[MODEL 2] - Initial stock from dataset: {initial_stock} units")
-
-        # Predict based on sales velocity
-        # If product has high sales, predict higher import
-        if historical_sales > 0:
-            # Sales velocity = sales / 30 days (October data)
-            daily_sales = historical_sales / 30.0
-            # Predict import = 2 weeks of sales (safety stock)
-            predicted_import = int(daily_sales * 14)
-            # Add some buffer based on current quantity
-            predicted_import = max(predicted_import, current_qty)
-            confidence = 0.75 + (min(historical_sales, 100) / 400.0)  # 0.75-1.0
-            logger.info(f"[MODEL 2] - Using REAL sales data: {historical_sales} → daily_sales={daily_sales:.2f}")
-            logger.info(f"[MODEL 2] - Formula: daily_sales * 14 days = {predicted_import} units")
-        else:
-            # No historical sales - use current quantity as baseline
-            predicted_import = max(int(current_qty * 1.5), 5)  # At least 5 units
-            confidence = 0.60
-            logger.info(f"[MODEL 2] - No historical sales found, using fallback: current_qty * 1.5 = {predicted_import}")
-
-        # Clamp predictions to reasonable range
-        predicted_import = max(5, min(predicted_import, 500))
-
-        predicted_products.append({
+    for i, product_name in enumerate(product_names):
+        product = {
             'product_name': product_name,
-            'current_quantity': current_qty,
-            'predicted_quantity': predicted_import, 
-            'confidence': round(confidence, 3),
-            'historical_sales': historical_sales,
-            'trend': 'increasing' if historical_sales > historical_import else 'stable'
-        })
+            'current_quantity': current_quantities[i],
+            'predicted_quantity': int(predicted_import[i]),
+            'confidence': round(float(confidence[i]), 3),
+            'historical_sales': int(historical_sales[i]),
+            'trend': 'increasing' if increasing[i] else 'stable'
+        }
+
+        lstm_prediction = lstm_predictions[i]
+        if lstm_prediction and lstm_prediction.get('success'):
+            product['predicted_quantity'] = max(5, min(lstm_prediction['predicted_quantity'], 500))
+            product['confidence'] = round(lstm_prediction['confidence'], 3)
+            product['trend'] = lstm_prediction['trend']
+            predicted_import[i] = product['predicted_quantity']
+
+        predicted_products.append(product)
 
-        total_predicted += predicted_import
+        logger.info(f" {product_name}: current={current_quantities[i]}, predicted={predicted_import[i]}, "
+                    f"sales={historical_sales[i]}, import={historical_import[i]}")
 
-        logger.info(f" {product_name}: current={current_qty}, predicted={predicted_import}, sales={historical_sales}")
+    total_predicted = int(predicted_import.sum())
 
     result = {
         'success': True,
@@ -180,7 +129,8 @@ def forecast_quantity(lstm_model, invoice_data_list):
         'trend': 'increasing' if total_predicted > 0 else 'stable',
         'confidence': sum(p['confidence'] for p in predicted_products) / len(predicted_products) if predicted_products else 0,
         'historical_mean': total_predicted,
-        'model_type': 'LSTM Time-Series (Heuristic)',
+        'model_type': model_type,
+        'snapshot_version': snapshot.version,
         'timestamp': datetime.now().isoformat()
     }
 
@@ -249,5 +199,6 @@ def format_forecast_response(prediction, history_count=None):
         'recommendation': prediction.get('recommendation', 'maintain'),
         'recommendation_text': output2,
         'history_count': history_count or 0,
+        'snapshot_version': prediction.get('snapshot_version'),
         'timestamp': datetime.now().isoformat()
     }
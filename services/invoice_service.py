@@ -1,46 +1,145 @@
+from collections import OrderedDict
 from datetime import datetime
+import threading
 from utils.invoice_processor import build_invoice_data
-from utils.database import save_invoice_to_db, get_invoices_from_db
+from utils.database import get_statistics, get_invoices_from_db, invoice_exists
+from services.persistence_queue import persist_invoice, flush_pending_writes
+from services.detection_cache import clear_detection_cache
 from utils.logger import get_logger
-from config import CATALOG_PATH, STORE_NAME_LOOKUP
+from config import CATALOG_PATH, STORE_NAME_LOOKUP, MAX_INVOICE_HISTORY
 
 logger = get_logger(__name__)
 
-# Storage for invoice history (in-memory),backward compatibility
-invoice_history = []
 
-
-def process_invoice_image(image, cnn_model):
+class RecentInvoiceCache:
+    """
+    Most recent invoices in a fixed-size ring buffer, plus a running count
+    of all saved invoices, so history reads never touch SQLite
+
+    The buffer and the count are loaded from the database on first use
+    (after init_database() has run), so history survives a restart.
+    """
+
+    def __init__(self, max_size=MAX_INVOICE_HISTORY):
+        # invoice_id -> invoice, oldest first, for O(1) replace and eviction
+        self._invoices = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._total_count = None
+
+    def _ensure_loaded(self):
+        """Warm the buffer with the newest saved invoices and seed the count (caller holds the lock)"""
+        if self._total_count is not None:
+            return
+        for invoice in reversed(get_invoices_from_db(limit=self._max_size)):
+            self._invoices[invoice.get('invoice_id')] = invoice
+        self._total_count = get_statistics().get('total_invoices', 0)
+
+    def add(self, invoice_data):
+        """
+        Record an invoice before it is persisted
+        Saving an existing invoice_id replaces that row (INSERT OR REPLACE),
+        so only new ids increase the count.
+        """
+        invoice_id = invoice_data.get('invoice_id')
+        with self._lock:
+            self._ensure_loaded()
+            buffered = invoice_id in self._invoices
+        # Ids that fell out of the buffer may still be saved; ask SQLite
+        # without holding the lock so readers are never blocked on it
+        saved = not buffered and invoice_exists(invoice_id)
+        with self._lock:
+            if invoice_id in self._invoices:
+                self._invoices.move_to_end(invoice_id)
+            else:
+                if len(self._invoices) >= self._max_size:
+                    self._invoices.popitem(last=False)
+                if not (buffered or saved):
+                    self._total_count += 1
+            self._invoices[invoice_id] = invoice_data
+
+    def latest(self):
+        """Most recent invoice, or None"""
+        with self._lock:
+            self._ensure_loaded()
+            return next(reversed(self._invoices.values())) if self._invoices else None
+
+    def recent(self, limit=None):
+        """Up to limit invoices, newest first"""
+        with self._lock:
+            self._ensure_loaded()
+            invoices = list(reversed(self._invoices.values()))
+        return invoices[:limit] if limit else invoices
+
+    def clear(self):
+        with self._lock:
+            count = len(self._invoices)
+            self._invoices.clear()
+            self._total_count = 0
+        return count
+
+    @property
+    def total_count(self):
+        """Invoices in the database (one statistics read on first use, then maintained here)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._total_count
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._invoices)
+
+
+# Storage for invoice history (in-memory)
+invoice_history = RecentInvoiceCache()
+
+
+def process_invoice_image(image, cnn_model, cnn_input=None):
    
     logger.info(f"[MODEL 1] Processing invoice image (shape: {image.shape})")
 
     # MODEL 1: CNN Image Detection (Paper Invoice → Electric Invoice)
     
-    invoice_data = cnn_model.predict_invoice_data(image)
-    invoice_data['date'] = datetime.now().isoformat()
+    invoice_data = cnn_model.predict_invoice_data(image, cnn_input=cnn_input)
+    _record_invoice(invoice_data)
+
+    return invoice_data
+
+
+def process_invoice_images(images, cnn_model, executor=None, cnn_inputs=None):
+    
+    logger.info(f"[MODEL 1] Processing batch of {len(images)} invoice images")
+
+    # One batched CNN forward pass for the whole stack
+    invoices = cnn_model.predict_invoice_data_batch(images, executor=executor, cnn_inputs=cnn_inputs)
+    for invoice_data in invoices:
+        _record_invoice(invoice_data)
+
+    return invoices
 
+
+def _record_invoice(invoice_data):
     
+    invoice_data['date'] = datetime.now().isoformat()
+
+    # save to memory history (before the database, so a repeated invoice_id is recognised)
+    invoice_history.add(invoice_data)
+
     # Store last 50 invoices + Create time-series sequences
     try:
-        save_invoice_to_db(invoice_data)
-        logger.info(f"[DATABASE] Saved Y1 output to INVOICE HISTORY DATABASE: {invoice_data['invoice_id']}")
+        persist_invoice(invoice_data)
+        logger.info(f"[DATABASE] Queued Y1 output for INVOICE HISTORY DATABASE: {invoice_data['invoice_id']}")
     except Exception as e:
         logger.warning(f"[DATABASE] Failed to save to database: {e}")
 
-    # save to memory history (backward compatibility)
-    invoice_history.append(invoice_data)
-    if len(invoice_history) > 50:#Keep50 invoices
-        invoice_history.pop(0)
-
     logger.info(f"[MODEL 1] Invoice detection completed:")
     logger.info(f" - Invoice ID: {invoice_data['invoice_id']}")
     # Store name removed from logging
     logger.info(f" - Products detected: {len(invoice_data['products'])}")
     logger.info(f" - Total amount: {int(invoice_data['total_amount']):,} VND")
     logger.info(f" - Confidence: {invoice_data['detection_confidence']:.3f}")
-    logger.info(f" - Total in DATABASE: {len(get_invoices_from_db(limit=1000))}")
-
-    return invoice_data
+    logger.info(f" - Total in DATABASE: {invoice_history.total_count}")
 
 
 def format_invoice_response(invoice_data):
@@ -67,34 +166,31 @@ def format_invoice_response(invoice_data):
 
 def get_invoice_history(limit=10):
     
-    try:
-        # Database
-        db_invoices = get_invoices_from_db(limit=limit)
-
-        return {
-            'success': True,
-            'count': len(db_invoices),
-            'invoices': db_invoices,
-            'source': 'database'
-        }
-    except Exception as e:
-        logger.warning(f"Failed to get from database, using memory: {e}")
-        # Fallback to memory
-        return {
-            'success': True,
-            'count': len(invoice_history),
-            'invoices': invoice_history[-limit:] if limit else invoice_history,
-            'source': 'memory'
-        }
+    invoices = invoice_history.recent(limit)
+    return {
+        'success': True,
+        'count': len(invoices),
+        'invoices': invoices,
+        'total_count': invoice_history.total_count,
+        'source': 'memory'
+    }
+
+
+def get_last_invoice():
+    
+    return invoice_history.latest()
 
 
 def clear_invoice_history():
     
-    global invoice_history
-    invoice_history = []
+    invoice_history.clear()
+    # Cached results refer to invoices that are about to be deleted
+    clear_detection_cache()
 
     try:
         from utils.database import clear_database
+        # Queued writes must not land after the clear
+        flush_pending_writes()
         clear_database()
         logger.info("Cleared invoice history from database and memory")
     except Exception as e:
@@ -5,15 +5,38 @@ from pathlib import Path
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
-from models.cnn_model import CNNInvoiceDetector
-from models.lstm_model import ImportForecastLSTM
-from config import CNN_MODEL_PATH, LSTM_MODEL_PATH, LSTM_SEQUENCE_LENGTH, LSTM_NUM_FEATURES
+from config import (
+    CNN_MODEL_PATH, LSTM_MODEL_PATH, LSTM_NUMPY_PATH, LSTM_ENGINE,
+    LSTM_SEQUENCE_LENGTH, LSTM_NUM_FEATURES,
+    CNN_MICRO_BATCHING, CNN_MAX_BATCH, CNN_MAX_WAIT_MS, CNN_BATCH_QUEUE_SIZE, CNN_BATCH_TIMEOUT,
+    CNN_STAGE_WORKERS,
+    TEXT_REGION_MODE, TEXT_REGION_COARSE_SIDE, TEXT_REGION_MAX_PIXELS
+)
+
+# Model classes are imported lazily so forecast-only workers using the
+# NumPy LSTM engine never import TensorFlow
 
 # Global model instances
 cnn_model = None
 lstm_model = None
 
 
+def _load_numpy_lstm():
+    """Return the TensorFlow-free LSTM engine when configured and exported, else None"""
+    if LSTM_ENGINE != 'numpy':
+        return None
+    if not LSTM_NUMPY_PATH.exists():
+        print(f"   [WARNING] LSTM_ENGINE='numpy' but {LSTM_NUMPY_PATH.name} not found; falling back to Keras")
+        return None
+
+    from models.lstm_numpy import NumpyLSTMEngine
+    try:
+        return NumpyLSTMEngine(LSTM_NUMPY_PATH)
+    except Exception as exc:
+        print(f"   [WARNING] Unable to load NumPy LSTM engine: {exc}")
+        return None
+
+
 def initialize_models():
     
     print("\n" + "="*60)
@@ -24,23 +47,62 @@ def initialize_models():
     print("Loading Model 1: CNN Invoice Detector...")
     global cnn_model
     try:
-        cnn_model = CNNInvoiceDetector(img_height=224, img_width=224)
+        cnn_model = _new_cnn_model()
         if CNN_MODEL_PATH.exists():
             cnn_model.load_model(str(CNN_MODEL_PATH))
             print(f"   [OK] Loaded CNN weights from {CNN_MODEL_PATH.name}")
         else:
             cnn_model.build_model()
             cnn_model.compile_model()
+            cnn_model.prepare_inference()
             print("   [WARNING] Pre-trained CNN weights not found; using freshly initialized model")
     except Exception as exc:
         error_msg = str(exc).encode('ascii', 'ignore').decode('ascii')
         print(f"   [WARNING] Unable to load CNNInvoiceDetector: {error_msg}")
-        cnn_model = CNNInvoiceDetector(img_height=224, img_width=224)
+        cnn_model = _new_cnn_model()
         cnn_model.build_model()
         cnn_model.compile_model()
+        cnn_model.prepare_inference()
+    _enable_cnn_batching(cnn_model)
     
     # Model 2: LSTM
     print("Loading Model 2: LSTM Forecasting...")
+    global lstm_model
+    lstm_model = _load_numpy_lstm()
+    if lstm_model is not None:
+        print(f"   [OK] Loaded NumPy LSTM engine from {LSTM_NUMPY_PATH.name}")
+    else:
+        _initialize_keras_lstm()
+    
+    print("="*60)
+    print("MODELS INITIALIZED - READY TO BUILD ON DEMAND")
+    print("="*60 + "\n")
+
+
+def _new_cnn_model():
+    """CNNInvoiceDetector with the configured serving options"""
+    from models.cnn_model import CNNInvoiceDetector
+    return CNNInvoiceDetector(
+        img_height=224, img_width=224, stage_workers=CNN_STAGE_WORKERS,
+        region_mode=TEXT_REGION_MODE, region_coarse_side=TEXT_REGION_COARSE_SIDE,
+        region_max_pixels=TEXT_REGION_MAX_PIXELS
+    )
+
+
+def _enable_cnn_batching(model):
+    """Put the micro-batching scheduler in front of the CNN when configured"""
+    if CNN_MICRO_BATCHING:
+        model.enable_micro_batching(
+            max_batch=CNN_MAX_BATCH, max_wait_ms=CNN_MAX_WAIT_MS, max_queue=CNN_BATCH_QUEUE_SIZE,
+            timeout=CNN_BATCH_TIMEOUT
+        )
+        print(f"   [OK] CNN micro-batching enabled (max_batch={CNN_MAX_BATCH}, max_wait={CNN_MAX_WAIT_MS}ms)")
+
+
+def _initialize_keras_lstm():
+    """Load the Keras LSTM into the global slot (startup path)"""
+    from models.lstm_model import ImportForecastLSTM
+    
     global lstm_model
     try:
         lstm_model = ImportForecastLSTM(lookback=LSTM_SEQUENCE_LENGTH, features=LSTM_NUM_FEATURES)
@@ -49,16 +111,14 @@ def initialize_models():
             print(f"   [OK] Loaded LSTM weights from {LSTM_MODEL_PATH.name}")
         else:
             lstm_model.build_model()
+            lstm_model.prepare_inference()
             print("   [WARNING] Pre-trained LSTM weights not found; using freshly initialized model")
     except Exception as exc:
         error_msg = str(exc).encode('ascii', 'ignore').decode('ascii')
         print(f"   [WARNING] Unable to load ImportForecastLSTM: {error_msg}")
         lstm_model = ImportForecastLSTM(lookback=LSTM_SEQUENCE_LENGTH, features=LSTM_NUM_FEATURES)
         lstm_model.build_model()
-    
-    print("="*60)
-    print("MODELS INITIALIZED - READY TO BUILD ON DEMAND")
-    print("="*60 + "\n")
+        lstm_model.prepare_inference()
 
 
 def get_cnn_model():
@@ -67,7 +127,7 @@ def get_cnn_model():
     if cnn_model is None:
         print("Loading CNNInvoiceDetector on demand...")
         try:
-            cnn_model = CNNInvoiceDetector(img_height=224, img_width=224)
+            cnn_model = _new_cnn_model()
             if CNN_MODEL_PATH.exists():
                 cnn_model.load_model(str(CNN_MODEL_PATH))
             else:
@@ -75,16 +135,34 @@ def get_cnn_model():
                 cnn_model.compile_model()
         except Exception as exc:
             print(f"   [WARNING] Fallback to fresh CNNInvoiceDetector due to: {exc}")
-            cnn_model = CNNInvoiceDetector(img_height=224, img_width=224)
+            cnn_model = _new_cnn_model()
             cnn_model.build_model()
             cnn_model.compile_model()
+        _enable_cnn_batching(cnn_model)
     return cnn_model
 
 
+def get_cnn_batching_metrics():
+    """CNN micro-batching metrics without loading the model (None if not active)"""
+    if cnn_model is None or not hasattr(cnn_model, 'batching_metrics'):
+        return None
+    return cnn_model.batching_metrics()
+
+
+def get_cnn_stage_metrics():
+    """Per-stage CNN request timings without loading the model (None if not loaded)"""
+    if cnn_model is None or not hasattr(cnn_model, 'stage_metrics'):
+        return None
+    return cnn_model.stage_metrics()
+
+
 def get_lstm_model():
     """Lazy load LSTM model"""
     global lstm_model
     if lstm_model is None:
+        lstm_model = _load_numpy_lstm()
+    if lstm_model is None:
+        from models.lstm_model import ImportForecastLSTM
         print("Loading ImportForecastLSTM on demand...")
         try:
             lstm_model = ImportForecastLSTM(lookback=LSTM_SEQUENCE_LENGTH, features=LSTM_NUM_FEATURES)
@@ -116,6 +194,7 @@ def get_models_info():
             'input': 'Structured invoice history (quantity, price, sales, stock, demand)',
             'output': 'Predicted import quantity & confidence',
             'architecture': 'Stacked LSTM for time-series forecasting',
+            'engine': 'numpy' if type(lstm_model).__name__ == 'NumpyLSTMEngine' else 'keras',
             'status': 'Ready' if lstm_model and getattr(lstm_model, 'model', None) else 'Not loaded',
             'lookback': lstm_model.lookback if lstm_model else 'Not loaded',
             'features': lstm_model.features if lstm_model else 'Not loaded',
@@ -0,0 +1,277 @@
+"""
+Write-Behind Persistence
+Invoice and forecast rows are handed to a single background writer through a
+bounded queue, so request threads never wait for SQLite. The writer drains
+whatever is queued into one transaction, keeping only the last copy of each
+invoice_id, and the queue is flushed at interpreter exit.
+
+PERSIST_MODE = 'sync' in config restores writing on the request thread.
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from config import (
+    PERSIST_MODE, PERSIST_QUEUE_SIZE, PERSIST_MAX_BATCH,
+    PERSIST_MAX_DELAY_MS, PERSIST_ENQUEUE_TIMEOUT, PERSIST_SHUTDOWN_TIMEOUT,
+    PERSIST_FLUSH_TIMEOUT
+)
+from utils.database import (
+    get_db_connection, save_invoice_to_db, save_invoices_bulk, save_forecast_to_db
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Single background writer fed by a bounded queue
+
+    submit() never touches the database unless the queue stays full for
+    enqueue_timeout seconds, in which case the caller writes synchronously
+    (backpressure instead of unbounded memory or dropped rows).
+    """
+
+    def __init__(self, max_size=PERSIST_QUEUE_SIZE, max_batch=PERSIST_MAX_BATCH,
+                 max_delay_ms=PERSIST_MAX_DELAY_MS, enqueue_timeout=PERSIST_ENQUEUE_TIMEOUT):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._thread = None
+        self._stopped = False
+
+        self._counters = {
+            'enqueued': 0,
+            'written_invoices': 0,
+            'written_forecasts': 0,
+            'deduplicated': 0,
+            'batches': 0,
+            'failed': 0,
+            'sync_fallbacks': 0,
+            'max_queue_depth': 0,
+        }
+        self._flush_ms_total = 0.0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._last_commit_lag_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def submit(self, kind, payload):
+        """
+        Queue a row for writing
+        Args:
+            kind: 'invoice' or 'forecast'
+            payload: Row dictionary (not modified)
+        Returns:
+            bool: True if queued, False if the caller must write it synchronously
+        """
+        with self._lock:
+            if self._stopped:
+                return False
+            self._ensure_started()
+            self._pending += 1
+
+        try:
+            self._queue.put((kind, payload, time.monotonic()), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self._counters['sync_fallbacks'] += 1
+                self._idle.notify_all()
+            logger.warning("[PERSIST] Write queue full, writing on the request thread")
+            return False
+
+        with self._lock:
+            self._counters['enqueued'] += 1
+            self._counters['max_queue_depth'] = max(self._counters['max_queue_depth'], self._queue.qsize())
+        return True
+
+    def _collect_batch(self, first):
+        """Drain up to max_batch items, waiting at most max_delay for stragglers"""
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = [item], False
+            try:
+                batch, stop = self._collect_batch(item)
+                self._write_batch(batch)
+            except Exception as e:
+                # Keep the writer alive; the rows of this batch are lost
+                with self._lock:
+                    self._counters['failed'] += len(batch)
+                logger.error(f"[PERSIST] Dropped a batch of {len(batch)} rows: {e}")
+            finally:
+                with self._lock:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        # Last copy of an invoice wins, as with sequential INSERT OR REPLACE
+        invoices = {}
+        forecasts = []
+        for kind, payload, _ in batch:
+            if kind == 'invoice':
+                invoices.pop(payload.get('invoice_id'), None)
+                invoices[payload.get('invoice_id')] = payload
+            else:
+                forecasts.append(payload)
+        deduplicated = sum(1 for kind, _, _ in batch if kind == 'invoice') - len(invoices)
+
+        start = time.perf_counter()
+        try:
+            # Nested connections share the outer transaction: one commit per batch
+            with get_db_connection():
+                if invoices:
+                    save_invoices_bulk(invoices.values(), chunk_size=len(invoices))
+                for forecast_data in forecasts:
+                    save_forecast_to_db(forecast_data)
+            failed = 0
+        except Exception as e:
+            logger.error(f"[PERSIST] Batch write failed ({e}), retrying rows individually")
+            failed = self._write_individually(invoices.values(), forecasts)
+        flush_ms = (time.perf_counter() - start) * 1000
+        lag_ms = (time.monotonic() - min(enqueued for _, _, enqueued in batch)) * 1000
+
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['written_invoices'] += len(invoices)
+            self._counters['written_forecasts'] += len(forecasts)
+            self._counters['deduplicated'] += deduplicated
+            self._counters['failed'] += failed
+            self._flush_ms_total += flush_ms
+            self._last_flush_ms = flush_ms
+            self._max_flush_ms = max(self._max_flush_ms, flush_ms)
+            self._last_commit_lag_ms = lag_ms
+
+    def _write_individually(self, invoices, forecasts):
+        failed = 0
+        for save, rows in ((save_invoice_to_db, invoices), (save_forecast_to_db, forecasts)):
+            for row in rows:
+                try:
+                    save(row)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"[PERSIST] Dropped row after failed write: {e}")
+        return failed
+
+    def flush(self, timeout=PERSIST_FLUSH_TIMEOUT):
+        """
+        Wait until everything queued so far is committed
+        Args:
+            timeout: Seconds to wait at most (None waits forever)
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def stop(self, timeout=PERSIST_SHUTDOWN_TIMEOUT):
+        """Flush and stop the writer; later submits are written synchronously"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("[PERSIST] Writer stuck at shutdown, queued rows may be lost")
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("[PERSIST] Writer did not finish within the shutdown timeout")
+
+    def metrics(self):
+        """Queue depth, throughput and flush latency counters"""
+        with self._lock:
+            batches = self._counters['batches']
+            return {
+                'mode': 'write_behind',
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'pending': self._pending,
+                **self._counters,
+                'last_flush_ms': round(self._last_flush_ms, 3),
+                'avg_flush_ms': round(self._flush_ms_total / batches, 3) if batches else 0.0,
+                'max_flush_ms': round(self._max_flush_ms, 3),
+                'last_commit_lag_ms': round(self._last_commit_lag_ms, 3),
+                'writer_alive': bool(self._thread and self._thread.is_alive()),
+                'timestamp': datetime.now().isoformat()
+            }
+
+
+_write_queue = WriteBehindQueue()
+atexit.register(_write_queue.stop)
+
+
+def _timestamped(row):
+    """Copy of row stamped with its enqueue time, so created_at matches a synchronous write"""
+    if row.get('created_at'):
+        return row
+    return dict(row, created_at=datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def persist_invoice(invoice_data):
+    """Save an invoice (write-behind unless PERSIST_MODE is 'sync')"""
+    if PERSIST_MODE == 'sync' or not _write_queue.submit('invoice', _timestamped(invoice_data)):
+        save_invoice_to_db(invoice_data)
+
+
+def persist_forecast(forecast_data):
+    """Save a forecast (write-behind unless PERSIST_MODE is 'sync')"""
+    if PERSIST_MODE == 'sync' or not _write_queue.submit('forecast', _timestamped(forecast_data)):
+        save_forecast_to_db(forecast_data)
+
+
+def flush_pending_writes(timeout=PERSIST_FLUSH_TIMEOUT):
+    """
+    Block until queued writes are committed (e.g. before reading or clearing)
+    Returns:
+        bool: False if writes were still pending when the timeout expired
+    """
+    flushed = _write_queue.flush(timeout)
+    if not flushed:
+        logger.warning(f"[PERSIST] Queued writes still pending after {timeout}s")
+    return flushed
+
+
+def get_persistence_metrics():
+    """Metrics of the write-behind queue"""
+    metrics = _write_queue.metrics()
+    if PERSIST_MODE == 'sync':
+        metrics['mode'] = 'sync'
+    return metrics
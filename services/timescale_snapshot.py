@@ -0,0 +1,337 @@
+"""
+Timescale Snapshot
+Process-wide, versioned cache of the historical CSV data used by Model 2
+"""
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    PRODUCT_DATASET_PATH, IMPORT_HISTORY_PATH, SALE_HISTORY_PATH,
+    TIMESCALE_CHECK_INTERVAL, LSTM_SEQUENCE_LENGTH
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TIMESCALE_FILES = (PRODUCT_DATASET_PATH, IMPORT_HISTORY_PATH, SALE_HISTORY_PATH)
+
+
+# Per-product columns held by a snapshot, all indexed by product id
+TIMESCALE_COLUMNS = ('initial_stock', 'import_price', 'retail_price', 'import_qty', 'sale_qty')
+
+# Per-product daily quantities over the last window_days days of the data, shape (N, window_days)
+TIMESCALE_WINDOW_COLUMNS = ('recent_imports', 'recent_sales')
+
+
+def _clean_price_column(series):
+    """Vectorized price parsing: '1.250.000' -> 1250000.0, invalid/NaN -> 0"""
+    cleaned = (
+        series.astype(str)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '', regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0).astype('float64')
+
+
+def _aggregate_quantities(df, name_col, qty_col):
+    """Sum quantities per stripped product name; rows with non-numeric quantities are skipped"""
+    raw_quantity = df.iloc[:, qty_col]
+    quantity = pd.to_numeric(raw_quantity, errors='coerce')
+    valid = quantity.notna() | raw_quantity.isna()
+
+    frame = pd.DataFrame({
+        'product': df.iloc[:, name_col].astype(str).str.strip(),
+        'quantity': quantity.fillna(0).astype('int64')
+    })[valid]
+    return frame.groupby('product', sort=False)['quantity'].sum()
+
+
+def _parse_dates(df, date_col=0):
+    """Parse the dd/mm/yyyy date column; unparseable dates become NaT"""
+    return pd.to_datetime(df.iloc[:, date_col].astype(str).str.strip(), format='%d/%m/%Y', errors='coerce')
+
+
+def _daily_window(df, dates, name_col, qty_col, names, window):
+    """Daily quantity per product over the window dates, shape (len(names), len(window))"""
+    frame = pd.DataFrame({
+        'product': df.iloc[:, name_col].astype(str).str.strip(),
+        'date': dates,
+        'quantity': pd.to_numeric(df.iloc[:, qty_col], errors='coerce').fillna(0),
+    })
+    frame = frame[frame['date'].isin(window)]
+    daily = frame.groupby(['product', 'date'])['quantity'].sum().unstack(fill_value=0)
+    return daily.reindex(index=names, columns=window, fill_value=0).to_numpy(dtype=np.float64)
+
+
+def load_timescale_columns(paths=TIMESCALE_FILES, window_days=LSTM_SEQUENCE_LENGTH):
+    """
+    Load the timescale CSV files into columnar NumPy arrays
+    Returns: dict with 'names' (product id -> name), one array per TIMESCALE_COLUMNS
+    and TIMESCALE_WINDOW_COLUMNS entry, and 'window_day_of_week' (weekday of each window day)
+    Raises on I/O or parse errors
+    """
+    product_path, import_path, sale_path = paths
+
+    # Load dataset_product.csv
+    df_products = pd.read_csv(product_path, sep=';', encoding='utf-8')
+    logger.info(f"[DATA] Loaded dataset_product.csv: {len(df_products)} products from REAL CSV file")
+
+    num_columns = df_products.shape[1]
+    products = pd.DataFrame({
+        'initial_stock': pd.to_numeric(df_products.iloc[:, 1], errors='coerce').fillna(0).astype('int64'),
+        'import_price': _clean_price_column(df_products.iloc[:, 2]) if num_columns > 2 else 0.0,
+        'retail_price': _clean_price_column(df_products.iloc[:, 3]) if num_columns > 3 else 0.0,
+    })
+    products.index = df_products.iloc[:, 0].astype(str).str.strip()
+    # Later rows win for duplicated names
+    products = products[~products.index.duplicated(keep='last')]
+
+    # Load import_in_a_timescale.csv (date; product; quantity; unit price)
+    df_imports = pd.read_csv(import_path, sep=';', encoding='utf-8')
+    logger.info(f"[DATA] Loaded import_in_a_timescale.csv: {len(df_imports)} import records from October 2025")
+    imports = _aggregate_quantities(df_imports, name_col=1, qty_col=2)
+
+    # Load sale_in_a_timescale.csv (date; product; quantity)
+    df_sales = pd.read_csv(sale_path, sep=';', encoding='utf-8')
+    logger.info(f"[DATA] Loaded sale_in_a_timescale.csv: {len(df_sales)} sales records from October 2025")
+    sales = _aggregate_quantities(df_sales, name_col=1, qty_col=2)
+
+    # One integer id per product seen in any of the three files
+    names = products.index.append(imports.index).append(sales.index).unique()
+
+    columns = {
+        'names': np.asarray(names, dtype=object),
+        'has_info': names.isin(products.index),
+        'import_qty': imports.reindex(names, fill_value=0).to_numpy(dtype=np.int64),
+        'sale_qty': sales.reindex(names, fill_value=0).to_numpy(dtype=np.int64),
+    }
+    for column in ('initial_stock', 'import_price', 'retail_price'):
+        columns[column] = products[column].reindex(names, fill_value=0).to_numpy()
+
+    # Daily history for the LSTM: the last window_days days of the combined date range
+    import_dates, sale_dates = _parse_dates(df_imports), _parse_dates(df_sales)
+    last_date = max(import_dates.max(), sale_dates.max())
+    if pd.notna(last_date):
+        window = pd.date_range(end=last_date, periods=window_days, freq='D')
+        columns['recent_imports'] = _daily_window(df_imports, import_dates, 1, 2, names, window)
+        columns['recent_sales'] = _daily_window(df_sales, sale_dates, 1, 2, names, window)
+        columns['window_day_of_week'] = window.dayofweek.to_numpy(dtype=np.int64)
+
+    logger.info(f"Loaded timescale data: {len(products)} products, {len(imports)} imports, {len(sales)} sales")
+    return columns
+
+
+def load_timescale_data():
+    """
+    Load timescale data from CSV files
+    Returns: (product_info_dict, imports_dict, sales_dict)
+    """
+    try:
+        columns = load_timescale_columns()
+    except Exception as e:
+        logger.error(f"Error loading timescale data: {e}")
+        return {}, {}, {}
+
+    product_info, imports_dict, sales_dict = {}, {}, {}
+    for i, name in enumerate(columns['names']):
+        if columns['has_info'][i]:
+            product_info[name] = {
+                'initial_stock': int(columns['initial_stock'][i]),
+                'import_price': float(columns['import_price'][i]),
+                'retail_price': float(columns['retail_price'][i]),
+            }
+        if columns['import_qty'][i]:
+            imports_dict[name] = int(columns['import_qty'][i])
+        if columns['sale_qty'][i]:
+            sales_dict[name] = int(columns['sale_qty'][i])
+    return product_info, imports_dict, sales_dict
+
+
+def _files_signature(paths):
+    """(mtime_ns, size) per file; None for files that are missing"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class TimescaleSnapshot:
+    """
+    Immutable, columnar view of the timescale data at one version
+    Every column is a read-only NumPy array indexed by product id; id
+    num_products is a sentinel row of zeros used for unknown products.
+    """
+
+    __slots__ = ('version', 'signature', 'loaded_at', 'load_seconds', 'names', 'name_to_id',
+                 'has_info', 'window_day_of_week') + TIMESCALE_COLUMNS + TIMESCALE_WINDOW_COLUMNS
+
+    def __init__(self, version, signature, columns, load_seconds=0.0, window_days=LSTM_SEQUENCE_LENGTH):
+        set_attr = object.__setattr__
+        set_attr(self, 'version', version)
+        set_attr(self, 'signature', signature)
+        set_attr(self, 'loaded_at', datetime.now().isoformat())
+        set_attr(self, 'load_seconds', load_seconds)
+
+        names = np.asarray(columns.get('names', ()), dtype=object)
+        names.setflags(write=False)
+        set_attr(self, 'names', names)
+        set_attr(self, 'name_to_id', MappingProxyType({name: i for i, name in enumerate(names)}))
+
+        for column in ('has_info',) + TIMESCALE_COLUMNS:
+            default = np.zeros(len(names), dtype=bool if column == 'has_info' else np.float64)
+            values = np.asarray(columns.get(column, default))
+            # Append the zero sentinel row for unknown products
+            values = np.append(values, np.zeros(1, dtype=values.dtype))
+            values.setflags(write=False)
+            set_attr(self, column, values)
+
+        # Without dated history the window holds zeros and no weekdays
+        day_of_week = np.asarray(columns.get('window_day_of_week', np.zeros(window_days)), dtype=np.int64)
+        day_of_week.setflags(write=False)
+        set_attr(self, 'window_day_of_week', day_of_week)
+        for column in TIMESCALE_WINDOW_COLUMNS:
+            values = np.asarray(columns.get(column, np.zeros((len(names), len(day_of_week)))), dtype=np.float64)
+            values = np.concatenate([values, np.zeros((1, len(day_of_week)))])
+            values.setflags(write=False)
+            set_attr(self, column, values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TimescaleSnapshot is immutable')
+
+    @property
+    def num_products(self):
+        return len(self.names)
+
+    def product_ids(self, product_names):
+        """Map names to product ids; unknown names map to the sentinel id"""
+        lookup = self.name_to_id.get
+        missing = self.num_products
+        return np.fromiter(
+            (lookup(name, missing) for name in product_names),
+            dtype=np.int64,
+            count=len(product_names)
+        )
+
+    def gather(self, product_names):
+        """
+        Fetch all columns for a batch of products with one fancy-index per column
+        Returns: dict column -> array aligned with product_names (zeros when unknown)
+        """
+        ids = self.product_ids(product_names)
+        gathered = {column: getattr(self, column)[ids] for column in TIMESCALE_COLUMNS + TIMESCALE_WINDOW_COLUMNS}
+        gathered['has_info'] = self.has_info[ids]
+        gathered['product_id'] = ids
+        return gathered
+
+
+class TimescaleSnapshotStore:
+    """
+    Loads the timescale CSVs once and serves the current snapshot
+    The files' mtime/size are re-checked at most every check_interval seconds;
+    on change a background thread builds the new snapshot and swaps it in,
+    while requests keep reading the previous one.
+    """
+
+    def __init__(self, paths=TIMESCALE_FILES, check_interval=TIMESCALE_CHECK_INTERVAL):
+        self._paths = tuple(paths)
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._versions = itertools.count(1)
+        self._reloading = False
+        self._last_check = 0.0
+
+    def get(self):
+        """Return the current snapshot, loading it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build(_files_signature(self._paths))
+                    self._last_check = time.monotonic()
+                return self._snapshot
+
+        self._maybe_reload(snapshot)
+        return snapshot
+
+    def refresh(self):
+        """Synchronously reload the files and return the new snapshot"""
+        with self._lock:
+            self._snapshot = self._build(_files_signature(self._paths))
+            self._last_check = time.monotonic()
+            return self._snapshot
+
+    def _maybe_reload(self, snapshot):
+        now = time.monotonic()
+        if now - self._last_check < self._check_interval:
+            return
+
+        with self._lock:
+            if self._reloading or now - self._last_check < self._check_interval:
+                return
+            self._last_check = now
+            signature = _files_signature(self._paths)
+            if signature == snapshot.signature:
+                return
+            self._reloading = True
+
+        logger.info(f"[DATA] Timescale files changed, reloading snapshot v{snapshot.version} in background")
+        threading.Thread(
+            target=self._reload_in_background,
+            args=(signature,),
+            name='timescale-reload',
+            daemon=True
+        ).start()
+
+    def _reload_in_background(self, signature):
+        try:
+            snapshot = self._build(signature, raise_errors=True)
+            with self._lock:
+                self._snapshot = snapshot
+        except Exception as e:
+            logger.error(f"[DATA] Timescale reload failed, keeping previous snapshot: {e}")
+        finally:
+            self._reloading = False
+
+    def _build(self, signature, raise_errors=False):
+        start_time = time.perf_counter()
+        try:
+            columns = load_timescale_columns(self._paths)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error loading timescale data: {e}")
+            # Unknown signature forces a retry on the next check
+            columns, signature = {}, None
+
+        snapshot = TimescaleSnapshot(
+            next(self._versions), signature, columns,
+            load_seconds=time.perf_counter() - start_time
+        )
+        logger.info(f"[DATA] Timescale snapshot v{snapshot.version} ready in {snapshot.load_seconds * 1000:.1f}ms")
+        return snapshot
+
+
+_store = TimescaleSnapshotStore()
+
+
+def get_timescale_snapshot():
+    """Return the process-wide timescale snapshot"""
+    return _store.get()
+
+
+def refresh_timescale_snapshot():
+    """Force a synchronous reload of the process-wide snapshot"""
+    return _store.refresh()
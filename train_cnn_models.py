@@ -3,6 +3,8 @@
 Training Script for Deep Learning Models
 Train both CNN and LSTM models
 """
+import argparse
+import logging
 import os
 import sys
 import numpy as np
@@ -14,12 +16,98 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.cnn_model import CNNInvoiceDetector
 from models.lstm_model import ImportForecastLSTM, generate_invoice_based_data
+from config import (
+    BATCH_SIZE, CNN_FINE_TUNE, CNN_FEATURE_CACHE, CNN_FEATURE_CACHE_DIR,
+    CNN_DATA_CACHE_DIR, CNN_SHUFFLE_BUFFER
+)
 
 
 
 
-def train_cnn_model():
-    """Train CNN model with invoice images from dataset_product.csv"""
+def build_targets(entries, store_type_map):
+    """Feature-regression and one-hot store-type targets for metadata entries"""
+    y_features = np.zeros((len(entries), 128))
+    y_types = np.zeros((len(entries), 10))
+    for i, data in enumerate(entries):
+        y_features[i, 0] = min(data['total_amount'] / 1000000.0, 1.0)  # Normalize total
+        y_features[i, 1] = data['num_products'] / 20.0  # Normalize count
+        y_types[i, store_type_map.get(data['store_name'], 0)] = 1.0  # One-hot store type
+    return y_features, y_types
+
+
+def make_image_dataset(entries, store_type_map, model, split, batch_size=12, shuffle=False):
+    """
+    Streaming tf.data pipeline of (image, targets) batches for end-to-end training
+    Images are decoded and resized on all cores, cached to a local file keyed
+    by the metadata (so only the first epoch decodes), shuffled within a
+    bounded buffer, batched and prefetched; memory does not grow with the dataset.
+    """
+    import hashlib
+    import json
+    import tensorflow as tf
+
+    y_features, y_types = build_targets(entries, store_type_map)
+    paths = [data['image_path'] for data in entries]
+
+    def decode(path, targets):
+        img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        # Area resize to [0, 1] RGB, as at serving time (models/preprocessing.py)
+        img = tf.image.resize(img, (model.img_height, model.img_width), method='area') / 255.0
+        img.set_shape((model.img_height, model.img_width, 3))
+        return img, targets
+
+    # A changed image list or file, image size or target mapping gets a fresh cache file
+    fingerprint = hashlib.sha256(json.dumps([
+        paths, [os.stat(path).st_mtime_ns for path in paths],
+        [model.img_height, model.img_width], sorted(store_type_map.items())
+    ]).encode('utf-8')).hexdigest()[:16]
+    CNN_DATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_file = str(CNN_DATA_CACHE_DIR / f"{split}_{fingerprint}")
+    # tf.data writes the .index file last; without it an earlier run was interrupted
+    # mid-epoch and left shards plus a .lockfile that would make this run fail.
+    # A new cache also supersedes the split's caches for older fingerprints
+    # (changed images or input size), which would otherwise pile up on disk
+    if not os.path.exists(cache_file + '.index'):
+        for stale in CNN_DATA_CACHE_DIR.glob(f"{split}_*"):
+            stale.unlink()
+
+    dataset = tf.data.Dataset.from_tensor_slices((
+        paths,
+        {'invoice_features': y_features.astype(np.float32), 'invoice_type': y_types.astype(np.float32)}
+    ))
+    dataset = dataset.map(decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    dataset = dataset.cache(cache_file)
+    if shuffle:
+        dataset = dataset.shuffle(min(len(paths), CNN_SHUFFLE_BUFFER), reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def load_backbone_features(entries, model):
+    """Pooled MobileNetV2 features (N, 1280), computed once per image and memory-mapped"""
+    from models.feature_cache import BackboneFeatureCache
+    from models.preprocessing import preprocess_batch
+
+    cache = BackboneFeatureCache(
+        CNN_FEATURE_CACHE_DIR,
+        signature={'backbone': 'MobileNetV2-imagenet', 'input': [model.img_height, model.img_width],
+                   'preprocessing': 'cv2-area-rgb-01'},
+        feature_dim=model.backbone.output_shape[-1]
+    )
+
+    def extract(paths):
+        return model.extract_backbone_features(preprocess_batch(paths, model.img_height, model.img_width))
+
+    return cache.features([data['image_path'] for data in entries], extract, batch_size=BATCH_SIZE)
+
+
+def train_cnn_model(fine_tune=CNN_FINE_TUNE, use_feature_cache=CNN_FEATURE_CACHE):
+    """
+    Train CNN model with invoice images from dataset_product.csv
+    Args:
+        fine_tune: Unfreeze MobileNetV2 and train end to end on images
+        use_feature_cache: With a frozen backbone, train only the head on cached
+                           pooled features (ignored when fine_tune is set)
+    """
     print("\n" + "="*60)
     print("Training CNN Model for Invoice OCR")
     print("="*60)
@@ -39,11 +127,16 @@ def train_cnn_model():
     if os.path.exists(valid_metadata):
         print(f"    Found validation images: {valid_metadata}")
     
+    # Frozen-backbone feature training only makes sense while the backbone is frozen
+    cached_features = use_feature_cache and not fine_tune
+
     # Step 2: Initialize CNN model
     print("\n2. Building CNN architecture...")
-    model = CNNInvoiceDetector()
+    model = CNNInvoiceDetector(stage_workers=0)
     model.build_model()
-    model.compile_model()
+    if fine_tune:
+        model.set_backbone_trainable(True)
+    model.compile_model(model.head_model if cached_features else None)
     
     print("\n3. Model architecture:")
     print(f"   Input: {model.img_height}x{model.img_width}x3 (RGB images)")
@@ -51,11 +144,16 @@ def train_cnn_model():
     print(f"   Output: Invoice features (128-dim) + Invoice type (10 classes)")
     print(f"   Loss: Huber (robust) + CrossEntropy")
     print(f"   Optimizer: Adam (lr=0.01, clipnorm=1.0)")
+    if fine_tune:
+        print(f"   Mode: end-to-end fine-tuning (backbone unfrozen)")
+    elif cached_features:
+        print(f"   Mode: head only, on cached backbone features ({CNN_FEATURE_CACHE_DIR})")
+    else:
+        print(f"   Mode: end-to-end with frozen backbone")
     
     # Step 3: Load and preprocess images
     print("\n4. Loading training images from dataset...")
     import json
-    from tensorflow.keras.preprocessing import image as keras_image
     
     # Load training metadata
     with open(train_metadata, 'r', encoding='utf-8') as f:
@@ -63,75 +161,23 @@ def train_cnn_model():
     
     print(f"   Loading {len(train_data)} training images from dataset_product.csv...")
     
-    X_train = []
-    y_features_train = []
-    y_types_train = []
-    
     # Store types for one-hot encoding
-    store_types = list(set([d['store_name'] for d in train_data]))
+    store_types = sorted(set([d['store_name'] for d in train_data]))  # Same mapping (and cache) every run
     store_type_map = {name: idx for idx, name in enumerate(store_types)}
     
     print(f"   Detected {len(store_types)} store types")
     
-    for i, data in enumerate(train_data):
-        # Load image
-        img = keras_image.load_img(data['image_path'], target_size=(model.img_height, model.img_width))
-        img_array = keras_image.img_to_array(img) / 255.0  # Normalize
-        X_train.append(img_array)
-        
-        # Create feature vector
-        feature_vec = np.zeros(128)
-        feature_vec[0] = min(data['total_amount'] / 1000000.0, 1.0)  # Normalize total
-        feature_vec[1] = data['num_products'] / 20.0  # Normalize count
-        y_features_train.append(feature_vec)
-        
-        # One-hot encode store type
-        type_vec = np.zeros(10)
-        store_idx = store_type_map[data['store_name']]
-        type_vec[store_idx] = 1.0
-        y_types_train.append(type_vec)
-        
-        if (i + 1) % 100 == 0:
-            print(f"      Loaded {i + 1}/{len(train_data)} images...")
-    
-    X_train = np.array(X_train)
-    y_features_train = np.array(y_features_train)
-    y_types_train = np.array(y_types_train)
-    
-    print(f"    Training data ready: {X_train.shape}")
-    
     # Load validation data if available
-    X_val, y_features_val, y_types_val = None, None, None
+    valid_data = None
     if os.path.exists(valid_metadata):
-        print("\n   Loading validation images...")
         with open(valid_metadata, 'r', encoding='utf-8') as f:
             valid_data = json.load(f)
-        
         print(f"   Loading {len(valid_data)} validation images...")
-        
-        X_val = []
-        y_features_val = []
-        y_types_val = []
-        
-        for i, data in enumerate(valid_data):
-            img = keras_image.load_img(data['image_path'], target_size=(model.img_height, model.img_width))
-            img_array = keras_image.img_to_array(img) / 255.0
-            X_val.append(img_array)
-            
-            feature_vec = np.zeros(128)
-            feature_vec[0] = min(data['total_amount'] / 1000000.0, 1.0)
-            feature_vec[1] = data['num_products'] / 20.0
-            y_features_val.append(feature_vec)
-            
-            type_vec = np.zeros(10)
-            store_idx = store_type_map.get(data['store_name'], 0)
-            type_vec[store_idx] = 1.0
-            y_types_val.append(type_vec)
-        
-        X_val = np.array(X_val)
-        y_features_val = np.array(y_features_val)
-        y_types_val = np.array(y_types_val)
-        print(f"   ✅ Validation data ready: {X_val.shape}")
+    elif not cached_features:
+        # tf.data inputs cannot use validation_split: hold out 20% of the training images
+        train_data, valid_data = train_test_split(train_data, test_size=0.2, random_state=42)
+        print(f"   Holding out {len(valid_data)} training images for validation")
+    num_train_images = len(train_data)
     
     # Step 4: Train model (48 epochs with batch size 12)
     print("\n5. Training model (48 epochs with batch size 12)...")
@@ -142,24 +188,47 @@ def train_cnn_model():
         ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6)
     ]
     
-    # Use validation data if available, otherwise use validation_split
-    if X_val is not None:
-        history = model.model.fit(
-            X_train,
-            {'invoice_features': y_features_train, 'invoice_type': y_types_train},
-            validation_data=(X_val, {'invoice_features': y_features_val, 'invoice_type': y_types_val}),
-            epochs=80,  # Increased from 48 to 80 for better convergence
-            batch_size=12,
-            callbacks=callbacks,
-            verbose=1
-        )
+    if cached_features:
+        # The head model shares its layers with model.model, so this trains model.model
+        X_train = load_backbone_features(train_data, model)
+        y_features_train, y_types_train = build_targets(train_data, store_type_map)
+        print(f"    Training features ready: {X_train.shape}")
+
+        # Use validation data if available, otherwise use validation_split
+        if valid_data is not None:
+            X_val = load_backbone_features(valid_data, model)
+            y_features_val, y_types_val = build_targets(valid_data, store_type_map)
+            print(f"   ✅ Validation features ready: {X_val.shape}")
+            history = model.head_model.fit(
+                X_train,
+                {'invoice_features': y_features_train, 'invoice_type': y_types_train},
+                validation_data=(X_val, {'invoice_features': y_features_val, 'invoice_type': y_types_val}),
+                epochs=80,  # Increased from 48 to 80 for better convergence
+                batch_size=12,
+                callbacks=callbacks,
+                verbose=1
+            )
+        else:
+            history = model.head_model.fit(
+                X_train,
+                {'invoice_features': y_features_train, 'invoice_type': y_types_train},
+                epochs=80,  # Increased from 48 to 80 for better convergence
+                batch_size=12,
+                validation_split=0.2,
+                callbacks=callbacks,
+                verbose=1
+            )
     else:
+        # Images are streamed: decoded in parallel, cached to disk after the first epoch
+        train_dataset = make_image_dataset(train_data, store_type_map, model, 'train', batch_size=12, shuffle=True)
+        valid_dataset = make_image_dataset(valid_data, store_type_map, model, 'valid', batch_size=12)
+        print(f"    Training pipeline ready: {train_dataset.element_spec[0]}")
+
         history = model.model.fit(
-            X_train,
-            {'invoice_features': y_features_train, 'invoice_type': y_types_train},
+            train_dataset,
+            validation_data=valid_dataset,
             epochs=80,  # Increased from 48 to 80 for better convergence
-            batch_size=12,
-            validation_split=0.2,
+            shuffle=False,  # The dataset shuffles itself
             callbacks=callbacks,
             verbose=1
         )
@@ -183,7 +252,7 @@ def train_cnn_model():
     print("\n" + "="*60)
     print("CNN Model Training Complete!")
     print("="*60)
-    print(f"\nModel trained on {len(X_train)} synthetic invoice images")
+    print(f"\nModel trained on {num_train_images} synthetic invoice images")
     print(f"From dataset_product.csv (single unified dataset)")
     
     return model, history
@@ -191,6 +260,16 @@ def train_cnn_model():
 
 def main():
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description="Train the CNN invoice detector")
+    parser.add_argument('--fine-tune', action='store_true', default=CNN_FINE_TUNE,
+                        help='Unfreeze MobileNetV2 and train end to end')
+    parser.add_argument('--no-feature-cache', dest='feature_cache', action='store_false',
+                        default=CNN_FEATURE_CACHE,
+                        help='Push every image through the frozen backbone each epoch')
+    args = parser.parse_args()
+    # Show the feature cache's progress messages alongside the prints below
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     print("\n")
     print("=" + "="*58 + "=")
     print(" "*10 + "DEEP LEARNING MODEL TRAINING" + " "*20)
@@ -206,7 +285,7 @@ def main():
         
         # Train CNN model (with generated images from dataset_product.csv)
         print("\n[CNN] Training invoice detection model...")
-        cnn_model, cnn_history = train_cnn_model()
+        cnn_model, cnn_history = train_cnn_model(fine_tune=args.fine_tune, use_feature_cache=args.feature_cache)
         
         print("\n" + "="*60)
         print("[OK] CNN MODEL TRAINED SUCCESSFULLY!")
@@ -15,8 +15,9 @@ import pickle
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config import LSTM_MODEL_PATH, LSTM_SCALER_PATH
+from config import LSTM_MODEL_PATH, LSTM_SCALER_PATH, LSTM_NUMPY_PATH
 from models.lstm_model import ImportForecastLSTM
+from models.lstm_numpy import export_lstm_npz
 
 # Constants
 SEQUENCE_LENGTH = 7  # Use 7 days of history to predict next import
@@ -45,8 +46,12 @@ def load_timeseries_data():
     df_products.columns = ['product', 'initial_stock', 'cost_price', 'retail_price', 'import_price']
     df_products['product'] = df_products['product'].str.strip()
     
+    # Initial stock is numeric already (pandas reads it as float, so stripping '.' would scale it by 10);
+    # truncated to whole units like the serving snapshot
+    df_products['initial_stock'] = pd.to_numeric(df_products['initial_stock'], errors='coerce').fillna(0).astype('int64')
+    
     # Parse prices (remove thousand separators)
-    for col in ['initial_stock', 'import_price', 'retail_price']:
+    for col in ['import_price', 'retail_price']:
         df_products[col] = df_products[col].astype(str).str.replace('.', '').str.replace(',', '.').astype(float)
     
     # Get date range
@@ -290,6 +295,11 @@ def main():
     print(f"[SAVED] Model: {LSTM_MODEL_PATH}")
     print(f"[SAVED] Scaler: {LSTM_SCALER_PATH}")
     
+    # 8. Export weights + scalers for the TensorFlow-free serving engine
+    model.scaler = {'feature_scaler': feature_scaler, 'target_scaler': target_scaler}
+    export_lstm_npz(model, str(LSTM_NUMPY_PATH))
+    print(f"[SAVED] NumPy engine: {LSTM_NUMPY_PATH}")
+    
     print("\n" + "=" * 60)
     print("TRAINING COMPLETE")
     print("=" * 60)
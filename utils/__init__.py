@@ -10,6 +10,7 @@ from .data_processor import (
 )
 
 from .invoice_processor import (
+    CatalogIndex,
     load_product_catalogs,
     build_catalog_index,
     lookup_catalog_price,
@@ -23,6 +24,7 @@ __all__ = [
     'extract_quantity_from_line',
     'extract_price_candidates',
     'build_dataframe_from_invoices',
+    'CatalogIndex',
     'load_product_catalogs',
     'build_catalog_index',
     'lookup_catalog_price',
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Catalog Artifact
+Prebuilt binary form of data/product_catalogs.json (ids, prices, original and
+normalized names, Aho-Corasick matcher arrays) that is memory-mapped instead
+of parsed, so every worker process shares the same page-cache pages.
+
+The artifact records the sha256 of the JSON it was built from and is rebuilt
+only when that hash changes. Build it offline with:
+    python -m utils.catalog_artifact
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+from config import CATALOG_PATH, CATALOG_ARTIFACT_PATH
+from utils.data_processor import normalize_text
+from utils.logger import get_logger
+from utils.text_matcher import AhoCorasickMatcher
+
+logger = get_logger(__name__)
+
+ARTIFACT_MAGIC = b'CATIDX01'
+ARTIFACT_FORMAT_VERSION = 2
+# Sections start on 8-byte boundaries so np.frombuffer views stay aligned
+SECTION_ALIGNMENT = 8
+MATCHER_PREFIX = 'matcher_'
+
+
+def source_sha256(path):
+    """sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _flatten_catalogs(catalogs):
+    """
+    Flatten both catalog layouts into (stores, store_codes, products)
+    A plain list (current format) is a single store keyed None; a
+    {store: [products]} dict (legacy format) keeps its store keys.
+    """
+    if isinstance(catalogs, list):
+        return [None], [0] * len(catalogs), catalogs
+    if isinstance(catalogs, dict):
+        stores, store_codes, products = [], [], []
+        for store_key, store_products in catalogs.items():
+            if not isinstance(store_products, list):
+                continue
+            stores.append(store_key)
+            store_codes.extend([len(stores) - 1] * len(store_products))
+            products.extend(store_products)
+        return stores, store_codes, products
+    raise ValueError(f"Unsupported catalog layout: {type(catalogs).__name__}")
+
+
+def _pack_strings(strings):
+    """UTF-8 blob plus (N + 1) int64 offsets"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _price_array(products):
+    prices = [product.get('price', 0) or 0 for product in products]
+    if all(isinstance(price, int) for price in prices):
+        return np.array(prices, dtype=np.int64)
+    return np.array(prices, dtype=np.float64)
+
+
+def build_catalog_artifact(source_path=CATALOG_PATH, artifact_path=CATALOG_ARTIFACT_PATH):
+    """
+    Parse the catalog JSON once and write the binary artifact
+    The file is written next to the target and renamed into place, so
+    readers never map a half-written artifact.
+    Returns:
+        Path of the written artifact
+    """
+    source_path = Path(source_path)
+    artifact_path = Path(artifact_path)
+
+    raw = source_path.read_bytes()
+    catalogs = json.loads(raw.decode('utf-8'))
+    stores, store_codes, products = _flatten_catalogs(catalogs)
+
+    names = [str(product.get('name', '') or '') for product in products]
+    normalized_names = [normalize_text(name) for name in names]
+
+    product_ids = [product.get('id') for product in products]
+    sections = {
+        'prices': _price_array(products),
+        'store_codes': np.array(store_codes, dtype=np.int32),
+        # Products without an id decode to None, not ''
+        'has_id': np.array([product_id is not None for product_id in product_ids], dtype=np.uint8),
+    }
+    for key, strings in (
+        ('ids', ['' if product_id is None else str(product_id) for product_id in product_ids]),
+        ('names', names),
+        ('normalized_names', normalized_names),
+    ):
+        sections[key + '_blob'], sections[key + '_offsets'] = _pack_strings(strings)
+    for key, array in AhoCorasickMatcher(normalized_names).to_arrays().items():
+        sections[MATCHER_PREFIX + key] = array
+
+    # Lay out sections after the header
+    layout = {}
+    offset = 0
+    for key, array in sections.items():
+        layout[key] = {'offset': offset, 'dtype': array.dtype.str, 'length': int(array.size)}
+        offset += array.nbytes
+        offset += -offset % SECTION_ALIGNMENT
+
+    header = json.dumps({
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'source_sha256': hashlib.sha256(raw).hexdigest(),
+        'count': len(products),
+        'stores': stores,
+        'sections': layout,
+    }, ensure_ascii=False).encode('utf-8')
+    prefix_size = len(ARTIFACT_MAGIC) + 4 + len(header)
+    data_start = prefix_size + (-prefix_size % SECTION_ALIGNMENT)
+
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = artifact_path.with_name(f'{artifact_path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as handle:
+            handle.write(ARTIFACT_MAGIC)
+            handle.write(struct.pack('<I', len(header)))
+            handle.write(header)
+            for key, array in sections.items():
+                handle.seek(data_start + layout[key]['offset'])
+                handle.write(array.tobytes())
+            handle.truncate(data_start + offset)
+        os.replace(tmp_path, artifact_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    logger.info(f"Catalog artifact built: {len(products)} products -> {artifact_path}")
+    return artifact_path
+
+
+class MappedCatalog(Sequence):
+    """
+    Read-only product list backed by the mapped artifact
+    Items are {'id', 'name', 'price'} dicts decoded on access.
+    """
+
+    def __init__(self, artifact):
+        self._artifact = artifact
+        self.prices = artifact.arrays['prices']
+
+    def __len__(self):
+        return self._artifact.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('catalog index out of range')
+        return {
+            'id': self._artifact.product_id(index),
+            'name': self._artifact.string('names', index),
+            'price': self.prices[index].item(),
+        }
+
+
+class CatalogArtifact:
+    """
+    Memory-mapped catalog artifact
+    Arrays are zero-copy views into the shared mapping; only the matcher's
+    transition dict is materialized per process.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+            raise ValueError(f"Not a catalog artifact: {self.path}")
+        header_start = len(ARTIFACT_MAGIC) + 4
+        (header_size,) = struct.unpack('<I', self._mmap[len(ARTIFACT_MAGIC):header_start])
+        header = json.loads(self._mmap[header_start:header_start + header_size].decode('utf-8'))
+        if header.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog artifact format: {header.get('format_version')}")
+
+        prefix_size = header_start + header_size
+        data_start = prefix_size + (-prefix_size % SECTION_ALIGNMENT)
+
+        self.source_sha256 = header['source_sha256']
+        self.count = header['count']
+        self.stores = header['stores']
+        self.arrays = {
+            key: np.frombuffer(
+                self._mmap, dtype=np.dtype(spec['dtype']),
+                count=spec['length'], offset=data_start + spec['offset']
+            )
+            for key, spec in header['sections'].items()
+        }
+        self._catalog = None
+        self._matcher = None
+
+    def string(self, key, index):
+        """Decode the index-th string of a packed string section"""
+        offsets = self.arrays[key + '_offsets']
+        start, end = int(offsets[index]), int(offsets[index + 1])
+        return bytes(self.arrays[key + '_blob'][start:end]).decode('utf-8')
+
+    def product_id(self, index):
+        """Product id of the index-th product, None if the catalog entry had none"""
+        return self.string('ids', index) if self.arrays['has_id'][index] else None
+
+    def product_ids(self):
+        """All product ids, None where the catalog entry had none"""
+        return [
+            product_id if has_id else None
+            for product_id, has_id in zip(self.strings('ids'), self.arrays['has_id'].tolist())
+        ]
+
+    def strings(self, key):
+        """Decode a whole packed string section"""
+        blob = bytes(self.arrays[key + '_blob'])
+        offsets = self.arrays[key + '_offsets'].tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.count)]
+
+    @property
+    def catalog(self):
+        """Products as a lazy sequence of {'id', 'name', 'price'} dicts"""
+        if self._catalog is None:
+            self._catalog = MappedCatalog(self)
+        return self._catalog
+
+    @property
+    def matcher(self):
+        """Aho-Corasick matcher over the normalized names"""
+        if self._matcher is None:
+            self._matcher = AhoCorasickMatcher.from_arrays({
+                key[len(MATCHER_PREFIX):]: array
+                for key, array in self.arrays.items() if key.startswith(MATCHER_PREFIX)
+            })
+        return self._matcher
+
+    def catalog_index(self):
+        """CatalogIndex with precomputed normalized names; the matcher is mapped on first use"""
+        from utils.invoice_processor import CatalogIndex
+
+        ids = self.product_ids()
+        names = self.strings('names')
+        normalized_names = self.strings('normalized_names')
+        prices = self.arrays['prices'].tolist()
+        store_codes = self.arrays['store_codes'].tolist()
+
+        entries = [{
+            'store': self.stores[store_codes[i]],
+            'product': {'id': ids[i], 'name': names[i], 'price': prices[i]},
+            'name_normalized': normalized_names[i]
+        } for i in range(self.count)]
+        return CatalogIndex(entries, matcher_loader=lambda: self.matcher)
+
+    def close(self):
+        # Views handed out keep the buffer alive; let GC release it then
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+_artifact_lock = threading.Lock()
+# artifact path -> (source stat key, CatalogArtifact)
+_loaded_artifacts = {}
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_catalog_artifact(source_path=CATALOG_PATH, artifact_path=CATALOG_ARTIFACT_PATH, rebuild=True):
+    """
+    Return the mapped artifact for source_path, rebuilding it if the source hash changed
+    Within a process the artifact is cached; the source is only re-hashed when
+    its size or mtime changes, and only re-mapped when the hash differs.
+    Args:
+        rebuild: Build a missing or stale artifact (including its matcher, ~1.5 s
+            for the shipped catalog); with False a ValueError is raised instead
+    """
+    source_path = Path(source_path)
+    artifact_path = Path(artifact_path)
+    stat_key = _stat_key(source_path)
+
+    with _artifact_lock:
+        cached = _loaded_artifacts.get(artifact_path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        digest = source_sha256(source_path)
+        if cached is not None and cached[1].source_sha256 == digest:
+            _loaded_artifacts[artifact_path] = (stat_key, cached[1])
+            return cached[1]
+
+        artifact = None
+        if artifact_path.exists():
+            try:
+                artifact = CatalogArtifact(artifact_path)
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Ignoring unreadable catalog artifact {artifact_path}: {exc}")
+            if artifact is not None and artifact.source_sha256 != digest:
+                logger.info("Catalog source changed, rebuilding artifact")
+                artifact.close()
+                artifact = None
+
+        if artifact is None:
+            if not rebuild:
+                raise ValueError(
+                    f"Catalog artifact {artifact_path} is missing or stale "
+                    f"(build it with: python -m utils.catalog_artifact)"
+                )
+            build_catalog_artifact(source_path, artifact_path)
+            artifact = CatalogArtifact(artifact_path)
+
+        _loaded_artifacts[artifact_path] = (stat_key, artifact)
+        return artifact
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the memory-mapped product catalog artifact')
+    parser.add_argument('--source', default=str(CATALOG_PATH), help='Catalog JSON file')
+    parser.add_argument('--output', default=str(CATALOG_ARTIFACT_PATH), help='Artifact file to write')
+    args = parser.parse_args()
+
+    path = build_catalog_artifact(args.source, args.output)
+    artifact = CatalogArtifact(path)
+    print(f"Wrote {path} ({path.stat().st_size / 1024:.1f} KB, {artifact.count} products, "
+          f"source sha256 {artifact.source_sha256[:12]})")
@@ -4,11 +4,18 @@ SQLite database for persistent storage
 """
 import sqlite3
 import json
+import os
+import base64
+import atexit
+import threading
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
 
-from config import BASE_DIR
+from config import (
+    BASE_DIR, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHED_STATEMENTS, DB_BULK_CHUNK_SIZE
+)
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -19,20 +26,108 @@ DB_DIR.mkdir(exist_ok=True)
 DB_PATH = DB_DIR / 'invoices.db'
 
 
+class ConnectionPool:
+    """
+    Thread-safe pool of configured SQLite connections
+
+    A thread checks out one connection for the outermost get_db_connection()
+    block and reuses it for any nested block; on exit it goes back to the idle
+    stack for the next request. Connections are configured once for WAL
+    journaling, so readers no longer block behind a writer.
+    """
+
+    def __init__(self, db_path, max_idle=DB_POOL_SIZE,
+                 busy_timeout_ms=DB_BUSY_TIMEOUT_MS, cached_statements=DB_CACHED_STATEMENTS):
+        self.db_path = str(db_path)
+        self.max_idle = max_idle
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._idle = []
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False  # Handed between threads, never shared concurrently
+        )
+        conn.row_factory = sqlite3.Row  # Access columns by name
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        # INSERT OR REPLACE must fire DELETE triggers for the statistics tables
+        conn.execute('PRAGMA recursive_triggers=ON')
+        return conn
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: inherited connections belong to the parent
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Yield this thread's connection; the outermost block commits or rolls back"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self._acquire()
+        local.conn = conn
+        local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            local.conn = None
+            local.depth = 0
+            self._release(conn)
+
+    def close_all(self):
+        """Close idle connections (checked-out ones close when released)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_idle = 0
+        for conn in idle:
+            conn.close()
+
+
+_pool = ConnectionPool(DB_PATH)
+atexit.register(_pool.close_all)
+
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row  # Access columns by name
+    """Context manager for pooled database connections"""
     try:
-        yield conn
-        conn.commit()
+        with _pool.connection() as conn:
+            yield conn
     except Exception as e:
-        conn.rollback()
         logger.error(f"Database error: {e}")
         raise
-    finally:
-        conn.close()
 
 
 def init_database():
@@ -68,9 +163,221 @@ def init_database():
             )
         ''')
         
+        _run_migrations(conn)
+        
         logger.info("Database initialized successfully")
 
 
+def _invoice_line_rows(invoice_id, products, created_at):
+    """Rows for invoice_lines from an invoice's product list"""
+    rows = []
+    for product in products or []:
+        if not isinstance(product, dict):
+            continue
+        rows.append((
+            invoice_id,
+            product.get('product_id'),
+            product.get('product_name'),
+            product.get('quantity') or 0,
+            product.get('unit_price') or 0,
+            product.get('line_total') or 0,
+            created_at
+        ))
+    return rows
+
+
+def _insert_invoice_lines(cursor, rows):
+    cursor.executemany('''
+        INSERT INTO invoice_lines
+        (invoice_id, product_id, product_name, quantity, unit_price, line_total, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def _migrate_invoice_lines(cursor):
+    """v1: normalized invoice_lines table, backfilled from invoices.products"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id TEXT NOT NULL,
+            product_id TEXT,
+            product_name TEXT,
+            quantity INTEGER,
+            unit_price REAL,
+            line_total REAL,
+            created_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_invoice_lines_product_created
+        ON invoice_lines (product_id, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice
+        ON invoice_lines (invoice_id)
+    ''')
+    
+    # Backfill from the JSON blobs of existing invoices
+    backfilled = 0
+    cursor.execute('DELETE FROM invoice_lines')
+    for row in cursor.execute('SELECT invoice_id, products, created_at FROM invoices').fetchall():
+        try:
+            products = json.loads(row['products'] or '[]')
+        except ValueError:
+            logger.warning(f"Skipping invoice {row['invoice_id']}: unreadable products JSON")
+            continue
+        rows = _invoice_line_rows(row['invoice_id'], products, row['created_at'])
+        _insert_invoice_lines(cursor, rows)
+        backfilled += len(rows)
+    logger.info(f"Backfilled {backfilled} invoice lines")
+
+
+# Per-row contributions to the statistics tables ({row} is NEW or OLD)
+STATS_DELTAS = {
+    'invoices': {
+        'invoice_count': '1',
+        'total_amount': 'COALESCE({row}.total_amount, 0)',
+        'confidence_sum': 'COALESCE({row}.confidence, 0)',
+        'confidence_count': '({row}.confidence IS NOT NULL)',
+    },
+    'forecasts': {
+        'forecast_count': '1',
+    },
+}
+STATS_COLUMNS = ('invoice_count', 'forecast_count', 'total_amount', 'confidence_sum', 'confidence_count')
+
+
+def _stats_delta_sql(table, row, sign):
+    """Statements adding (sign=+1) or removing (sign=-1) one row's contribution"""
+    deltas = {column: f"{sign} * {expr.format(row=row)}" for column, expr in STATS_DELTAS[table].items()}
+    summary = ', '.join(f"{column} = {column} + {delta}" for column, delta in deltas.items())
+    columns = ', '.join(deltas)
+    values = ', '.join(deltas.values())
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in deltas)
+    return (
+        f"UPDATE stats_summary SET {summary} WHERE id = 1;\n"
+        f"INSERT INTO stats_daily (day, {columns}) "
+        f"VALUES (COALESCE(date({row}.created_at), ''), {values}) "
+        f"ON CONFLICT(day) DO UPDATE SET {updates};"
+    )
+
+
+def _rebuild_statistics(cursor):
+    """Recompute stats_daily and stats_summary from the base tables"""
+    cursor.execute('DELETE FROM stats_daily')
+    cursor.execute('''
+        INSERT INTO stats_daily
+        (day, invoice_count, forecast_count, total_amount, confidence_sum, confidence_count)
+        SELECT day, SUM(invoice_count), SUM(forecast_count), SUM(total_amount),
+               SUM(confidence_sum), SUM(confidence_count)
+        FROM (
+            SELECT COALESCE(date(created_at), '') AS day, 1 AS invoice_count, 0 AS forecast_count,
+                   COALESCE(total_amount, 0) AS total_amount, COALESCE(confidence, 0) AS confidence_sum,
+                   (confidence IS NOT NULL) AS confidence_count
+            FROM invoices
+            UNION ALL
+            SELECT COALESCE(date(created_at), ''), 0, 1, 0, 0, 0
+            FROM forecasts
+        )
+        GROUP BY day
+    ''')
+    cursor.execute('DELETE FROM stats_summary')
+    cursor.execute(f'''
+        INSERT INTO stats_summary (id, {', '.join(STATS_COLUMNS)})
+        SELECT 1, {', '.join(f'COALESCE(SUM({column}), 0)' for column in STATS_COLUMNS)}
+        FROM stats_daily
+    ''')
+
+
+def _migrate_statistics(cursor):
+    """v2: trigger-maintained stats_summary row and per-day stats_daily rollups"""
+    column_defs = '''
+            invoice_count INTEGER NOT NULL DEFAULT 0,
+            forecast_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            confidence_sum REAL NOT NULL DEFAULT 0,
+            confidence_count INTEGER NOT NULL DEFAULT 0
+    '''
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS stats_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            {column_defs}
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY NOT NULL,  -- YYYY-MM-DD (UTC, like created_at)
+            {column_defs}
+        )
+    ''')
+    
+    for table, watched in (('invoices', 'total_amount, confidence, created_at'), ('forecasts', 'created_at')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_insert AFTER INSERT ON {table}
+            BEGIN
+                {_stats_delta_sql(table, 'NEW', 1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_delete AFTER DELETE ON {table}
+            BEGIN
+                {_stats_delta_sql(table, 'OLD', -1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_update AFTER UPDATE OF {watched} ON {table}
+            BEGIN
+                {_stats_delta_sql(table, 'OLD', -1)}
+                {_stats_delta_sql(table, 'NEW', 1)}
+            END
+        ''')
+    
+    _rebuild_statistics(cursor)
+
+
+def _migrate_created_at_indexes(cursor):
+    """v3: (created_at, id) indexes backing keyset pagination of the history tables"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_invoices_created
+        ON invoices (created_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_forecasts_created
+        ON forecasts (created_at, id)
+    ''')
+
+
+# Schema migrations as (user_version, function), applied in order
+MIGRATIONS = [
+    (1, _migrate_invoice_lines),
+    (2, _migrate_statistics),
+    (3, _migrate_created_at_indexes),
+]
+
+
+def _run_migrations(conn):
+    """Apply migrations newer than PRAGMA user_version, each in its own transaction"""
+    conn.commit()
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the lock
+            if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                conn.commit()
+                continue
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied database migration v{version} ({migration.__name__})")
+
+
 def save_invoice_to_db(invoice_data):
     """
     Save invoice to database
@@ -99,9 +406,19 @@ def save_invoice_to_db(invoice_data):
                 json.dumps(invoice_data.get('products', []), ensure_ascii=False),
                 invoice_data.get('extracted_text')
             ))
+            row_id = cursor.lastrowid
+            
+            # Normalized lines, in the same transaction (replacing any previous save)
+            created_at = cursor.execute(
+                'SELECT created_at FROM invoices WHERE id = ?', (row_id,)
+            ).fetchone()['created_at']
+            cursor.execute('DELETE FROM invoice_lines WHERE invoice_id = ?', (invoice_data.get('invoice_id'),))
+            _insert_invoice_lines(cursor, _invoice_line_rows(
+                invoice_data.get('invoice_id'), invoice_data.get('products', []), created_at
+            ))
             
             logger.info(f"Saved invoice {invoice_data.get('invoice_id')} to database")
-            return cursor.lastrowid
+            return row_id
             
     except sqlite3.IntegrityError:
         logger.warning(f"Invoice {invoice_data.get('invoice_id')} already exists")
@@ -111,6 +428,80 @@ def save_invoice_to_db(invoice_data):
         raise
 
 
+def save_invoices_bulk(invoices, chunk_size=DB_BULK_CHUNK_SIZE):
+    """
+    Save many invoices with executemany, one transaction per chunk
+    
+    Invoices have the save_invoice_to_db shape plus an optional 'created_at'
+    ('YYYY-MM-DD HH:MM:SS', defaults to now). Within a chunk the last copy of
+    a repeated invoice_id wins, as with sequential INSERT OR REPLACE.
+    
+    Args:
+        invoices: Iterable of invoice dictionaries (consumed lazily)
+        chunk_size: Invoices per transaction
+        
+    Returns:
+        dict: {'invoices': saved invoice count, 'lines': saved line count}
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    
+    iterator = iter(invoices)
+    saved_invoices = 0
+    saved_lines = 0
+    
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        latest = {}
+        for invoice_data in chunk:
+            invoice_id = invoice_data.get('invoice_id')
+            if not invoice_id:
+                raise ValueError("Every invoice needs an invoice_id for bulk saving")
+            latest.pop(invoice_id, None)
+            latest[invoice_id] = invoice_data
+        
+        invoice_rows = []
+        line_rows = []
+        for invoice_id, invoice_data in latest.items():
+            created_at = invoice_data.get('created_at') or now
+            products = invoice_data.get('products', [])
+            invoice_rows.append((
+                invoice_id,
+                invoice_data.get('store_name'),
+                invoice_data.get('store_key'),
+                invoice_data.get('total_amount'),
+                invoice_data.get('detection_confidence'),
+                json.dumps(products, ensure_ascii=False),
+                invoice_data.get('extracted_text'),
+                created_at
+            ))
+            line_rows.extend(_invoice_line_rows(invoice_id, products, created_at))
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO invoices 
+                (invoice_id, store_name, store_key, total_amount, confidence, products, extracted_text, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', invoice_rows)
+            cursor.executemany(
+                'DELETE FROM invoice_lines WHERE invoice_id = ?',
+                [(invoice_id,) for invoice_id in latest]
+            )
+            _insert_invoice_lines(cursor, line_rows)
+        
+        saved_invoices += len(invoice_rows)
+        saved_lines += len(line_rows)
+        logger.debug(f"Bulk saved chunk of {len(invoice_rows)} invoices")
+    
+    logger.info(f"Bulk saved {saved_invoices} invoices ({saved_lines} lines)")
+    return {'invoices': saved_invoices, 'lines': saved_lines}
+
+
 def save_forecast_to_db(forecast_data):
     """
     Save forecast to database
@@ -127,14 +518,15 @@ def save_forecast_to_db(forecast_data):
             
             cursor.execute('''
                 INSERT INTO forecasts 
-                (predicted_quantity, trend, confidence, recommendation, history_count)
-                VALUES (?, ?, ?, ?, ?)
+                (predicted_quantity, trend, confidence, recommendation, history_count, created_at)
+                VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
             ''', (
                 forecast_data.get('predicted_quantity'),
                 forecast_data.get('trend'),
                 forecast_data.get('confidence'),
                 forecast_data.get('recommendation_text'),
-                forecast_data.get('history_count', 0)
+                forecast_data.get('history_count', 0),
+                forecast_data.get('created_at')
             ))
             
             logger.info(f"Saved forecast to database (ID: {cursor.lastrowid})")
@@ -145,13 +537,60 @@ def save_forecast_to_db(forecast_data):
         raise
 
 
-def get_invoices_from_db(limit=100, offset=0):
+def encode_cursor(row):
     """
-    Get invoices from database
+    Opaque pagination token for the position after row
+    
+    Args:
+        row: Invoice or forecast dictionary (needs 'created_at' and 'id')
+        
+    Returns:
+        str: URL-safe token
+    """
+    payload = json.dumps([row['created_at'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a token from encode_cursor()
+    
+    Returns:
+        tuple: (created_at, id)
+        
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {token}") from e
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError(f"Invalid pagination cursor: {token}")
+    return created_at, row_id
+
+
+def _page_query(table, limit, offset, after):
+    """Newest-first page query; with a cursor it seeks on the (created_at, id) index"""
+    query = f'SELECT * FROM {table}'
+    params = []
+    if after:
+        query += ' WHERE (created_at, id) < (?, ?)'
+        params.extend(decode_cursor(after))
+    query += ' ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?'
+    params.extend([limit, offset])
+    return query, params
+
+
+def get_invoices_from_db(limit=100, offset=0, after=None):
+    """
+    Get invoices from database, newest first
     
     Args:
         limit: Number of records to return
-        offset: Offset for pagination
+        offset: Offset for pagination (prefer after for deep pages)
+        after: Cursor from encode_cursor() of the last row of the previous page
         
     Returns:
         list: List of invoice dictionaries
@@ -160,11 +599,7 @@ def get_invoices_from_db(limit=100, offset=0):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT * FROM invoices 
-                ORDER BY created_at DESC 
-                LIMIT ? OFFSET ?
-            ''', (limit, offset))
+            cursor.execute(*_page_query('invoices', limit, offset, after))
             
             rows = cursor.fetchall()
             
@@ -213,12 +648,33 @@ def get_invoice_by_id(invoice_id):
         return None
 
 
-def get_forecasts_from_db(limit=50):
+def invoice_exists(invoice_id):
+    """
+    Check whether an invoice_id is already stored (unique index lookup)
+    
+    Args:
+        invoice_id: Invoice ID
+        
+    Returns:
+        bool: True if a row with this invoice_id exists
+    """
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute('SELECT 1 FROM invoices WHERE invoice_id = ?', (invoice_id,)).fetchone()
+            return row is not None
+    except Exception as e:
+        logger.error(f"Error checking invoice {invoice_id}: {e}")
+        return False
+
+
+def get_forecasts_from_db(limit=50, offset=0, after=None):
     """
-    Get forecasts from database
+    Get forecasts from database, newest first
     
     Args:
         limit: Number of records to return
+        offset: Offset for pagination (prefer after for deep pages)
+        after: Cursor from encode_cursor() of the last row of the previous page
         
     Returns:
         list: List of forecast dictionaries
@@ -227,11 +683,7 @@ def get_forecasts_from_db(limit=50):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT * FROM forecasts 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (limit,))
+            cursor.execute(*_page_query('forecasts', limit, offset, after))
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
@@ -241,51 +693,186 @@ def get_forecasts_from_db(limit=50):
         return []
 
 
-def get_statistics():
+def get_product_time_series(product_id, start=None, end=None):
     """
-    Get database statistics
+    Daily imported quantity of one product, read from invoice_lines
     
+    Args:
+        product_id: Catalog product ID
+        start: Optional inclusive lower bound ('YYYY-MM-DD' or datetime)
+        end: Optional exclusive upper bound ('YYYY-MM-DD' or datetime)
+        
     Returns:
-        dict: Statistics
+        list: [{'date', 'quantity', 'amount', 'invoice_count'}] in date order
     """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Count invoices
-            cursor.execute('SELECT COUNT(*) as count FROM invoices')
-            invoice_count = cursor.fetchone()['count']
+            query = '''
+                SELECT date(created_at) AS date,
+                       SUM(quantity) AS quantity,
+                       SUM(line_total) AS amount,
+                       COUNT(DISTINCT invoice_id) AS invoice_count
+                FROM invoice_lines
+                WHERE product_id = ?
+            '''
+            params = [product_id]
+            if start is not None:
+                query += ' AND created_at >= ?'
+                params.append(_sql_timestamp(start))
+            if end is not None:
+                query += ' AND created_at < ?'
+                params.append(_sql_timestamp(end))
+            query += ' GROUP BY date(created_at) ORDER BY date'
             
-            # Count forecasts
-            cursor.execute('SELECT COUNT(*) as count FROM forecasts')
-            forecast_count = cursor.fetchone()['count']
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
             
-            # Total amount
-            cursor.execute('SELECT SUM(total_amount) as total FROM invoices')
-            total_amount = cursor.fetchone()['total'] or 0
+    except Exception as e:
+        logger.error(f"Error getting time series for {product_id}: {e}")
+        return []
+
+
+def get_product_totals(product_ids=None, start=None, end=None):
+    """
+    Imported quantity and amount per product, read from invoice_lines
+    
+    Args:
+        product_ids: Optional list of product IDs (all products if None)
+        start: Optional inclusive lower bound ('YYYY-MM-DD' or datetime)
+        end: Optional exclusive upper bound ('YYYY-MM-DD' or datetime)
+        
+    Returns:
+        dict: product_id -> {'quantity', 'amount', 'line_count'}
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
             
-            # Average confidence
-            cursor.execute('SELECT AVG(confidence) as avg FROM invoices')
-            avg_confidence = cursor.fetchone()['avg'] or 0
+            query = '''
+                SELECT product_id,
+                       SUM(quantity) AS quantity,
+                       SUM(line_total) AS amount,
+                       COUNT(*) AS line_count
+                FROM invoice_lines
+                WHERE 1 = 1
+            '''
+            params = []
+            if product_ids is not None:
+                product_ids = list(product_ids)
+                if not product_ids:
+                    return {}
+                query += f" AND product_id IN ({', '.join('?' * len(product_ids))})"
+                params.extend(product_ids)
+            if start is not None:
+                query += ' AND created_at >= ?'
+                params.append(_sql_timestamp(start))
+            if end is not None:
+                query += ' AND created_at < ?'
+                params.append(_sql_timestamp(end))
+            query += ' GROUP BY product_id'
             
+            cursor.execute(query, params)
             return {
-                'total_invoices': invoice_count,
-                'total_forecasts': forecast_count,
-                'total_amount': total_amount,
-                'average_confidence': avg_confidence
+                row['product_id']: {
+                    'quantity': row['quantity'],
+                    'amount': row['amount'],
+                    'line_count': row['line_count']
+                }
+                for row in cursor.fetchall()
             }
             
+    except Exception as e:
+        logger.error(f"Error getting product totals: {e}")
+        return {}
+
+
+def _sql_timestamp(value):
+    """Format a date bound like SQLite's CURRENT_TIMESTAMP (UTC 'YYYY-MM-DD HH:MM:SS')"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def get_statistics(start=None, end=None):
+    """
+    Get database statistics
+    
+    Reads the trigger-maintained stats_summary row, or sums the stats_daily
+    rollups when a date window is given (cost grows with days, not rows).
+    
+    Args:
+        start: Optional inclusive first day ('YYYY-MM-DD' or datetime)
+        end: Optional exclusive last day ('YYYY-MM-DD' or datetime)
+        
+    Returns:
+        dict: Statistics
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            if start is None and end is None:
+                cursor.execute('SELECT * FROM stats_summary WHERE id = 1')
+            else:
+                query = f"""
+                    SELECT {', '.join(f'COALESCE(SUM({column}), 0) AS {column}' for column in STATS_COLUMNS)}
+                    FROM stats_daily
+                    WHERE day != ''
+                """
+                params = []
+                if start is not None:
+                    query += ' AND day >= ?'
+                    params.append(_sql_day(start))
+                if end is not None:
+                    query += ' AND day < ?'
+                    params.append(_sql_day(end))
+                cursor.execute(query, params)
+            
+            row = cursor.fetchone()
+            if row is None:
+                return {}
+            
+            stats = {
+                'total_invoices': row['invoice_count'],
+                'total_forecasts': row['forecast_count'],
+                'total_amount': row['total_amount'],
+                'average_confidence': (
+                    row['confidence_sum'] / row['confidence_count'] if row['confidence_count'] else 0
+                )
+            }
+            if start is not None or end is not None:
+                stats['start'] = _sql_day(start) if start is not None else None
+                stats['end'] = _sql_day(end) if end is not None else None
+            return stats
+            
     except Exception as e:
         logger.error(f"Error getting statistics: {e}")
         return {}
 
 
+def rebuild_statistics():
+    """Recompute the statistics tables from scratch (e.g. after manual edits)"""
+    with get_db_connection() as conn:
+        _rebuild_statistics(conn.cursor())
+        logger.info("Statistics rebuilt")
+
+
+def _sql_day(value):
+    """Format a day bound like date(created_at)"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
 def clear_database():
     """Clear all data from database"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM invoices')
+            cursor.execute('DELETE FROM invoice_lines')
             cursor.execute('DELETE FROM forecasts')
             
             logger.info("Database cleared successfully")
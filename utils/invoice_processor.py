@@ -3,12 +3,61 @@ Invoice Processing Utilities
 Handles product extraction and invoice data building
 """
 import json
+from collections.abc import Sequence
 from datetime import datetime
 from pathlib import Path
 from utils.data_processor import (
     normalize_text, extract_quantity_from_line,
     extract_price_candidates
 )
+from utils.text_matcher import AhoCorasickMatcher
+
+
+class CatalogIndex(Sequence):
+    """
+    Read-only catalog entries ({'store', 'product', 'name_normalized'}) in
+    catalog order, with O(1) maps id -> entry and normalized name -> entry
+    (first entry wins, like a linear scan) and a multi-pattern matcher built
+    on first use. Entries are fixed at construction, so the maps and the
+    matcher can never go stale.
+    """
+
+    def __init__(self, entries=(), matcher=None, matcher_loader=None):
+        """
+        Args:
+            entries: Catalog entries in order
+            matcher: Prebuilt matcher over the entries' normalized names
+                     (e.g. from the catalog artifact); built lazily otherwise
+            matcher_loader: Callable returning such a matcher, called on first use
+        """
+        self._entries = list(entries)
+        self.by_id = {}
+        self.by_name = {}
+        for entry in self._entries:
+            self.by_id.setdefault(entry['product'].get('id'), entry)
+            self.by_name.setdefault(entry['name_normalized'], entry)
+        self._matcher = matcher
+        self._matcher_loader = matcher_loader
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def get_by_id(self, product_id):
+        return self.by_id.get(product_id)
+
+    def get_by_name(self, name_normalized):
+        return self.by_name.get(name_normalized)
+
+    @property
+    def matcher(self):
+        if self._matcher is None and self._matcher_loader is not None:
+            self._matcher = self._matcher_loader()
+        if self._matcher is None:
+            self._matcher = AhoCorasickMatcher([entry['name_normalized'] for entry in self._entries])
+        return self._matcher
 
 
 def load_product_catalogs(catalog_file: Path):
@@ -26,19 +75,28 @@ def load_product_catalogs(catalog_file: Path):
 
 def build_catalog_index(product_catalogs):
     """Build searchable index from product catalogs"""
-    catalog_index = []
-    for store_key, products in product_catalogs.items():
-        for product in products:
-            catalog_index.append({
-                'store': store_key,
-                'product': product,
-                'name_normalized': normalize_text(product.get('name', ''))
-            })
-    return catalog_index
+    return CatalogIndex(
+        {
+            'store': store_key,
+            'product': product,
+            'name_normalized': normalize_text(product.get('name', ''))
+        }
+        for store_key, products in product_catalogs.items()
+        for product in products
+    )
 
 
 def lookup_catalog_price(catalog_index, product_id=None, product_name=None):
     """Lookup price in catalog by ID or name"""
+    if isinstance(catalog_index, CatalogIndex):
+        entry = None
+        if product_id:
+            entry = catalog_index.get_by_id(product_id)
+        if entry is None and product_name:
+            entry = catalog_index.get_by_name(normalize_text(product_name))
+        return entry['product'].get('price', 0) if entry else 0
+    
+    # Plain lists: linear scan
     if product_id:
         for entry in catalog_index:
             if entry['product'].get('id') == product_id:
@@ -52,19 +110,26 @@ def lookup_catalog_price(catalog_index, product_id=None, product_name=None):
     return 0
 
 
+def _catalog_matcher(catalog_index):
+    """Matcher for a catalog index (plain lists get a one-off matcher)"""
+    if isinstance(catalog_index, CatalogIndex):
+        return catalog_index.matcher
+    return AhoCorasickMatcher([entry['name_normalized'] for entry in catalog_index])
+
+
 def extract_products_from_text(text, catalog_index):
     """Extract products from invoice text"""
     lines = [line.strip() for line in text.splitlines() if line.strip()]
     normalized_lines = [normalize_text(line) for line in lines]
+    matcher = _catalog_matcher(catalog_index)
     
     aggregated = {}
     store_counts = {}
     
     for original_line, normalized_line in zip(lines, normalized_lines):
-        for entry in catalog_index:
-            name_normalized = entry['name_normalized']
-            if not name_normalized or name_normalized not in normalized_line:
-                continue
+        # All catalog names found in the line, processed in catalog order
+        for entry_id in sorted(matcher.find_all(normalized_line)):
+            entry = catalog_index[entry_id]
             
             store_key = entry['store']
             store_counts[store_key] = store_counts.get(store_key, 0) + 1
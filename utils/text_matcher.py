@@ -0,0 +1,137 @@
+"""
+Text Matching Utilities
+Aho-Corasick automaton for finding many catalog names in OCR text at once
+"""
+import numpy as np
+
+# Transition keys pack (state, character) into one int: state * CHAR_SPACE + ord(ch)
+CHAR_SPACE = 0x110000
+
+
+class AhoCorasickMatcher:
+    """
+    Multi-pattern substring matcher
+
+    Built once from a list of patterns; find_all() then reports every
+    pattern occurring in a text with a single pass over its characters,
+    independent of the number of patterns.
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: List of strings; a pattern's id is its list index.
+                      Empty patterns never match.
+        """
+        self.num_patterns = len(patterns)
+        self._goto = {}
+        self._fail = [0]
+        # Only states that report matches have an entry
+        self._outputs = {}
+
+        children = [[]]
+        own_outputs = [[]]
+
+        # Trie of all patterns
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                key = state * CHAR_SPACE + ord(ch)
+                next_state = self._goto.get(key)
+                if next_state is None:
+                    next_state = len(self._fail)
+                    self._goto[key] = next_state
+                    self._fail.append(0)
+                    children.append([])
+                    own_outputs.append([])
+                    children[state].append((ord(ch), next_state))
+                state = next_state
+            own_outputs[state].append(pattern_id)
+
+        # Failure links in breadth-first order; outputs include the whole failure chain
+        queue = [child for _, child in children[0]]
+        for child in queue:
+            if own_outputs[child]:
+                self._outputs[child] = tuple(own_outputs[child])
+        position = 0
+        while position < len(queue):
+            state = queue[position]
+            position += 1
+            for code, child in children[state]:
+                fallback = self._fail[state]
+                while fallback and fallback * CHAR_SPACE + code not in self._goto:
+                    fallback = self._fail[fallback]
+                target = self._goto.get(fallback * CHAR_SPACE + code, 0)
+                self._fail[child] = target if target != child else 0
+                outputs = tuple(own_outputs[child]) + self._outputs.get(self._fail[child], ())
+                if outputs:
+                    self._outputs[child] = outputs
+                queue.append(child)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a matcher from the arrays produced by to_arrays()"""
+        matcher = cls.__new__(cls)
+        matcher.num_patterns = int(arrays['num_patterns'][0])
+        matcher._goto = dict(zip(arrays['goto_keys'].tolist(), arrays['goto_targets'].tolist()))
+        matcher._fail = arrays['fail'].tolist()
+
+        offsets = arrays['output_offsets'].tolist()
+        ids = arrays['output_ids'].tolist()
+        matcher._outputs = {
+            state: tuple(ids[offsets[i]:offsets[i + 1]])
+            for i, state in enumerate(arrays['output_states'].tolist())
+        }
+        return matcher
+
+    def to_arrays(self):
+        """Flat NumPy arrays describing the automaton (for on-disk storage)"""
+        output_states = sorted(self._outputs)
+        output_offsets = [0]
+        output_ids = []
+        for state in output_states:
+            output_ids.extend(self._outputs[state])
+            output_offsets.append(len(output_ids))
+
+        return {
+            'num_patterns': np.array([self.num_patterns], dtype=np.int64),
+            'goto_keys': np.fromiter(self._goto.keys(), dtype=np.int64, count=len(self._goto)),
+            'goto_targets': np.fromiter(self._goto.values(), dtype=np.int32, count=len(self._goto)),
+            'fail': np.array(self._fail, dtype=np.int32),
+            'output_states': np.array(output_states, dtype=np.int32),
+            'output_offsets': np.array(output_offsets, dtype=np.int64),
+            'output_ids': np.array(output_ids, dtype=np.int32),
+        }
+
+    @property
+    def num_states(self):
+        return len(self._fail)
+
+    def find_all(self, text):
+        """
+        Find every pattern occurring in text
+        Returns:
+            set: Ids of the matched patterns
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+
+        found = set()
+        state = 0
+        for ch in text:
+            code = ord(ch)
+            while True:
+                next_state = goto.get(state * CHAR_SPACE + code)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            matched = outputs.get(state)
+            if matched:
+                found.update(matched)
+        return found